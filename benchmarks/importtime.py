@@ -0,0 +1,76 @@
+"""
+Measure how long importing the modules of the client takes, e.g. for CLI
+tools and serverless functions which start often.
+
+    python benchmarks/importtime.py [--runs 10] [module ...]
+
+Every module is imported in a new interpreter with ``python -X importtime``.
+For every module the cumulative import time (best of the runs) is printed,
+with the packages which took the longest to import. Modules which the
+interpreter imports at startup are left out.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+MODULES = (
+    'keycloak.client',
+    'keycloak.realm',
+    'keycloak.openid_connect',
+    'keycloak.aio',
+)
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                   'src')
+
+
+def import_times(code):
+    """
+    :param str code: Code which does the imports
+    :return: Per imported module the cumulative import time in microseconds
+    :rtype: dict
+    """
+    env = dict(os.environ, PYTHONPATH=SRC)
+    output = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        env=env, stderr=subprocess.PIPE, check=True,
+        universal_newlines=True
+    ).stderr
+
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        # Only the top level import of a package includes its submodules
+        if name not in times:
+            times[name] = int(cumulative)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--top', type=int, default=3)
+    parser.add_argument('modules', nargs='*', default=MODULES)
+    args = parser.parse_args()
+
+    startup = set(import_times('pass'))
+    for module in args.modules:
+        runs = [import_times('import ' + module) for _ in range(args.runs)]
+        best = min(runs, key=lambda times: times[module])
+        packages = sorted(
+            ((name, seconds) for name, seconds in best.items()
+             if '.' not in name and name not in startup
+             and name != module.split('.')[0]),
+            key=lambda item: -item[1]
+        )
+        print('{:<26} {:8.1f} ms'.format(module, best[module] / 1000.0))
+        for name, seconds in packages[:args.top]:
+            print('  {:<24} {:8.1f} ms'.format(name, seconds / 1000.0))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Compare eager and lazy decoding of large Keycloak list responses.
+
+    python benchmarks/lazy_json.py [--size 10000]
+
+For every scenario the CPU time (best of 5) and the peak memory allocated
+while running it (measured with tracemalloc) are printed. Only arrays are
+decoded element by element, a JSON object is decoded as a whole on first
+access, so single large objects aren't benchmarked.
+"""
+import argparse
+import gc
+import json
+import timeit
+import tracemalloc
+import uuid
+
+from keycloak.lazy_json import lazy_json
+
+
+def user(index):
+    return {
+        'id': str(uuid.uuid4()),
+        'createdTimestamp': 1500000000000 + index,
+        'username': 'user-{}'.format(index),
+        'enabled': True,
+        'totp': False,
+        'emailVerified': True,
+        'firstName': 'First {}'.format(index),
+        'lastName': 'Last {}'.format(index),
+        'email': 'user-{}@example.com'.format(index),
+        'attributes': {'locale': ['en'], 'department': ['dep-{}'.format(
+            index % 20)]},
+        'disableableCredentialTypes': ['password'],
+        'requiredActions': [],
+        'notBefore': 0,
+        'access': {'manageGroupMembership': True, 'view': True,
+                   'mapRoles': True, 'impersonate': False, 'manage': True},
+    }
+
+
+def client(index):
+    return {
+        'id': str(uuid.uuid4()),
+        'clientId': 'client-{}'.format(index),
+        'rootUrl': 'https://client-{}.example.com'.format(index),
+        'enabled': True,
+        'clientAuthenticatorType': 'client-secret',
+        'redirectUris': ['https://client-{}.example.com/*'.format(index)],
+        'webOrigins': ['+'],
+        'bearerOnly': False,
+        'consentRequired': False,
+        'standardFlowEnabled': True,
+        'implicitFlowEnabled': False,
+        'directAccessGrantsEnabled': True,
+        'serviceAccountsEnabled': False,
+        'publicClient': False,
+        'protocol': 'openid-connect',
+        'attributes': dict(('attribute.{}'.format(attribute), 'false')
+                           for attribute in range(15)),
+        'fullScopeAllowed': True,
+        'defaultClientScopes': ['web-origins', 'profile', 'roles', 'email'],
+        'optionalClientScopes': ['address', 'phone', 'offline_access'],
+    }
+
+
+def eager_first_fields(content):
+    return [item['id'] for item in json.loads(content.decode('utf-8'))[:10]]
+
+
+def lazy_first_fields(content):
+    return [item['id'] for item in lazy_json(content)[:10]]
+
+
+def eager_all_fields(content):
+    return [item['id'] for item in json.loads(content.decode('utf-8'))]
+
+
+def lazy_all_fields(content):
+    return [item['id'] for item in lazy_json(content)]
+
+
+def lazy_unused(content):
+    return lazy_json(content)
+
+
+def measure(func, content):
+    seconds = min(timeit.repeat(lambda: func(content), number=1, repeat=5))
+
+    gc.collect()
+    tracemalloc.start()
+    result = func(content)  # noqa: F841
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=10000)
+    args = parser.parse_args()
+
+    for name, factory in (('users', user), ('clients', client)):
+        content = json.dumps([factory(index)
+                              for index in range(args.size)]).encode('utf-8')
+        print('{} {} ({:.1f} MiB)'.format(args.size, name,
+                                          len(content) / 2.0 ** 20))
+        for label, func in (
+            ('eager, 10 items read', eager_first_fields),
+            ('lazy, 10 items read', lazy_first_fields),
+            ('eager, all items read', eager_all_fields),
+            ('lazy, all items read', lazy_all_fields),
+            ('lazy, not read', lazy_unused),
+        ):
+            seconds, peak = measure(func, content)
+            print('  {:<24} {:8.2f} ms {:8.2f} MiB'.format(
+                label, seconds * 1000, peak / 2.0 ** 20))
+
+
+if __name__ == '__main__':
+    main()
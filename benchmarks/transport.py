@@ -0,0 +1,131 @@
+"""
+Compare the per-call overhead of the sync client with a requests.Session and
+with the urllib3 based transport.
+
+    python benchmarks/transport.py [--calls 2000]
+
+A local HTTP server answers token (POST) and userinfo (GET) calls with small
+JSON bodies, so the time per call is mostly spent in the client. For every
+scenario the wall time per call (best of 5) is printed.
+"""
+import argparse
+import json
+import threading
+import timeit
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+from keycloak.client import KeycloakClient
+from keycloak.transport import Urllib3Session
+
+TOKEN = json.dumps({
+    'access_token': 'a' * 800,
+    'expires_in': 300,
+    'refresh_expires_in': 1800,
+    'refresh_token': 'r' * 600,
+    'token_type': 'Bearer',
+    'not-before-policy': 0,
+    'session_state': 'f3c9a2a1-0d54-4c3f-9b4e-0b4b8c8d1c1e',
+    'scope': 'openid profile email',
+}).encode('utf-8')
+
+USERINFO = json.dumps({
+    'sub': 'f3c9a2a1-0d54-4c3f-9b4e-0b4b8c8d1c1e',
+    'email_verified': True,
+    'name': 'Jane Doe',
+    'preferred_username': 'jane',
+    'given_name': 'Jane',
+    'family_name': 'Doe',
+    'email': 'jane@example.com',
+}).encode('utf-8')
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Send the headers and body in one segment, without Nagle's algorithm
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def respond(self, body):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.respond(USERINFO)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.respond(TOKEN)
+
+
+def start_server():
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server, 'http://127.0.0.1:{}/'.format(server.server_address[1])
+
+
+def token(client):
+    return client.post(client.get_full_url('token'), data={
+        'grant_type': 'password',
+        'client_id': 'client',
+        'client_secret': 'secret',
+        'username': 'jane',
+        'password': 'secret',
+    })
+
+
+def userinfo(client):
+    return client.get(client.get_full_url('userinfo'),
+                      headers={'Authorization': 'Bearer ' + 'a' * 800})
+
+
+def measure(func, client, calls):
+    func(client)  # Open the connection
+    seconds = min(timeit.repeat(lambda: func(client), number=calls,
+                                repeat=5))
+    return seconds / calls
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=2000)
+    args = parser.parse_args()
+
+    server, server_url = start_server()
+    transports = (
+        ('requests.Session', None),
+        ('Urllib3Session', Urllib3Session),
+    )
+    for label, func in (('token (POST)', token),
+                        ('userinfo (GET)', userinfo)):
+        print(label)
+        baseline = None
+        for name, session_factory in transports:
+            with KeycloakClient(server_url,
+                                session_factory=session_factory) as client:
+                seconds = measure(func, client, args.calls)
+            if baseline is None:
+                baseline = seconds
+                saved = ''
+            else:
+                saved = ' ({:.0f} us saved per call)'.format(
+                    (baseline - seconds) * 1e6
+                )
+            print('  {:<18} {:8.1f} us per call{}'.format(
+                name, seconds * 1e6, saved))
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
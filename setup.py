@@ -43,7 +43,10 @@ setup(
         ],
         'aio': [
             'aiohttp>=3.4.4,<4; python_full_version>="3.5.3"'
-        ]
+        ],
+        'tracing': [
+            'opentelemetry-api',
+        ],
     },
     setup_requires=[
         'pytest-runner>=4.0,<5'
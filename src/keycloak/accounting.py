@@ -0,0 +1,237 @@
+"""
+Count the Keycloak round trips, bytes and time spent in a block of code, to
+find and prevent N+1 call patterns.
+
+.. code-block:: python
+
+    with RoundTrips() as round_trips:
+        realm.admin.users.by_id(user_id).user
+
+    round_trips.assert_at_most(1)
+
+    # Or fail when the block exceeds its budget
+    with RoundTrips(budget=3):
+        realm.admin.users.by_id(user_id).update(first_name='Jane')
+
+Only requests done in the block by the current thread (or the current task
+and the tasks it starts with asyncio) are counted, by any client.
+"""
+try:
+    from contextvars import ContextVar
+except ImportError:
+    ContextVar = None
+
+import threading
+
+try:
+    from urllib.parse import urlencode
+except ImportError:
+    from urllib import urlencode
+
+__all__ = (
+    'EndpointRoundTrips',
+    'RoundTrips',
+    'active_round_trips',
+    'request_body_size',
+    'response_body_size',
+)
+
+try:
+    _text_type = unicode
+except NameError:
+    _text_type = str
+
+
+def request_body_size(data):
+    """
+    :param data: Request body as passed to the client
+    :return: Number of bytes of the encoded body or None when unknown
+    :rtype: int
+    """
+    if data is None:
+        return 0
+    if isinstance(data, bytes):
+        return len(data)
+    if isinstance(data, _text_type):
+        return len(data.encode('utf-8'))
+    if isinstance(data, (dict, list, tuple)):
+        # Form encoded, like requests and aiohttp do
+        return len(urlencode(data, doseq=True))
+    return None
+
+
+def response_body_size(headers):
+    """
+    :param headers: Response headers
+    :return: Number of bytes of the body according to the Content-Length
+        header, None when unknown (e.g. a chunked body)
+    :rtype: int
+    """
+    try:
+        return int(headers['Content-Length'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+if ContextVar is not None:
+    _active = ContextVar('keycloak_round_trips', default=())
+
+    def active_round_trips():
+        """
+        :return: The round trip counters of the blocks the current context
+            is in
+        :rtype: tuple
+        """
+        return _active.get()
+
+    def _push(round_trips):
+        return _active.set(_active.get() + (round_trips,))
+
+    def _pop(token):
+        _active.reset(token)
+else:
+    class _ActiveLocal(threading.local):
+        round_trips = ()
+
+    _active = _ActiveLocal()
+
+    def active_round_trips():
+        """
+        :return: The round trip counters of the blocks the current context
+            is in
+        :rtype: tuple
+        """
+        return _active.round_trips
+
+    def _push(round_trips):
+        previous = _active.round_trips
+        _active.round_trips = previous + (round_trips,)
+        return previous
+
+    def _pop(previous):
+        _active.round_trips = previous
+
+
+class EndpointRoundTrips(object):
+    """
+    Totals of the round trips to one endpoint.
+    """
+    __slots__ = ('round_trips', 'errors', 'bytes_sent', 'bytes_received',
+                 'duration')
+
+    def __init__(self):
+        self.round_trips = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.duration = 0.0
+
+    def __repr__(self):
+        return ('<EndpointRoundTrips round_trips={} bytes_sent={} '
+                'bytes_received={} duration={:.3f}s>').format(
+            self.round_trips, self.bytes_sent, self.bytes_received,
+            self.duration
+        )
+
+
+class RoundTrips(object):
+    """
+    Context manager which counts the HTTP round trips, the bytes sent and
+    received and the time spent per endpoint template.
+
+    Failovers and hedged requests are counted as extra round trips of the
+    same call. Bytes are the request and response bodies, a body of unknown
+    size isn't counted.
+    """
+
+    def __init__(self, budget=None):
+        """
+        :param int budget: (optional) Maximum number of round trips, an
+            AssertionError is raised when leaving a block which exceeded it
+        """
+        self.budget = budget
+        self.endpoints = {}
+        self._lock = threading.Lock()
+        self._token = None
+
+    def __enter__(self):
+        self._token = _push(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _pop(self._token)
+        self._token = None
+        if exc_type is None and self.budget is not None:
+            self.assert_at_most(self.budget)
+
+    def record(self, info):
+        """
+        :param keycloak.hooks.RequestInfo info: Finished request
+        """
+        name = info.endpoint or '{} {}'.format(info.method, info.url)
+        with self._lock:
+            totals = self.endpoints.get(name)
+            if totals is None:
+                totals = self.endpoints[name] = EndpointRoundTrips()
+            totals.round_trips += 1 + info.retries + int(info.hedged)
+            if info.exception is not None:
+                totals.errors += 1
+            totals.bytes_sent += info.request_size or 0
+            totals.bytes_received += info.response_size or 0
+            totals.duration += info.duration or 0
+
+    @property
+    def round_trips(self):
+        return sum(totals.round_trips for totals in self.endpoints.values())
+
+    @property
+    def bytes_sent(self):
+        return sum(totals.bytes_sent for totals in self.endpoints.values())
+
+    @property
+    def bytes_received(self):
+        return sum(totals.bytes_received
+                   for totals in self.endpoints.values())
+
+    @property
+    def duration(self):
+        return sum(totals.duration for totals in self.endpoints.values())
+
+    def summary(self):
+        """
+        :return: One line per endpoint, the most called first
+        :rtype: str
+        """
+        lines = ['{} round trips, {} bytes sent, {} bytes received, '
+                 '{:.3f}s'.format(self.round_trips, self.bytes_sent,
+                                  self.bytes_received, self.duration)]
+        for name, totals in sorted(self.endpoints.items(),
+                                   key=lambda item: -item[1].round_trips):
+            lines.append('  {}: {} round trips, {} bytes sent, {} bytes '
+                         'received, {:.3f}s'.format(
+                             name, totals.round_trips, totals.bytes_sent,
+                             totals.bytes_received, totals.duration))
+        return '\n'.join(lines)
+
+    def assert_at_most(self, count, endpoint=None):
+        """
+        Check the number of round trips, e.g. in a test suite.
+
+        :param int count: Maximum number of round trips
+        :param str endpoint: (optional) Only check the round trips to this
+            endpoint template
+        :raises AssertionError: When there were more round trips
+        """
+        if endpoint is None:
+            actual = self.round_trips
+        else:
+            totals = self.endpoints.get(endpoint)
+            actual = 0 if totals is None else totals.round_trips
+
+        if actual > count:
+            raise AssertionError(
+                'Expected at most {} round trips{}, got {}\n{}'.format(
+                    count, '' if endpoint is None else ' to ' + endpoint,
+                    actual, self.summary()
+                )
+            )
@@ -1,3 +1,5 @@
+from keycloak.hooks import endpoint
+
 __all__ = (
     'KeycloakAdmin',
     'KeycloakAdminBase',
@@ -34,6 +36,7 @@ class KeycloakAdmin(object):
         """
         self._realm = realm
 
+    @endpoint('admin.root')
     def root(self):
         return self.get(
             self.get_full_url(self._paths['root'])
@@ -2,6 +2,8 @@ import json
 from collections import OrderedDict
 
 from keycloak.admin import KeycloakAdminBase
+from keycloak.hooks import endpoint
+from keycloak.lazy_json import json_default
 
 ROLE_KWARGS = [
     'description',
@@ -40,6 +42,7 @@ class ClientRoles(KeycloakAdminBase):
                           client_id=self._client_id,
                           role_name=role_name, client=self._client)
 
+    @endpoint('admin.clients.roles.collection')
     def create(self, name, **kwargs):
         """
         Create new role
@@ -68,7 +71,7 @@ class ClientRoles(KeycloakAdminBase):
                               realm=self._realm_name,
                               id=self._client_id)
             ),
-            data=json.dumps(payload, sort_keys=True)
+            data=json.dumps(payload, sort_keys=True, default=json_default)
         )
 
 
@@ -84,6 +87,7 @@ class ClientRole(KeycloakAdminBase):
 
         super(ClientRole, self).__init__(*args, **kwargs)
 
+    @endpoint('admin.clients.roles.single')
     def update(self, name, **kwargs):
         """
         Update existing role.
@@ -112,5 +116,5 @@ class ClientRole(KeycloakAdminBase):
                               id=self._client_id,
                               role_name=self._role_name)
             ),
-            data=json.dumps(payload, sort_keys=True)
+            data=json.dumps(payload, sort_keys=True, default=json_default)
         )
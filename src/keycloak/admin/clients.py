@@ -1,4 +1,5 @@
 from keycloak.admin import KeycloakAdminBase
+from keycloak.hooks import endpoint
 
 __all__ = ('Client', 'Clients',)
 
@@ -13,6 +14,7 @@ class Clients(KeycloakAdminBase):
         self._realm_name = realm_name
         super(Clients, self).__init__(*args, **kwargs)
 
+    @endpoint('admin.clients.collection')
     def all(self):
         return self._client.get(
             self._client.get_full_url(
@@ -1,6 +1,7 @@
 import json
 
 from keycloak.admin import KeycloakAdminBase
+from keycloak.hooks import endpoint
 
 __all__ = ('Groups',)
 
@@ -14,6 +15,7 @@ class Groups(KeycloakAdminBase):
         self._realm_name = realm_name
         super(Groups, self).__init__(*args, **kwargs)
 
+    @endpoint('admin.groups.collection')
     def all(self):
         return self._client.get(
             url=self._client.get_full_url(
@@ -24,6 +26,7 @@ class Groups(KeycloakAdminBase):
             ),
         )
 
+    @endpoint('admin.groups.collection')
     def create(self, name):
         return self._client.post(
             url=self._client.get_full_url(
@@ -1,6 +1,7 @@
 import json
 
 from keycloak.admin import KeycloakAdminBase
+from keycloak.hooks import endpoint
 
 
 class UserGroups(KeycloakAdminBase):
@@ -15,6 +16,7 @@ class UserGroups(KeycloakAdminBase):
         self._user_id = user_id
         super(UserGroups, self).__init__(*args, **kwargs)
 
+    @endpoint('admin.users.groups.collection')
     def all(self):
         return self._client.get(
             url=self._client.get_full_url(
@@ -26,6 +28,7 @@ class UserGroups(KeycloakAdminBase):
             )
         )
 
+    @endpoint('admin.users.groups.single')
     def add(self, group_id):
         return self._client.put(
             url=self._client.get_full_url(
@@ -43,6 +46,7 @@ class UserGroups(KeycloakAdminBase):
             })
         )
 
+    @endpoint('admin.users.groups.single')
     def delete(self, group_id):
         return self._client.delete(
             url=self._client.get_full_url(
@@ -1,6 +1,8 @@
 import json
 
 from keycloak.admin import KeycloakAdminBase
+from keycloak.hooks import endpoint
+from keycloak.lazy_json import json_default
 
 __all__ = ('UserRoleMappings', 'UserRoleMappingsRealm')
 
@@ -34,6 +36,7 @@ class UserRoleMappingsRealm(KeycloakAdminBase):
         self._user_id = user_id
         super(UserRoleMappingsRealm, self).__init__(*args, **kwargs)
 
+    @endpoint('admin.users.role_mappings.realm.available')
     def available(self):
         return self._client.get(
             url=self._client.get_full_url(
@@ -43,6 +46,7 @@ class UserRoleMappingsRealm(KeycloakAdminBase):
             )
         )
 
+    @endpoint('admin.users.role_mappings.realm.single')
     def add(self, roles):
         """
         :param roles: _rolerepresentation array keycloak api
@@ -53,9 +57,10 @@ class UserRoleMappingsRealm(KeycloakAdminBase):
                     'single', realm=self._realm_name, id=self._user_id
                 )
             ),
-            data=json.dumps(roles, sort_keys=True)
+            data=json.dumps(roles, sort_keys=True, default=json_default)
         )
 
+    @endpoint('admin.users.role_mappings.realm.single')
     def get(self):
         return self._client.get(
             url=self._client.get_full_url(
@@ -65,6 +70,7 @@ class UserRoleMappingsRealm(KeycloakAdminBase):
             )
         )
 
+    @endpoint('admin.users.role_mappings.realm.single')
     def delete(self, roles):
         """
         :param roles: _rolerepresentation array keycloak api
@@ -75,5 +81,5 @@ class UserRoleMappingsRealm(KeycloakAdminBase):
                     'single', realm=self._realm_name, id=self._user_id
                 )
             ),
-            data=json.dumps(roles, sort_keys=True)
+            data=json.dumps(roles, sort_keys=True, default=json_default)
         )
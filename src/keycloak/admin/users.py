@@ -2,6 +2,8 @@ import json
 from collections import OrderedDict
 
 from keycloak.admin import KeycloakAdminBase
+from keycloak.hooks import endpoint
+from keycloak.lazy_json import json_default
 
 __all__ = ('Users', 'User',)
 
@@ -30,6 +32,7 @@ class Users(KeycloakAdminBase):
         self._realm_name = realm_name
         super(Users, self).__init__(*args, **kwargs)
 
+    @endpoint('admin.users.collection')
     def create(self, username, **kwargs):
         """
         Create a user in Keycloak
@@ -54,9 +57,10 @@ class Users(KeycloakAdminBase):
             url=self._client.get_full_url(
                 self.get_path('collection', realm=self._realm_name)
             ),
-            data=json.dumps(payload, sort_keys=True)
+            data=json.dumps(payload, sort_keys=True, default=json_default)
         )
 
+    @endpoint('admin.users.collection')
     def all(self):
         """
         Return all registered users
@@ -108,6 +112,7 @@ class User(KeycloakAdminBase):
                           user_id=self._user_id,
                           client=self._client)
 
+    @endpoint('admin.users.single')
     def get(self):
         """
         Return registered user with the given user id.
@@ -124,6 +129,7 @@ class User(KeycloakAdminBase):
         self._user_id = self.user["id"]
         return self._user
 
+    @endpoint('admin.users.single')
     def update(self, **kwargs):
         """
         Update existing user.
@@ -152,11 +158,12 @@ class User(KeycloakAdminBase):
                     'single', realm=self._realm_name, user_id=self._user_id
                 )
             ),
-            data=json.dumps(payload, sort_keys=True)
+            data=json.dumps(payload, sort_keys=True, default=json_default)
         )
         self.get()
         return result
 
+    @endpoint('admin.users.single')
     def delete(self):
         """
         Delete registered user with the given user id.
@@ -169,6 +176,7 @@ class User(KeycloakAdminBase):
             )
         )
 
+    @endpoint('admin.users.reset_password')
     def reset_password(self, password, temporary=False):
         payload = {
             "type": "password",
@@ -182,10 +190,11 @@ class User(KeycloakAdminBase):
                     user_id=self._user_id
                 )
             ),
-            data=json.dumps(payload, sort_keys=True)
+            data=json.dumps(payload, sort_keys=True, default=json_default)
         )
         return result
 
+    @endpoint('admin.users.logout')
     def logout(self):
         """Logs out user with the given user id"""
         result = self._client.post(
@@ -6,10 +6,17 @@ except ImportError:
 
 from .abc import *  # noqa: F403
 from .authz import *  # noqa: F403
+from .cache import *  # noqa: F403
+from .cassette import *  # noqa: F403
 from .client import *  # noqa: F403
+from .hooks import *  # noqa: F403
 from .mixins import *  # noqa: F403
 from .openid_connect import *  # noqa: F403
+from .pools import *  # noqa: F403
 from .realm import *  # noqa: F403
+from .registry import *  # noqa: F403
+from .snapshot import *  # noqa: F403
+from .tracing import *  # noqa: F403
 from .uma import *  # noqa: F403
 from .well_known import *  # noqa: F403
 from .. import admin
@@ -18,10 +25,17 @@ __all__ = (
         abc.__all__  # noqa: F405
         + admin.__all__
         + authz.__all__  # noqa: F405
+        + cache.__all__  # noqa: F405
+        + cassette.__all__  # noqa: F405
         + client.__all__  # noqa: F405
+        + hooks.__all__  # noqa: F405
         + mixins.__all__  # noqa: F405
         + openid_connect.__all__  # noqa: F405
+        + pools.__all__  # noqa: F405
         + realm.__all__  # noqa: F405
+        + registry.__all__  # noqa: F405
+        + snapshot.__all__  # noqa: F405
+        + tracing.__all__  # noqa: F405
         + uma.__all__  # noqa: F405
         + well_known.__all__  # noqa: F405
         + ('admin',)
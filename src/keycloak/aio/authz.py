@@ -5,6 +5,7 @@ from keycloak.authz import (
     urlencode,
 )
 from keycloak.exceptions import KeycloakClientError
+from keycloak.hooks import endpoint
 
 __all__ = (
     'KeycloakAuthz',
@@ -15,6 +16,7 @@ class KeycloakAuthz(WellKnownMixin, SyncKeycloakAuthz):
     def get_path_well_known(self):
         return PATH_WELL_KNOWN
 
+    @endpoint('authz.permissions')
     async def get_permissions(self, token, resource_scopes_tuples=None,
                               submit_request=False, ticket=None):
         """
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import os
+import weakref
+from functools import partial
+
+from keycloak.cache import StaleCache, _flight_key
+
+__all__ = (
+    'SingleFlight',
+    'get_or_fetch',
+)
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight(object):
+    """
+    Runs only one call per key at a time: the first task which asks for a
+    key awaits the function, tasks which ask for the same key in the
+    meantime await its result (or exception) instead of calling it again.
+    """
+
+    def __init__(self):
+        # Calls per event loop, a future can only be awaited in its own loop
+        self._loops = weakref.WeakKeyDictionary()
+
+    async def do(self, key, func):
+        """
+        :param str key:
+        :param func: Called without arguments to get an awaitable
+        :return: The result of the call for the key
+        """
+        calls = self._loops.setdefault(asyncio.get_event_loop(), {})
+        future = self._running(calls, key)
+        if future is not None:
+            # Shielded, so a cancelled waiter doesn't cancel the call
+            return await asyncio.shield(future)
+
+        return await asyncio.shield(self._start(calls, key, func))
+
+    def reset(self):
+        """
+        Forget the calls in flight, e.g. in a forked child process where the
+        event loops which run them aren't running.
+        """
+        self._loops = weakref.WeakKeyDictionary()
+
+    def start(self, key, func):
+        """
+        Run the function in a task, unless a call for the key is in flight
+        already. Tasks which ask for the key in the meantime await its
+        result like for any other call.
+
+        :param str key:
+        :param func: Called without arguments to get an awaitable
+        :return: True when a call was started
+        :rtype: bool
+        """
+        calls = self._loops.setdefault(asyncio.get_event_loop(), {})
+        if self._running(calls, key) is not None:
+            return False
+        future = self._start(calls, key, func)
+        # Raised to the waiting tasks, if any
+        future.add_done_callback(
+            lambda future: future.cancelled() or future.exception()
+        )
+        return True
+
+    @staticmethod
+    def _running(calls, key):
+        future = calls.get(key)
+        # Done callbacks run later, a finished call may not be removed yet
+        if future is None or future.done():
+            return None
+        return future
+
+    @staticmethod
+    def _start(calls, key, func):
+        future = calls[key] = asyncio.ensure_future(func())
+
+        def remove(_):
+            if calls.get(key) is future:
+                del calls[key]
+
+        future.add_done_callback(remove)
+        return future
+
+
+#: Fetches which are in flight, by cache and key
+_flights = SingleFlight()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_flights.reset)
+
+
+async def get_or_fetch(cache, key, fetch):
+    """
+    Get a value from the cache, when it's missing it's fetched and stored.
+
+    Concurrent fetches of the same key are combined into one, also without
+    a cache. With a :class:`keycloak.cache.StaleCache` expired values are
+    returned while they are refreshed in a task or when refreshing fails.
+
+    :param keycloak.cache.BaseCache cache: Cache or None to always fetch
+    :param str key:
+    :param fetch: Called without arguments to get an awaitable of the value
+    """
+    flight = _flight_key(cache, key)
+    if cache is None:
+        return await _flights.do(flight, fetch)
+
+    if isinstance(cache, StaleCache):
+        value, staleness = cache.lookup(key)
+    else:
+        value, staleness = cache.get(key), None
+    if value is not None and not staleness:
+        return value
+
+    async def fetch_and_store():
+        # A fetch which finished after the lookup above already stored it
+        value = cache.get(key)
+        if value is None:
+            value = await fetch()
+            cache.set(key, value)
+        return value
+
+    if value is None:
+        return await _flights.do(flight, fetch_and_store)
+
+    if staleness <= cache.stale_while_revalidate:
+        if _flights.start(flight, partial(_revalidate, cache, key,
+                                          fetch_and_store)):
+            cache.revalidating(key)
+        cache.served_stale(key, staleness)
+        return value
+
+    try:
+        return await _flights.do(flight, fetch_and_store)
+    except Exception:
+        cache.refresh_failed(key)
+        if staleness > cache.stale_if_error:
+            raise
+        logger.warning('Could not refresh %s, serving a copy which is %.0fs '
+                       'stale', key, staleness, exc_info=True)
+        cache.served_stale(key, staleness)
+        return value
+
+
+async def _revalidate(cache, key, fetch_and_store):
+    try:
+        return await fetch_and_store()
+    except Exception:
+        cache.refresh_failed(key)
+        logger.warning('Could not refresh %s in the background', key,
+                       exc_info=True)
+        raise
@@ -0,0 +1,211 @@
+import asyncio
+import json
+
+import aiohttp
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+from keycloak.cassette import Cassette, responses
+from keycloak.hooks import clock, current_endpoint
+
+__all__ = (
+    'cassette_session_factory',
+)
+
+
+def cassette_session_factory(cassette: Cassette, session_factory):
+    """
+    Wrap a session factory to record to or replay from a cassette.
+
+    :param keycloak.cassette.Cassette cassette:
+    :param session_factory: Factory of the real session, only used when
+        recording
+    """
+    def factory(**session_params):
+        if cassette.record:
+            return RecordingSession(cassette,
+                                    session_factory(**session_params))
+        return ReplaySession(cassette)
+    return factory
+
+
+class _CassetteRequest(object):
+    """
+    Request which can be awaited or used as async context manager, like the
+    one returned by :class:`aiohttp.ClientSession`.
+    """
+    response = None
+
+    def __await__(self):
+        return self._send().__await__()
+
+    async def __aenter__(self):
+        self.response = await self._send()
+        return self.response
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.response.release()
+
+    async def _send(self):
+        raise NotImplementedError()
+
+
+class _RecordingRequest(_CassetteRequest):
+
+    def __init__(self, cassette, req_ctx, method):
+        self._cassette = cassette
+        self._req_ctx = req_ctx
+        self._method = method
+        self._endpoint = current_endpoint()
+        self._started = clock()
+
+    async def _record(self, response):
+        # The body is kept by the response, so it can be read again
+        content = await response.read()
+        self._cassette.append(
+            self._method, str(response.url), response.status,
+            response.headers, content, clock() - self._started,
+            endpoint=self._endpoint
+        )
+        return response
+
+    async def _send(self):
+        return await self._record(await self._req_ctx)
+
+    async def __aenter__(self):
+        return await self._record(await self._req_ctx.__aenter__())
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self._req_ctx.__aexit__(exc_type, exc_val, exc_tb)
+
+
+class RecordingSession(object):
+    """
+    Session which records all responses of the wrapped session.
+    """
+
+    def __init__(self, cassette, session):
+        self._cassette = cassette
+        self._session = session
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+    def _request(self, method, url, **kwargs):
+        req_ctx = getattr(self._session, method.lower())(url, **kwargs)
+        return _RecordingRequest(self._cassette, req_ctx, method)
+
+    def get(self, url, **kwargs):
+        return self._request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self._request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self._request('PUT', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self._request('DELETE', url, **kwargs)
+
+    async def __aenter__(self):
+        await self._session.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self._session.__aexit__(exc_type, exc_val, exc_tb)
+
+    async def close(self):
+        await self._session.close()
+
+
+class ReplayResponse(object):
+    """
+    Recorded response with the parts of :class:`aiohttp.ClientResponse`
+    which are used by the client.
+    """
+
+    def __init__(self, method, url, entry):
+        self.method = method
+        self.url = URL(url)
+        self.status = entry['status']
+        self.reason = responses.get(self.status)
+        self.headers = CIMultiDictProxy(CIMultiDict(entry['headers']))
+        self._body = Cassette.content(entry)
+        self.content_length = len(self._body)
+
+    @property
+    def request_info(self):
+        return aiohttp.RequestInfo(self.url, self.method,
+                                   CIMultiDictProxy(CIMultiDict()), self.url)
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise aiohttp.ClientResponseError(
+                self.request_info, (), status=self.status,
+                message=self.reason or '', headers=self.headers
+            )
+
+    async def read(self):
+        return self._body
+
+    async def text(self, encoding='utf-8', errors='strict'):
+        return self._body.decode(encoding, errors)
+
+    async def json(self, *, content_type='application/json',
+                   loads=json.loads):
+        return loads(self._body.decode('utf-8'))
+
+    def release(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _ReplayRequest(_CassetteRequest):
+
+    def __init__(self, cassette, method, url, params):
+        self._cassette = cassette
+        self._method = method
+        self._url = url
+        self._params = params
+
+    async def _send(self):
+        entry = self._cassette.play(self._method, self._url, self._params)
+        if self._cassette.replay_latency:
+            await asyncio.sleep(entry['duration'])
+        return ReplayResponse(self._method, entry['url'], entry)
+
+
+class ReplaySession(object):
+    """
+    Session which serves the recorded responses without any network traffic.
+    """
+    connector = None
+
+    def __init__(self, cassette):
+        self._cassette = cassette
+
+    def _request(self, method, url, params=None, **kwargs):
+        return _ReplayRequest(self._cassette, method, url, params)
+
+    def get(self, url, **kwargs):
+        return self._request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self._request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self._request('PUT', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self._request('DELETE', url, **kwargs)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    async def close(self):
+        pass
@@ -4,32 +4,369 @@ from typing import Any
 
 import aiohttp
 
+from keycloak.accounting import response_body_size
 from keycloak.aio.abc import AsyncInit
-from keycloak.client import KeycloakClient as SyncKeycloakClient
+from keycloak.aio.cassette import cassette_session_factory
+from keycloak.aio.pools import acquire, acquire_slot
+from keycloak.client import (
+    LEGACY_BASE_PATH, KeycloakClient as SyncKeycloakClient, Result,
+)
+from keycloak.concurrency import OVERLOAD_STATUSES
 from keycloak.exceptions import KeycloakClientError
+from keycloak.hooks import clock, endpoint
+from keycloak.nodes import FAILOVER_STATUSES, IDEMPOTENT_METHODS
 
 __all__ = (
     'KeycloakClient',
 )
 
 
+class _ObservedRequest(object):
+    """
+    Wraps a request context to keep track of the received response.
+    """
+    response = None
+    size = None
+
+    def __init__(self, req_ctx):
+        self._req_ctx = req_ctx
+
+    @property
+    def status(self):
+        return None if self.response is None else self.response.status
+
+    async def __aenter__(self):
+        self.response = await self._req_ctx.__aenter__()
+        return self.response
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self.response is not None:
+            # Reading the body here would read the ones which are skipped on
+            # purpose (e.g. of a DELETE with read_body=False)
+            body = getattr(self.response, '_body', None)
+            if isinstance(body, bytes):
+                self.size = len(body)
+            else:
+                self.size = response_body_size(self.response.headers)
+        return await self._req_ctx.__aexit__(exc_type, exc_val, exc_tb)
+
+
+class _WrappedRequest(object):
+    """
+    Request which is sent by the next `send` in line after a step of its own
+    (e.g. waiting for a slot), it can be awaited or used as async context
+    manager like the one returned by :class:`aiohttp.ClientSession`.
+
+    Subclasses implement :meth:`_send` and, when they hold something until
+    the response is released, :meth:`_release`.
+    """
+    _req_ctx = None
+
+    def __init__(self, send, url, **kwargs):
+        self._next = send
+        self._url = url
+        self._kwargs = kwargs
+
+    def __await__(self):
+        return self._request(enter=False).__await__()
+
+    async def __aenter__(self):
+        return await self._request(enter=True)
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        try:
+            return await self._req_ctx.__aexit__(exc_type, exc_val, exc_tb)
+        finally:
+            self._release(failed=exc_type is not None)
+
+    async def _request(self, enter):
+        try:
+            return await self._send(enter)
+        except BaseException:
+            self._release(failed=True)
+            raise
+        finally:
+            # An awaited response is released by the caller
+            if not enter:
+                self._release(failed=False)
+
+    async def _send(self, enter):
+        """
+        Send the request, the request context of the response must be kept
+        as `_req_ctx`.
+
+        :param bool enter: Enter the request context instead of awaiting it
+        :return: The response
+        """
+        raise NotImplementedError
+
+    def _release(self, failed):
+        """
+        Called when the response is released or the request failed, it can
+        be called more than once.
+
+        :param bool failed:
+        """
+
+    @staticmethod
+    def _enter(req_ctx, enter):
+        return req_ctx.__aenter__() if enter else req_ctx
+
+    def _open(self, send, enter):
+        self._req_ctx = send(self._url, **self._kwargs)
+        return self._enter(self._req_ctx, enter)
+
+
+class _FailoverRequest(_WrappedRequest):
+    """
+    Request which is sent to the fastest healthy node and fails over to the
+    next node.
+    """
+
+    def __init__(self, client, method, send, info, rotate, url, **kwargs):
+        super().__init__(send, url, **kwargs)
+        self._client = client
+        self._idempotent = method in IDEMPOTENT_METHODS
+        self._rotate = rotate
+        self._info = info
+
+    async def _send(self, enter):
+        nodes = self._client._nodes
+        matched = nodes.match(self._url)
+        if matched is None:
+            return await self._open(self._next, enter)
+
+        candidates = nodes.candidates(rotate=self._rotate)
+        for node in candidates:
+            last = node is candidates[-1]
+            url = nodes.rewrite(self._url, matched, node)
+            if self._info is not None:
+                self._info.url = url
+            req_ctx = self._next(url, **self._kwargs)
+            started = clock()
+            try:
+                response = await self._enter(req_ctx, enter)
+            except (aiohttp.ClientConnectionError,
+                    asyncio.TimeoutError) as exc:
+                nodes.failed(node)
+                not_sent = isinstance(exc, aiohttp.ClientConnectorError)
+                if last or not (self._idempotent or not_sent):
+                    raise
+                self._client.logger.warning(
+                    'Request to %s failed, failing over', node.url,
+                    exc_info=True
+                )
+            else:
+                self._req_ctx = req_ctx
+                if response.status not in FAILOVER_STATUSES:
+                    nodes.succeeded(node, clock() - started)
+                    return response
+                nodes.failed(node)
+                if last or not self._idempotent:
+                    return response
+                if enter:
+                    await req_ctx.__aexit__(None, None, None)
+                else:
+                    response.release()
+                self._client.logger.warning(
+                    'Node %s responded with %s, failing over', node.url,
+                    response.status
+                )
+            if self._info is not None:
+                self._info.retries += 1
+
+
+class _HedgedRequest(_WrappedRequest):
+    """
+    Request which is sent again when it's slower than the delay of the hedge
+    policy, the first response wins and the other request is cancelled.
+    """
+
+    def __init__(self, client, send, hedge_send, info, url, **kwargs):
+        super().__init__(send, url, **kwargs)
+        self._policy = client._hedging
+        self._hedge_send = hedge_send
+        self._info = info
+
+    def _start(self, send, enter):
+        req_ctx = send(self._url, **self._kwargs)
+        task = asyncio.ensure_future(self._enter(req_ctx, enter))
+        return task, req_ctx
+
+    async def _discard(self, task, req_ctx, enter):
+        if task.cancelled() or task.exception() is not None:
+            return
+        if enter:
+            await req_ctx.__aexit__(None, None, None)
+        else:
+            task.result().release()
+
+    async def _send(self, enter):
+        policy = self._policy
+        policy.requested()
+        delay = policy.delay()
+        started = clock()
+
+        if delay is None:
+            response = await self._open(self._next, enter)
+            policy.record(clock() - started)
+            return response
+
+        def record(task):
+            # The first request is measured also when it loses
+            if not task.cancelled() and task.exception() is None:
+                policy.record(clock() - started)
+
+        first, first_ctx = self._start(self._next, enter)
+        first.add_done_callback(record)
+        attempts = {first: first_ctx}
+        hedge = None
+
+        try:
+            done, pending = await asyncio.wait([first], timeout=delay)
+            if not done and policy.acquire():
+                if self._info is not None:
+                    self._info.hedged = True
+                hedge, hedge_ctx = self._start(self._hedge_send, enter)
+                attempts[hedge] = hedge_ctx
+                pending.add(hedge)
+
+            while not done:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                if pending and all(task.exception() is not None
+                                   for task in done):
+                    done = set()
+
+            winner = next((task for task in done
+                           if task.exception() is None), None)
+            if winner is None:
+                winner = first if first in done else done.pop()
+        except asyncio.CancelledError:
+            for task in attempts:
+                task.cancel()
+            raise
+
+        for task, req_ctx in attempts.items():
+            if task is winner:
+                continue
+            if task.done():
+                await self._discard(task, req_ctx, enter)
+            else:
+                task.cancel()
+
+        if winner is hedge:
+            policy.hedge_won()
+        self._req_ctx = attempts[winner]
+        return winner.result()
+
+
+class _ThrottledRequest(_WrappedRequest):
+    """
+    Request which waits for a token of the rate limiter before it's sent.
+    """
+
+    def __init__(self, client, send, info, name, url, **kwargs):
+        super().__init__(send, url, **kwargs)
+        self._limiter = client._rate_limiter
+        self._info = info
+        self._name = name
+
+    async def _send(self, enter):
+        wait = self._limiter.reserve(self._name)
+        if wait > 0:
+            if self._info is not None:
+                self._info.rate_limit_wait = wait
+            await asyncio.sleep(wait)
+        return await self._open(self._next, enter)
+
+
+class _PooledRequest(_WrappedRequest):
+    """
+    Request which waits for a connection slot of the pool of its traffic
+    class. The slot is released with the response.
+    """
+    _acquired = False
+
+    def __init__(self, client, send, name, url, **kwargs):
+        super().__init__(send, url, **kwargs)
+        self._pools = client._pools
+        self._name = name
+
+    async def _send(self, enter):
+        await acquire(self._pools, self._name)
+        self._acquired = True
+        return await self._open(self._next, enter)
+
+    def _release(self, failed):
+        if self._acquired:
+            self._acquired = False
+            self._pools.release(self._name)
+
+
+class _LimitedRequest(_WrappedRequest):
+    """
+    Request which waits for a slot of an adaptive concurrency limit. The
+    limit is adapted to the outcome of the request when the slot is released
+    with the response.
+    """
+    _started = None
+    _overloaded = True
+
+    def __init__(self, limit, send, url, **kwargs):
+        super().__init__(send, url, **kwargs)
+        self._limit = limit
+
+    async def _send(self, enter):
+        await acquire_slot(self._limit)
+        self._started = clock()
+        response = await self._open(self._next, enter)
+        self._overloaded = response.status in OVERLOAD_STATUSES
+        return response
+
+    def _release(self, failed):
+        if failed:
+            self._overloaded = True
+        if self._started is not None:
+            self._limit.record(clock() - self._started, self._overloaded)
+            self._started = None
+            self._limit.release()
+
+
 class KeycloakClient(AsyncInit, SyncKeycloakClient):
     _lock = None
     _loop = None
     _session_factory = None
 
     def __init__(self, server_url, *, headers, logger=None, loop=None,
-                 session_factory=aiohttp.client.ClientSession,
+                 session_factory=aiohttp.client.ClientSession, hooks=None,
+                 slow_call_threshold=None, slow_call_interval=60,
+                 cassette=None, lazy_json=False, hedging=None,
+                 rate_limiter=None, pools=None, concurrency_limiter=None,
+                 ssl_context=None, base_path=LEGACY_BASE_PATH,
                  **session_params):
 
-        super().__init__(server_url, headers=headers, logger=logger)
+        super().__init__(server_url, headers=headers, logger=logger,
+                         hooks=hooks, slow_call_threshold=slow_call_threshold,
+                         slow_call_interval=slow_call_interval,
+                         lazy_json=lazy_json, hedging=hedging,
+                         rate_limiter=rate_limiter, pools=pools,
+                         concurrency_limiter=concurrency_limiter,
+                         ssl_context=ssl_context, base_path=base_path)
 
         self._lock = asyncio.Lock()
+        self._base_path_lock = asyncio.Lock()
         self._loop = loop or asyncio.get_event_loop()
 
+        if cassette is not None:
+            session_factory = cassette_session_factory(cassette,
+                                                       session_factory)
+
         session_params['loop'] = self._loop
         session_params['headers'] = self._headers
         self._session_factory = partial(session_factory, **session_params)
+        self._has_connector = 'connector' in session_params
 
     @property
     def loop(self):
@@ -41,22 +378,230 @@ class KeycloakClient(AsyncInit, SyncKeycloakClient):
             raise RuntimeError
         return self._session
 
-    async def _handle_response(self, req_ctx) -> Any:
+    def pool_session(self, name):
+        """
+        Get the session of a traffic class, see
+        :class:`keycloak.pools.TrafficPools`.
+
+        :param str name: Traffic class
+        :rtype: aiohttp.ClientSession
+        """
+        session = self._pool_sessions.get(name)
+        if session is None:
+            raise RuntimeError
+        return session
+
+    def pool_stats(self):
+        """
+        Get the usage of the connection pools of the sessions, per host which
+        has connections.
+
+        :return: List of dicts with `pool`, `maxsize`, `in_use` and `idle`,
+            and the `traffic_class` for the pools of
+            :class:`keycloak.pools.TrafficPools`
+        :rtype: list
+        """
+        stats = []
+        sessions = [(None, self._session)]
+        sessions.extend(sorted(self._pool_sessions.items()))
+        for traffic_class, session in sessions:
+            connector = getattr(session, 'connector', None)
+            if connector is None:
+                continue
+            # One pool per host (e.g. per node of a cluster) like urllib3
+            pools = {}
+            for name, attribute in (('in_use', '_acquired_per_host'),
+                                    ('idle', '_conns')):
+                for key, conns in getattr(connector, attribute, {}).items():
+                    pool = '{}://{}:{}'.format(
+                        'https' if getattr(key, 'is_ssl', False) else 'http',
+                        key.host, key.port
+                    )
+                    pool_stats = pools.setdefault(pool, {
+                        'pool': pool,
+                        'maxsize': connector.limit_per_host or
+                        connector.limit,
+                        'in_use': 0,
+                        'idle': 0,
+                    })
+                    pool_stats[name] += len(conns)
+            for pool in sorted(pools):
+                pool_stats = pools[pool]
+                if traffic_class is not None:
+                    pool_stats['traffic_class'] = traffic_class
+                stats.append(pool_stats)
+        return stats
+
+    async def open_connections(self, count, url=None):
+        """
+        Open connections to the server ahead of time, so the first requests
+        don't have to wait for the TCP and TLS handshakes.
+
+        The connections are opened by sending `count` concurrent HEAD
+        requests, their responses are ignored. With traffic class pools the
+        connections are opened for the session of every traffic class as
+        well.
+
+        :param int count: Number of concurrent connections to open per pool
+        :param str url: (optional) URL on the server to connect to, defaults
+            to the server URL
+        :return: Number of idle connections which were added to the pools
+        :rtype: int
+        """
+        url = url or self._server_url
+        sessions = [self.session]
+        if self._pools is not None:
+            sessions.extend(self.pool_session(name)
+                            for name in self._pools.names())
+        opened = await asyncio.gather(*[
+            self._open_connections(session, count, url)
+            for session in sessions
+        ])
+        return sum(opened)
+
+    async def _open_connections(self, session, count, url):
+        connector = getattr(session, 'connector', None)
+        if connector is None:
+            # E.g. a cassette which replays the responses
+            return 0
+
+        def idle():
+            return sum(len(conns) for conns in
+                       getattr(connector, '_conns', {}).values())
+
+        async def head():
+            try:
+                async with session.head(url, allow_redirects=False):
+                    pass
+            except Exception:
+                self.logger.warning('Could not open connection to %s', url,
+                                    exc_info=True)
+
+        before = idle()
+        await asyncio.gather(*[head() for _ in range(count)])
+        return max(0, idle() - before)
+
+    def _failover(self, method, send, info, rotate=False):
+        return partial(_FailoverRequest, self, method, send, info, rotate)
+
+    def _hedge(self, send, hedge_send, info):
+        return partial(_HedgedRequest, self, send, hedge_send, info)
+
+    def _throttle(self, send, info, name):
+        return partial(_ThrottledRequest, self, send, info, name)
+
+    def _pooled(self, send, name):
+        return partial(_PooledRequest, self, send, name)
+
+    def _limit(self, send, limit):
+        return partial(_LimitedRequest, limit, send)
+
+    async def _observe(self, info, send, url, kwargs, handler):
+        self._dispatch_hook('request', info)
+
+        req_ctx = _ObservedRequest(send(url, **kwargs))
+        try:
+            result = await handler(req_ctx)
+        except KeycloakClientError:
+            info.finish(status=req_ctx.status)
+            info.response_size = req_ctx.size
+            self._dispatch_hook('response', info)
+            raise
+        except Exception as exc:
+            self._dispatch_hook('error', info.finish(exception=exc))
+            raise
+        info.finish(status=req_ctx.status)
+        info.response_size = req_ctx.size
+        self._dispatch_hook('response', info)
+        return result
+
+    async def _raise_for_status(self, response):
+        try:
+            response.raise_for_status()
+        except aiohttp.client.ClientResponseError as cre:
+            text = await response.text(errors='replace')
+            self.logger.debug('{cre}; '
+                              'Request info: {cre.request_info}; '
+                              'Response headers: {cre.headers}; '
+                              'Response status: {cre.status}; '
+                              'Content: {text}'.format(cre=cre, text=text))
+            raise KeycloakClientError(original_exc=cre)
+
+    def delete(self, url, headers, read_body=True, **kwargs):
+        """
+        See :meth:`keycloak.client.KeycloakClient.delete`, a body which isn't
+        kept is never read.
+
+        :param str url:
+        :param dict headers:
+        :param bool read_body: (optional) Keep the body in the result
+        :rtype: Result
+        :raises KeycloakClientError: When the response has an error status
+        """
+        return self._request('DELETE', url,
+                             handler=partial(self._handle_result,
+                                             read_body=read_body),
+                             headers=headers, **kwargs)
+
+    @endpoint('discovery.base_path')
+    async def detect_base_path(self, realm_name):
+        """
+        See :meth:`keycloak.client.KeycloakClient.detect_base_path`.
+
+        :param str realm_name: Realm to request the document of
+        :return: The base path, None when it's not known
+        :rtype: str
+        """
+        if self._base_path is not None or not self._may_detect_base_path():
+            return self._base_path
+
+        async with self._base_path_lock:
+            if self._base_path is None and self._may_detect_base_path():
+                self._base_path_failed = clock()
+                for base_path, url in self._base_path_probes(realm_name):
+                    status = await self._request('GET', url,
+                                                 handler=self._handle_status,
+                                                 allow_redirects=False)
+                    if status == 200:
+                        self._base_path = base_path
+                        break
+                else:
+                    self.logger.warning('Could not detect the base path of '
+                                        '%s, using "%s"', self._server_url,
+                                        LEGACY_BASE_PATH)
+        return self._base_path
+
+    async def _handle_status(self, req_ctx):
+        async with req_ctx as response:
+            return response.status
+
+    async def _handle_result(self, req_ctx, read_body=True) -> Result:
         """
         :param aiohttp.client._RequestContextManager req_ctx
+        :param bool read_body: Read the body, when it's not read the
+            connection is only reused when the body is empty
         :return:
         """
         async with req_ctx as response:
-            try:
-                response.raise_for_status()
-            except aiohttp.client.ClientResponseError as cre:
-                text = await response.text(errors='replace')
-                self.logger.debug('{cre}; '
-                                  'Request info: {cre.request_info}; '
-                                  'Response headers: {cre.headers}; '
-                                  'Response status: {cre.status}; '
-                                  'Content: {text}'.format(cre=cre, text=text))
-                raise KeycloakClientError(original_exc=cre)
+            await self._raise_for_status(response)
+            content = await response.read() if read_body else None
+            return Result(response.status, response.headers, content)
+
+    async def _handle_response(self, req_ctx, lazy=False) -> Any:
+        """
+        :param aiohttp.client._RequestContextManager req_ctx
+        :param bool lazy: (optional) Return JSON objects and arrays as lazy
+            views
+        :return:
+        """
+        async with req_ctx as response:
+            await self._raise_for_status(response)
+
+            if lazy:
+                from keycloak.lazy_json import is_json_container, lazy_json
+                content = await response.read()
+                if is_json_container(content):
+                    return lazy_json(content)
 
             try:
                 result = await response.json(content_type=None)
@@ -68,11 +613,34 @@ class KeycloakClient(AsyncInit, SyncKeycloakClient):
     async def __async_init__(self) -> 'KeycloakClient':
         async with self._lock:
             if self._session is None:
-                self._session = self._session_factory()
+                if self._ssl_context is None or self._has_connector:
+                    self._session = self._session_factory()
+                else:
+                    self._session = self._session_factory(
+                        connector=self._connector()
+                    )
                 await self._session.__aenter__()
+                if self._pools is not None:
+                    for name in self._pools.names():
+                        session = self._session_factory(
+                            connector=self._connector(
+                                limit=self._pools.limits(name).maxsize
+                            )
+                        )
+                        self._pool_sessions[name] = \
+                            await session.__aenter__()
         return self
 
+    def _connector(self, **kwargs):
+        if self._ssl_context is not None:
+            kwargs['ssl'] = self._ssl_context
+        return aiohttp.TCPConnector(**kwargs)
+
     async def close(self) -> None:
+        pool_sessions = list(self._pool_sessions.values())
+        self._pool_sessions = {}
+        for session in pool_sessions:
+            await session.close()
         if self._session is not None:
             await self._session.close()
             self._session = None
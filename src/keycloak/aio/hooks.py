@@ -0,0 +1,29 @@
+import functools
+
+from keycloak import tracing
+from keycloak.aio.tracing import end_span_after
+from keycloak.hooks import _reset_endpoint, _set_endpoint
+
+__all__ = (
+    'async_endpoint',
+)
+
+
+def async_endpoint(name, func):
+    """
+    Coroutine counterpart of :func:`keycloak.hooks.endpoint`.
+
+    :param str name: Templated endpoint name
+    :param func: Coroutine function to decorate
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        token = _set_endpoint(name)
+        try:
+            if tracing.tracer is None:
+                return await func(*args, **kwargs)
+            span = tracing.start_call_span(name, func, args)
+            return await end_span_after(span, func(*args, **kwargs))
+        finally:
+            _reset_endpoint(token)
+    return wrapper
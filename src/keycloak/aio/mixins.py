@@ -18,13 +18,17 @@ class WellKnownMixin(AsyncInit, SyncWellKnownMixin):
         return self._well_known
 
     async def __async_init__(self) -> 'WellKnownMixin':
+        # Only held while creating the object, fetching the contents is
+        # locked by the object itself. So the .well-known documents of
+        # different objects on the same realm can be fetched concurrently.
         async with self._realm._lock:
             if self._well_known is None:
                 p = self.get_path_well_known().format(self._realm.realm_name)
-                self._well_known = await KeycloakWellKnown(
+                self._well_known = KeycloakWellKnown(
                     realm=self._realm,
                     path=self._realm.client.get_full_url(p)
                 )
+        await self._well_known
         return self
 
     async def close(self):
@@ -1,4 +1,6 @@
+from keycloak.aio.cache import get_or_fetch
 from keycloak.aio.mixins import WellKnownMixin
+from keycloak.hooks import endpoint
 from keycloak.openid_connect import (
     KeycloakOpenidConnect as SyncKeycloakOpenidConnect,
     PATH_WELL_KNOWN,
@@ -12,3 +14,17 @@ __all__ = (
 class KeycloakOpenidConnect(WellKnownMixin, SyncKeycloakOpenidConnect):
     def get_path_well_known(self):
         return PATH_WELL_KNOWN
+
+    @endpoint('discovery.jwks')
+    async def certs(self):
+        """
+        The certificate endpoint returns the public keys enabled by the realm,
+        encoded as a JSON Web Key (JWK).
+
+        When the realm has a cache the keys are cached as well.
+
+        :rtype: dict
+        """
+        url = self.get_url('jwks_uri')
+        return await get_or_fetch(self._realm.cache, url,
+                                  lambda: self._realm.client.get(url))
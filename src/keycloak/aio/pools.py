@@ -0,0 +1,50 @@
+import asyncio
+
+__all__ = (
+    'acquire',
+    'acquire_slot',
+)
+
+
+def _grant(future):
+    if not future.done():
+        future.set_result(None)
+
+
+async def acquire(pools, name):
+    """
+    Take a connection slot of the pool of a traffic class, waits for one
+    in the event loop when they are all in use.
+
+    :param keycloak.pools.TrafficPools pools:
+    :param str name: Traffic class
+    :raises keycloak.exceptions.PoolExhausted: When too many requests are
+        waiting or the timeout of the pool passed
+    """
+    await acquire_slot(pools.pool(name))
+
+
+async def acquire_slot(slots):
+    """
+    Take a slot, waits for one in the event loop when they are all in use.
+
+    :param keycloak.pools.Slots slots: E.g. the pool of a traffic class
+    :raises keycloak.exceptions.PoolExhausted: When too many requests are
+        waiting or the timeout of the slots passed
+    """
+    loop = asyncio.get_event_loop()
+    future = loop.create_future()
+    # A slot can be released by another thread (or loop)
+    waiter = slots.enter(lambda: loop.call_soon_threadsafe(_grant, future))
+    if waiter is None:
+        return
+
+    try:
+        await asyncio.wait_for(asyncio.shield(future), slots.limits.timeout)
+    except asyncio.TimeoutError:
+        if slots.cancel(waiter):
+            raise slots.timed_out()
+    except asyncio.CancelledError:
+        if not slots.cancel(waiter, timeout=False):
+            slots.release()
+        raise
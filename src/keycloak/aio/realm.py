@@ -4,8 +4,10 @@ from keycloak.aio.abc import AsyncInit
 from keycloak.aio.authz import KeycloakAuthz
 from keycloak.aio.client import KeycloakClient
 from keycloak.aio.openid_connect import KeycloakOpenidConnect
+from keycloak.aio.snapshot import fetch_snapshot, revalidate_snapshot
 from keycloak.aio.uma import KeycloakUMA
 from keycloak.realm import KeycloakRealm as SyncKeycloakRealm
+from keycloak.snapshot import Snapshot
 
 __all__ = (
     'KeycloakRealm',
@@ -15,6 +17,7 @@ __all__ = (
 class KeycloakRealm(AsyncInit, SyncKeycloakRealm):
     _lock = None
     _loop = None
+    _revalidation = None
 
     def __init__(self, *args, loop=None, **kwargs):
         self.client_class = kwargs.pop('client_class', KeycloakClient)
@@ -33,6 +36,9 @@ class KeycloakRealm(AsyncInit, SyncKeycloakRealm):
             raise RuntimeError
         return self._client
 
+    def _get_client(self):
+        return self.client
+
     def open_id_connect(self, client_id, client_secret):
         """
         Get OpenID Connect client
@@ -60,17 +66,114 @@ class KeycloakRealm(AsyncInit, SyncKeycloakRealm):
         """
         return KeycloakUMA(realm=self)
 
+    async def warmup(self, connections=1, cache=None):
+        """
+        Prepare the realm for traffic, e.g. from a readiness probe.
+
+        The OpenID Connect and UMA2 .well-known documents are fetched
+        concurrently, the JWKS as soon as the OpenID Connect document is
+        known, while the requested number of pooled connections are opened.
+
+        The documents are stored in the cache of the realm. Without a cache
+        they are only fetched to check that Keycloak can be reached, the
+        first requests fetch them again.
+
+        :param int connections: (optional) Number of connections to open
+            ahead of time
+        :param keycloak.cache.BaseCache cache: (optional) Cache for the realm
+            when it has none, e.g. a :class:`keycloak.cache.MemoryCache`
+        :return: The fetched documents (`openid_configuration`,
+            `uma2_configuration` and `jwks`) and the number of opened
+            `connections`
+        :rtype: dict
+        """
+        if self._cache is None:
+            self._cache = cache
+        if self.client.base_path is None:
+            await self._detect_base_path(self.client)
+
+        async def fetch_openid_connect():
+            openid_connect = await self.open_id_connect(client_id=None,
+                                                        client_secret=None)
+            return (openid_connect.well_known.contents,
+                    await openid_connect.certs())
+
+        async def fetch_uma2():
+            uma = await self.uma()
+            return uma.well_known.contents
+
+        (openid_configuration, jwks), uma2_configuration, opened = \
+            await asyncio.gather(fetch_openid_connect(), fetch_uma2(),
+                                 self.client.open_connections(connections))
+        return {
+            'openid_configuration': openid_configuration,
+            'uma2_configuration': uma2_configuration,
+            'jwks': jwks,
+            'connections': opened,
+        }
+
+    async def export_snapshot(self, path):
+        """
+        Write the .well-known documents and the JWKS of the realm to a
+        snapshot file, see :mod:`keycloak.snapshot`.
+
+        :param str path:
+        :rtype: keycloak.snapshot.Snapshot
+        """
+        snapshot = await fetch_snapshot(self)
+        snapshot.dump(path)
+        return snapshot
+
+    def load_snapshot(self, path, revalidate=True, retry_interval=30):
+        """
+        Use the documents of a snapshot file instead of fetching them from
+        Keycloak. The documents are put in the cache of the realm.
+
+        :param str path:
+        :param bool revalidate: (optional) Fetch fresh documents in a
+            background task, while Keycloak can't be reached the documents
+            of the snapshot are kept.
+        :param float retry_interval: (optional) Seconds between two
+            revalidation attempts
+        :rtype: keycloak.snapshot.Snapshot
+        """
+        snapshot = Snapshot.load(path)
+        snapshot.install(self)
+        if revalidate:
+            self._revalidation = self._loop.create_task(
+                revalidate_snapshot(snapshot, self, retry_interval)
+            )
+        return snapshot
+
+    async def _detect_base_path(self, client):
+        """
+        Detect the base path of the server with this realm, see
+        :meth:`keycloak.client.KeycloakClient.detect_base_path`. Until it's
+        known the legacy base path is used, :meth:`warmup` tries again.
+        """
+        try:
+            await client.detect_base_path(self._realm_name)
+        except Exception:
+            client.logger.warning('Could not detect the base path of %s',
+                                  client.server_url, exc_info=True)
+
     async def __async_init__(self) -> 'KeycloakRealm':
         async with self._lock:
             if self._client is None:
                 self._client = await self.client_class(
                     server_url=self._server_url,
                     headers=self._headers,
-                    loop=self._loop
+                    loop=self._loop,
+                    **self._client_params
                 )
+        if self._client.base_path is None:
+            await self._detect_base_path(self._client)
         return self
 
     async def close(self):
-        if self._client is not None:
+        if self._revalidation is not None:
+            self._revalidation.cancel()
+            self._revalidation = None
+        if self._client is not None and self._owns_client:
             await self._client.close()
             self._client = None
@@ -0,0 +1,71 @@
+import asyncio
+
+from keycloak.aio.abc import AsyncInit
+from keycloak.aio.client import KeycloakClient
+from keycloak.aio.realm import KeycloakRealm
+from keycloak.registry import (
+    KeycloakRealmRegistry as SyncKeycloakRealmRegistry,
+)
+
+__all__ = (
+    'KeycloakRealmRegistry',
+)
+
+
+class KeycloakRealmRegistry(AsyncInit, SyncKeycloakRealmRegistry):
+    realm_class = KeycloakRealm
+    client_class = KeycloakClient
+
+    def __init__(self, max_realms=None, headers=None, cache=None, *,
+                 loop=None, **client_params):
+        super().__init__(max_realms=max_realms, headers=headers,
+                         cache=cache, **client_params)
+        self._loop = loop or asyncio.get_event_loop()
+        self._lock = asyncio.Lock()
+
+    async def get(self, server_url, realm_name):
+        """
+        Get the realm, it's created when it's not registered yet.
+
+        :param str | tuple server_url: Base URL, or the base URLs of the
+            nodes of a cluster
+        :param str realm_name:
+        :rtype: keycloak.aio.realm.KeycloakRealm
+        """
+        if isinstance(server_url, list):
+            server_url = tuple(server_url)
+        key = (server_url, realm_name)
+        async with self._lock:
+            realm = self._realms.pop(key, None)
+            if realm is None:
+                realm = await self.realm_class(
+                    server_url, realm_name, headers=self._headers,
+                    client=await self._get_client(server_url),
+                    cache=self._cache, loop=self._loop
+                )
+            self._realms[key] = realm
+            self._evict()
+        return realm
+
+    async def _get_client(self, server_url):
+        client = self._clients.get(server_url)
+        if client is None:
+            client = self._clients[server_url] = await self.client_class(
+                server_url=server_url,
+                headers=self._headers,
+                loop=self._loop,
+                **self._client_params
+            )
+        return client
+
+    async def __async_init__(self) -> 'KeycloakRealmRegistry':
+        return self
+
+    async def close(self):
+        async with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._realms.clear()
+
+        for client in clients:
+            await client.close()
@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+from keycloak.snapshot import DOCUMENTS, FETCHERS, Snapshot, logger
+
+__all__ = (
+    'fetch_snapshot',
+    'revalidate_snapshot',
+)
+
+
+async def fetch_snapshot(realm) -> Snapshot:
+    """
+    Fetch the metadata of a realm.
+
+    :param keycloak.aio.realm.KeycloakRealm realm:
+    :rtype: keycloak.snapshot.Snapshot
+    """
+    return Snapshot.from_documents(realm, await realm.warmup(connections=0))
+
+
+async def refresh_snapshot(snapshot, realm):
+    """
+    Fetch the documents from Keycloak and put them in the cache of the realm.
+
+    :param keycloak.snapshot.Snapshot snapshot:
+    :param keycloak.aio.realm.KeycloakRealm realm:
+    """
+    for name, endpoint_name in DOCUMENTS:
+        url = snapshot.document_url(name)
+        snapshot.documents[name] = {
+            'url': url,
+            'document': await FETCHERS[endpoint_name](realm, url),
+        }
+    snapshot.install(realm)
+
+
+async def revalidate_snapshot(snapshot, realm, retry_interval=30):
+    """
+    Refresh the documents until it succeeds. While Keycloak can't be reached
+    the documents of the snapshot are kept in the cache.
+
+    :param keycloak.snapshot.Snapshot snapshot:
+    :param keycloak.aio.realm.KeycloakRealm realm:
+    :param float retry_interval: (optional) Seconds between two attempts
+    """
+    while True:
+        try:
+            await refresh_snapshot(snapshot, realm)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.warning('Could not revalidate the snapshot of realm "%s", '
+                           'retrying in %ss', snapshot.realm_name,
+                           retry_interval, exc_info=True)
+            snapshot.install(realm)
+            await asyncio.sleep(retry_interval)
+        else:
+            snapshot.created = time.time()
+            snapshot.revalidated.set()
+            return
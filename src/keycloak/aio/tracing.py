@@ -0,0 +1,17 @@
+__all__ = (
+    'end_span_after',
+)
+
+
+async def end_span_after(span, awaitable):
+    """
+    Await `awaitable` with `span` as the current span and end the span
+    afterwards.
+
+    :param opentelemetry.trace.Span span:
+    :param awaitable:
+    """
+    from opentelemetry import trace
+
+    with trace.use_span(span, end_on_exit=True):
+        return await awaitable
@@ -1,15 +1,21 @@
 import asyncio
+import logging
 
 from keycloak.aio.abc import AsyncInit
+from keycloak.aio.cache import get_or_fetch
+from keycloak.hooks import endpoint
 from ..well_known import KeycloakWellKnown as SyncKeycloakWellKnown
 
 __all__ = (
     'KeycloakWellKnown',
 )
 
+logger = logging.getLogger(__name__)
+
 
 class KeycloakWellKnown(AsyncInit, SyncKeycloakWellKnown):
     _lock = None
+    _refreshing = None
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -17,18 +23,49 @@ class KeycloakWellKnown(AsyncInit, SyncKeycloakWellKnown):
 
     @property
     def contents(self):
+        """
+        The .well-known document which was fetched on initialization. When
+        the realm has a cache it's looked up in the cache on every access,
+        an expired document is refreshed in a task while the last one is
+        returned.
+
+        :rtype: dict
+        """
         if self._contents is None:
             raise RuntimeError
+        if self._cached:
+            contents = self._realm.cache.get(self._path)
+            if contents is None:
+                self._refresh()
+            else:
+                self._contents = contents
         return self._contents
 
     @contents.setter
     def contents(self, content):
+        # Given contents are never refreshed
         self._contents = content
+        self._static = True
+
+    def _refresh(self):
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.ensure_future(self._update())
+
+    async def _update(self):
+        try:
+            self._contents = await self._fetch()
+        except Exception:
+            logger.warning('Could not refresh %s', self._path, exc_info=True)
+
+    @endpoint('discovery.well_known')
+    async def _fetch(self):
+        return await get_or_fetch(self._realm.cache, self._path,
+                                  lambda: self._realm.client.get(self._path))
 
     async def __async_init__(self) -> 'KeycloakWellKnown':
         async with self._lock:
             if self._contents is None:
-                self._contents = await self._realm.client.get(self._path)
+                self._contents = await self._fetch()
         return self
 
     async def close(self):
@@ -7,6 +7,7 @@ try:
 except ImportError:
     from urllib import urlencode  # noqa: F401
 
+from keycloak.hooks import endpoint
 from keycloak.mixins import WellKnownMixin
 from keycloak.exceptions import KeycloakClientError
 
@@ -34,6 +35,7 @@ class KeycloakAuthz(WellKnownMixin, object):
     def get_path_well_known(self):
         return PATH_WELL_KNOWN
 
+    @endpoint('authz.entitlement')
     def entitlement(self, token):
         """
         Client applications can use a specific endpoint to obtain a special
@@ -65,6 +67,7 @@ class KeycloakAuthz(WellKnownMixin, object):
             token += '=' * (4 - missing_padding)
         return json.loads(base64.b64decode(token).decode('utf-8'))
 
+    @endpoint('authz.permissions')
     def get_permissions(self, token, resource_scopes_tuples=None,
                         submit_request=False, ticket=None):
         """
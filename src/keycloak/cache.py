@@ -0,0 +1,565 @@
+"""
+Cache backends for data which is fetched from Keycloak, like the .well-known
+documents and the JWKS.
+
+A backend implements :class:`BaseCache`. Values are JSON serializable data,
+``None`` is never stored and means "not cached".
+"""
+import errno
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+
+from keycloak.hooks import clock
+
+try:
+    from contextvars import copy_context
+except ImportError:
+    copy_context = None
+
+__all__ = (
+    'BaseCache',
+    'FileCache',
+    'MemoryCache',
+    'RedisCache',
+    'SingleFlight',
+    'StaleCache',
+    'get_or_fetch',
+)
+
+logger = logging.getLogger(__name__)
+
+
+def dumps(value):
+    from keycloak.lazy_json import json_default
+    return json.dumps(value, default=json_default, separators=(',', ':'))
+
+
+class _Call(object):
+    __slots__ = ('done', 'value', 'exception')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.exception = None
+
+
+class SingleFlight(object):
+    """
+    Runs only one call per key at a time: the first thread which asks for a
+    key calls the function, threads which ask for the same key in the
+    meantime wait for its result (or exception) instead of calling it again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func):
+        """
+        :param str key:
+        :param callable func: Called without arguments
+        :return: The result of the call for the key
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.exception is not None:
+                raise call.exception
+            return call.value
+
+        return self._run(key, call, func)
+
+    def reset(self):
+        """
+        Forget the calls in flight, e.g. in a forked child process where the
+        threads which run them don't exist.
+        """
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def start(self, key, func):
+        """
+        Call the function in a daemon thread, unless a call for the key is
+        in flight already. Threads which ask for the key in the meantime
+        wait for its result like for any other call.
+
+        :param str key:
+        :param callable func: Called without arguments
+        :return: True when a call was started
+        :rtype: bool
+        """
+        with self._lock:
+            if key in self._calls:
+                return False
+            call = self._calls[key] = _Call()
+
+        def run():
+            try:
+                self._run(key, call, func)
+            except Exception:
+                pass  # Raised to the waiting threads, if any
+
+        # Keep the context (e.g. the endpoint for the hooks) of the caller
+        target = run if copy_context is None else \
+            partial(copy_context().run, run)
+        thread = threading.Thread(target=target, name='keycloak-fetch')
+        thread.daemon = True
+        thread.start()
+        return True
+
+    def _run(self, key, call, func):
+        try:
+            call.value = func()
+        except Exception as exc:
+            call.exception = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value
+
+
+#: Fetches which are in flight, by cache and key
+_flights = SingleFlight()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_flights.reset)
+
+
+def _flight_key(cache, key):
+    # Caches which are fetched into at the same time (e.g. of two realms)
+    # each get their own fetch, so every one of them gets the value. The
+    # cache is referenced by the fetch, its id isn't reused while it runs.
+    return '{}:{}'.format(id(cache), key)
+
+
+def get_or_fetch(cache, key, fetch):
+    """
+    Get a value from the cache, when it's missing it's fetched and stored.
+
+    Concurrent fetches of the same key (e.g. of many threads at startup or
+    when an entry expires) are combined into one, also without a cache.
+
+    With a :class:`StaleCache` an expired value is returned while it's
+    refreshed in the background, or when refreshing it fails, as long as it
+    is within the stale windows of the cache.
+
+    :param BaseCache cache: Cache or None to always fetch
+    :param str key:
+    :param callable fetch: Called without arguments to get the value
+    """
+    flight = _flight_key(cache, key)
+    if cache is None:
+        return _flights.do(flight, fetch)
+
+    if isinstance(cache, StaleCache):
+        value, staleness = cache.lookup(key)
+    else:
+        value, staleness = cache.get(key), None
+    if value is not None and not staleness:
+        return value
+
+    def fetch_and_store():
+        # A fetch which finished after the lookup above already stored it
+        value = cache.get(key)
+        if value is None:
+            value = fetch()
+            cache.set(key, value)
+        return value
+
+    if value is None:
+        return _flights.do(flight, fetch_and_store)
+
+    if staleness <= cache.stale_while_revalidate:
+        if _flights.start(flight, partial(_revalidate, cache, key,
+                                          fetch_and_store)):
+            cache.revalidating(key)
+        cache.served_stale(key, staleness)
+        return value
+
+    try:
+        return _flights.do(flight, fetch_and_store)
+    except Exception:
+        cache.refresh_failed(key)
+        if staleness > cache.stale_if_error:
+            raise
+        logger.warning('Could not refresh %s, serving a copy which is %.0fs '
+                       'stale', key, staleness, exc_info=True)
+        cache.served_stale(key, staleness)
+        return value
+
+
+def _revalidate(cache, key, fetch_and_store):
+    try:
+        return fetch_and_store()
+    except Exception:
+        cache.refresh_failed(key)
+        logger.warning('Could not refresh %s in the background', key,
+                       exc_info=True)
+        raise
+
+
+class BaseCache(object):
+    """
+    Interface of a cache backend.
+    """
+
+    def get(self, key):
+        """
+        :param str key:
+        :return: Cached value or None when it's missing or expired
+        """
+        raise NotImplementedError()
+
+    def set(self, key, value, ttl=None):
+        """
+        :param str key:
+        :param value: JSON serializable value
+        :param float ttl: (optional) Seconds to keep the value, defaults to
+            the TTL of the backend
+        """
+        raise NotImplementedError()
+
+    def delete(self, key):
+        """
+        :param str key:
+        """
+        raise NotImplementedError()
+
+    def clear(self):
+        raise NotImplementedError()
+
+
+class MemoryCache(BaseCache):
+    """
+    Bounded in-process cache, the least recently used entry is evicted when
+    it's full.
+    """
+
+    def __init__(self, maxsize=256, ttl=300):
+        """
+        :param int maxsize: (optional) Maximum number of entries
+        :param float ttl: (optional) Default number of seconds to keep an
+            entry, None keeps it until it's evicted.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            try:
+                expires, value = self._entries.pop(key)
+            except KeyError:
+                return None
+            if expires is not None and expires <= clock():
+                return None
+            self._entries[key] = (expires, value)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires = None if ttl is None else clock() + ttl
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (expires, value)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class FileCache(BaseCache):
+    """
+    Cache which stores every entry as a JSON file in a directory, so it's
+    shared by all processes (e.g. the workers of a gunicorn server) on a
+    host.
+
+    Files are replaced atomically, a reader never sees a partial entry.
+    """
+
+    def __init__(self, directory, ttl=300):
+        """
+        :param str directory: Directory for the cache files, it's created
+            when it doesn't exist
+        :param float ttl: (optional) Default number of seconds to keep an
+            entry, None keeps it until it's deleted
+        """
+        self.directory = directory
+        self.ttl = ttl
+        try:
+            os.makedirs(directory)
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
+
+    def _path(self, key):
+        import hashlib
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest + '.json')
+
+    def get(self, key):
+        try:
+            with open(self._path(key)) as entry_file:
+                entry = json.load(entry_file)
+        except (IOError, OSError, ValueError):
+            return None
+
+        if entry['key'] != key:
+            return None
+        if entry['expires'] is not None and entry['expires'] <= time.time():
+            return None
+        return entry['value']
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        content = dumps({
+            'key': key,
+            'expires': None if ttl is None else time.time() + ttl,
+            'value': value,
+        })
+
+        import tempfile
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as entry_file:
+                entry_file.write(content)
+            getattr(os, 'replace', os.rename)(temp_path, self._path(key))
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError as exc:
+            if exc.errno != errno.ENOENT:
+                raise
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+
+class RedisCache(BaseCache):
+    """
+    Cache in Redis, or any other store with a client which implements the
+    `get`, `set` (with `ex`), `delete` and `scan_iter` methods of
+    `redis-py <https://github.com/redis/redis-py>`_.
+    """
+
+    def __init__(self, client, prefix='keycloak:', ttl=300):
+        """
+        :param redis.Redis client:
+        :param str prefix: (optional) Prefix for all keys
+        :param float ttl: (optional) Default number of seconds to keep an
+            entry, None keeps it until it's deleted
+        """
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            return None
+        if isinstance(value, bytes):
+            value = value.decode('utf-8')
+        return json.loads(value)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        self.client.set(self.prefix + key, dumps(value),
+                        ex=None if ttl is None else int(max(1, ttl)))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+
+class StaleCache(BaseCache):
+    """
+    Wraps another cache backend to serve entries for a while after they
+    expired: ``stale-while-revalidate`` and ``stale-if-error`` of
+    `RFC 5861 <https://tools.ietf.org/html/rfc5861>`_.
+
+    An entry which expired less than `stale_while_revalidate` seconds ago is
+    returned right away and refreshed in the background. An older entry is
+    refreshed first, but when that fails (e.g. while Keycloak is down) it's
+    still returned until it expired `stale_if_error` seconds ago.
+
+    .. code-block:: python
+
+        cache = StaleCache(MemoryCache(ttl=300), stale_while_revalidate=60,
+                           stale_if_error=3600)
+
+    Entries are stored in the wrapped cache with the time they expire, so
+    they are kept by the wrapped cache for the TTL plus the longest stale
+    window. How stale the served entries are is available from
+    :meth:`stats` and :class:`keycloak.metrics.MetricsCollector`.
+    """
+
+    def __init__(self, cache, stale_while_revalidate=60, stale_if_error=3600):
+        """
+        :param BaseCache cache: Cache to store the entries in
+        :param float stale_while_revalidate: (optional) Seconds after an
+            entry expired to return it while it's refreshed in the background
+        :param float stale_if_error: (optional) Seconds after an entry
+            expired to return it when refreshing it fails
+        """
+        self.cache = cache
+        self.stale_while_revalidate = stale_while_revalidate
+        self.stale_if_error = stale_if_error
+        self._lock = threading.Lock()
+        self._stale_since = {}
+        self._stats = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        return self.cache.ttl
+
+    def lookup(self, key):
+        """
+        :param str key:
+        :return: Tuple of the cached value (None when it's missing) and the
+            number of seconds since it expired (0 when it's fresh)
+        :rtype: tuple
+        """
+        entry = self.cache.get(key)
+        if entry is None:
+            return None, None
+
+        fresh_until = entry['fresh_until']
+        staleness = 0 if fresh_until is None else \
+            max(0, time.time() - fresh_until)
+        if not staleness and key in self._stale_since:
+            # Refreshed by another process which shares the cache
+            with self._lock:
+                self._stale_since.pop(key, None)
+        return entry['value'], staleness
+
+    def get(self, key):
+        value, staleness = self.lookup(key)
+        return None if staleness else value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.cache.ttl if ttl is None else ttl
+        if ttl is None:
+            fresh_until = None
+        else:
+            fresh_until = time.time() + ttl
+            ttl += max(self.stale_while_revalidate, self.stale_if_error)
+        self.cache.set(key, {'fresh_until': fresh_until, 'value': value},
+                       ttl=ttl)
+        with self._lock:
+            self._stale_since.pop(key, None)
+
+    def delete(self, key):
+        self.cache.delete(key)
+        with self._lock:
+            self._stale_since.pop(key, None)
+
+    def clear(self):
+        self.cache.clear()
+        with self._lock:
+            self._stale_since.clear()
+
+    def _count(self, key, name):
+        try:
+            stats = self._stats[key]
+        except KeyError:
+            stats = self._stats[key] = {
+                'served_stale': 0, 'revalidations': 0, 'refresh_errors': 0,
+            }
+        stats[name] += 1
+
+    def served_stale(self, key, staleness):
+        """
+        Count an expired entry which was returned.
+
+        :param str key:
+        :param float staleness: Seconds since the entry expired
+        """
+        with self._lock:
+            self._count(key, 'served_stale')
+            self._stale_since.setdefault(key, time.time() - staleness)
+
+    def revalidating(self, key):
+        """
+        Count a refresh in the background.
+
+        :param str key:
+        """
+        with self._lock:
+            self._count(key, 'revalidations')
+
+    def refresh_failed(self, key):
+        """
+        Count a failed refresh.
+
+        :param str key:
+        """
+        with self._lock:
+            self._count(key, 'refresh_errors')
+
+    def stats(self):
+        """
+        :return: Per key a dict with the `staleness` in seconds of the entry
+            which is served (0 when it's fresh), and the number of times an
+            expired entry was `served_stale`, of background `revalidations`
+            and of `refresh_errors`
+        :rtype: dict
+        """
+        now = time.time()
+        with self._lock:
+            stats = dict((key, dict(counters, staleness=0.0))
+                         for key, counters in self._stats.items())
+            for key, fresh_until in self._stale_since.items():
+                stats[key]['staleness'] = max(0.0, now - fresh_until)
+        return stats
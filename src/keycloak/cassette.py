@@ -0,0 +1,269 @@
+"""
+Record the traffic of a client to a JSONL cassette and replay it later
+without a Keycloak server, e.g. to benchmark or profile your own code.
+"""
+import base64
+import io
+import json
+import threading
+import time
+
+from requests import Response
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from keycloak.hooks import clock, current_endpoint
+
+try:
+    from http.client import responses
+except ImportError:
+    from httplib import responses
+
+try:
+    from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+except ImportError:
+    from urllib import urlencode
+    from urlparse import parse_qsl, urlsplit, urlunsplit
+
+__all__ = (
+    'Cassette',
+    'NoRecordedResponse',
+)
+
+#: Response headers which are stored in the cassette
+RECORDED_HEADERS = ('Content-Type', 'Location')
+
+
+class NoRecordedResponse(LookupError):
+    """
+    Raised when replaying a request which is not in the cassette.
+    """
+
+
+def request_key(method, url, params=None):
+    """
+    Key to match a request with its recorded response.
+
+    The query string is sorted, so the same request done by the sync client
+    (which gets a prepared URL) and the async client (which gets `params`)
+    matches the same recording.
+
+    :param str method:
+    :param str url:
+    :param dict params: (optional) Query parameters which are not in the URL
+    :rtype: str
+    """
+    scheme, netloc, path, query, _ = urlsplit(url)
+    pairs = parse_qsl(query, keep_blank_values=True)
+    for name, value in (params or {}).items():
+        values = value if isinstance(value, (list, tuple)) else [value]
+        pairs.extend((name, str(item)) for item in values)
+    return '{} {}'.format(
+        method.upper(),
+        urlunsplit((scheme, netloc, path, urlencode(sorted(pairs)), ''))
+    )
+
+
+class Cassette(object):
+    """
+    JSONL file with one recorded round trip per line.
+
+    Only the method, URL, status, a few response headers, the response body,
+    the duration and the endpoint name are stored. Request headers and bodies
+    (which contain secrets and passwords) are never recorded, the response
+    bodies do contain tokens though.
+
+    When replaying, the responses for the same method and URL are served in
+    the recorded order and start over when all are served.
+
+    .. code-block:: python
+
+        # Record
+        realm = KeycloakRealm(..., cassette=Cassette('keycloak.jsonl',
+                                                     record=True))
+
+        # Replay
+        realm = KeycloakRealm(..., cassette=Cassette('keycloak.jsonl',
+                                                     replay_latency=True))
+    """
+
+    def __init__(self, path, record=False, replay_latency=False):
+        """
+        :param str path: Path of the cassette file
+        :param bool record: (optional) Append the traffic to the cassette
+            instead of replaying it
+        :param bool replay_latency: (optional) Delay replayed responses with
+            the recorded duration
+        """
+        self.path = path
+        self.record = record
+        self.replay_latency = replay_latency
+        self._lock = threading.Lock()
+        self._entries = None
+        self._positions = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        Read the recordings from the cassette file.
+
+        :return: Recorded entries per request key
+        :rtype: dict
+        """
+        entries = {}
+        with io.open(self.path, encoding='utf-8') as cassette:
+            for line in cassette:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                key = request_key(entry['method'], entry['url'])
+                entries.setdefault(key, []).append(entry)
+        return entries
+
+    def append(self, method, url, status, headers, content, duration,
+               endpoint=None):
+        """
+        Record a round trip.
+
+        :param str method:
+        :param str url: Full URL including the query string
+        :param int status:
+        :param headers: Response headers
+        :param bytes content: Response body
+        :param float duration: Seconds between sending the request and
+            receiving the body
+        :param str endpoint: (optional) Templated endpoint name
+        """
+        entry = {
+            'method': method.upper(),
+            'url': url,
+            'endpoint': endpoint,
+            'status': status,
+            'headers': dict((name, headers[name])
+                            for name in RECORDED_HEADERS if name in headers),
+            'duration': round(duration, 6),
+        }
+        try:
+            entry['text'] = content.decode('utf-8')
+        except UnicodeDecodeError:
+            entry['base64'] = base64.b64encode(content).decode('ascii')
+
+        line = json.dumps(entry, sort_keys=True, separators=(',', ':'))
+        with self._lock:
+            with io.open(self.path, 'a', encoding='utf-8') as cassette:
+                cassette.write(line + u'\n')
+
+    def play(self, method, url, params=None):
+        """
+        Get the next recorded entry for a request.
+
+        :param str method:
+        :param str url:
+        :param dict params: (optional) Query parameters which are not in the
+            URL
+        :rtype: dict
+        :raises NoRecordedResponse: When the request was never recorded
+        """
+        key = request_key(method, url, params)
+        with self._lock:
+            if self._entries is None:
+                self._entries = self.load()
+            try:
+                entries = self._entries[key]
+            except KeyError:
+                raise NoRecordedResponse(
+                    'No recorded response for {}'.format(key)
+                )
+            position = self._positions.get(key, 0)
+            self._positions[key] = (position + 1) % len(entries)
+        return entries[position]
+
+    @staticmethod
+    def content(entry):
+        """
+        :param dict entry: Recorded entry
+        :return: Recorded response body
+        :rtype: bytes
+        """
+        if 'base64' in entry:
+            return base64.b64decode(entry['base64'])
+        return entry['text'].encode('utf-8')
+
+    def adapter(self):
+        """
+        Transport adapter for a :class:`requests.Session` which records to or
+        replays from this cassette.
+
+        :rtype: requests.adapters.BaseAdapter
+        """
+        if self.record:
+            return RecordingAdapter(self)
+        return ReplayAdapter(self)
+
+    def mount(self, session):
+        """
+        Let all requests of the session go through the cassette.
+
+        :param requests.Session session:
+        """
+        adapter = self.adapter()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+
+class RecordingAdapter(HTTPAdapter):
+    """
+    Sends the requests to the server and records the responses.
+    """
+
+    def __init__(self, cassette, **kwargs):
+        self.cassette = cassette
+        super(RecordingAdapter, self).__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        started = clock()
+        response = super(RecordingAdapter, self).send(request, **kwargs)
+        content = response.content
+        self.cassette.append(request.method, request.url,
+                             response.status_code, response.headers, content,
+                             clock() - started, endpoint=current_endpoint())
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    Serves the recorded responses without any network traffic.
+    """
+
+    def __init__(self, cassette):
+        self.cassette = cassette
+        super(ReplayAdapter, self).__init__()
+
+    def send(self, request, **kwargs):
+        entry = self.cassette.play(request.method, request.url)
+        if self.cassette.replay_latency:
+            time.sleep(entry['duration'])
+
+        response = Response()
+        response.status_code = entry['status']
+        response.reason = responses.get(entry['status'])
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.raw = io.BytesIO()
+        response._content = self.cassette.content(entry)
+        response._content_consumed = True
+        return response
+
+    def close(self):
+        pass
@@ -1,29 +1,237 @@
+import json
 import logging
+import os
+import threading
+import time
+import weakref
+from functools import partial
 
-from requests.exceptions import HTTPError
+from requests.exceptions import (
+    ConnectionError, ConnectTimeout, HTTPError, Timeout,
+)
+from urllib3.exceptions import NewConnectionError
 
+from keycloak import tracing
+from keycloak.accounting import (
+    active_round_trips, request_body_size, response_body_size,
+)
+from keycloak.concurrency import OVERLOAD_STATUSES
 from keycloak.exceptions import KeycloakClientError
+from keycloak.hedging import HEDGED_METHODS
+from keycloak.hooks import (
+    HOOKS, RequestInfo, clock, current_endpoint, default_hooks, endpoint,
+    endpoint_class,
+)
+from keycloak.nodes import (
+    FAILOVER_STATUSES, IDEMPOTENT_METHODS, NodeSet, server_urls,
+)
+from keycloak.pools import acquire_slot
 
 try:
     from urllib.parse import urljoin  # noqa: F401
 except ImportError:
     from urlparse import urljoin  # noqa: F401
 
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
 import requests
+from requests.adapters import HTTPAdapter
+
+
+#: Endpoint classes which return lazy JSON views with `lazy_json`. The
+#: responses of the other classes (e.g. the JWKS and the .well-known
+#: documents) are used by the library itself and stay plain dicts and lists.
+LAZY_JSON_CLASSES = frozenset(['admin'])
+
+#: Base path of Keycloak before version 17, the paths of the library start
+#: with it
+LEGACY_BASE_PATH = 'auth'
+
+#: Base paths which are tried by :meth:`KeycloakClient.detect_base_path`, in
+#: order
+BASE_PATH_CANDIDATES = ('', LEGACY_BASE_PATH)
+
+
+def rebase_path(path, base_path):
+    """
+    Replace the legacy base path at the start of a path, e.g.
+    ``auth/realms/{}`` becomes ``realms/{}`` for the base path ``''``. Other
+    paths (and URLs) are returned as is.
+
+    :param str path:
+    :param str base_path: Base path without leading or trailing slashes
+    :rtype: str
+    """
+    stripped = path.lstrip('/')
+    if stripped != LEGACY_BASE_PATH and \
+            not stripped.startswith(LEGACY_BASE_PATH + '/'):
+        return path
+    rest = stripped[len(LEGACY_BASE_PATH) + 1:]
+    if base_path:
+        rest = base_path + '/' + rest if rest else base_path
+    return path[:len(path) - len(stripped)] + rest
+
+
+def _not_sent(exc):
+    """
+    Check if a request failed before it reached the server, so it can be
+    sent to another node whatever the method is.
+
+    :param requests.RequestException exc:
+    :rtype: bool
+    """
+    if isinstance(exc, ConnectTimeout):
+        return True
+    reason = getattr(exc.args[0], 'reason', None) if exc.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def _release(response):
+    """
+    Put the connection of a streamed response back in the pool without
+    keeping its body. What's left of the body (normally nothing, e.g. for a
+    204) is discarded, closing the connection would cost a new handshake.
+
+    :param requests.Response response:
+    """
+    drain = getattr(getattr(response, 'raw', None), 'drain_conn', None)
+    if drain is not None:
+        drain()
+
+
+class _ThreadSession(object):
+    """
+    Holds the session of a thread in a thread local, it's freed when the
+    thread ends.
+    """
+    __slots__ = ('session', '__weakref__')
+
+    def __init__(self, session):
+        self.session = session
+
+
+class Result(object):
+    """
+    Result of a request which doesn't return data (like a DELETE), the
+    connection is released already.
+    """
+    __slots__ = ('status_code', 'headers', 'content')
+
+    def __init__(self, status_code, headers, content=None):
+        """
+        :param int status_code:
+        :param headers: Response headers
+        :param bytes content: (optional) Body, None when it wasn't read
+        """
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def status(self):
+        return self.status_code
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        if self.content is None:
+            return None
+        return self.content.decode('utf-8', 'replace')
+
+    def json(self):
+        """
+        :raises ValueError: When the body is empty, wasn't read or isn't
+            JSON
+        """
+        if not self.content:
+            raise ValueError('The response has no body')
+        return json.loads(self.content.decode('utf-8'))
+
+    def __repr__(self):
+        return '<Result [{}]>'.format(self.status_code)
 
 
 class KeycloakClient(object):
     _server_url = None
+    _nodes = None
+    _hedging = None
+    _rate_limiter = None
+    _concurrency_limiter = None
+    _pools = None
+    _ssl_context = None
+    _base_path = LEGACY_BASE_PATH
+    _base_path_failed = None
+    _session_factory = None
     _session = None
     _headers = None
+    _has_hooks = False
+    _session_per_thread = False
+    _cassette = None
+    _lazy_json = False
+
+    #: Seconds after which a failed detection of the base path is retried
+    base_path_retry_interval = 30
 
-    def __init__(self, server_url, headers=None, logger=None):
+    def __init__(self, server_url, headers=None, logger=None, hooks=None,
+                 slow_call_threshold=None, slow_call_interval=60,
+                 session_per_thread=False, cassette=None, lazy_json=False,
+                 hedging=None, rate_limiter=None, session_factory=None,
+                 pools=None, concurrency_limiter=None, ssl_context=None,
+                 base_path=LEGACY_BASE_PATH):
         """
-         :param str server_url: The base URL where the Keycloak server can be
-            found
+        :param str | list server_url: The base URL where the Keycloak server
+            can be found, or a list with the base URLs of the nodes of a
+            cluster. With multiple nodes requests go to the fastest healthy
+            node and fail over to the next one, see
+            :class:`keycloak.nodes.NodeSet`.
         :param dict headers: Optional extra headers to send with requests to
             the server
         :param logging.Logger logger: Optional logger for client
+        :param dict hooks: Optional hooks per event (`request`, `response`
+            and `error`), see :meth:`register_hook`
+        :param float slow_call_threshold: Optional duration in seconds from
+            which a call gets logged as slow, see
+            :class:`keycloak.slow_calls.SlowCallLog`
+        :param float slow_call_interval: Minimum number of seconds between two
+            slow call records for the same endpoint
+        :param bool session_per_thread: Give every thread its own session
+            (and connection pool) instead of sharing one session between all
+            threads. The session of a thread is closed when the thread ends.
+        :param keycloak.cassette.Cassette cassette: Optional cassette to
+            record all traffic to or to replay it from
+        :param bool lazy_json: Return JSON objects and arrays of the admin
+            API as read-only views which are decoded on first access, see
+            :func:`keycloak.lazy_json.lazy_json`
+        :param keycloak.hedging.HedgePolicy hedging: Optional policy to send
+            a second GET request when the first one is slow, the first
+            response wins
+        :param keycloak.rate_limit.RateLimiter rate_limiter: Optional rate
+            limits per endpoint class, requests wait for their turn
+        :param callable session_factory: Optional factory of the sessions,
+            defaults to :class:`requests.Session`. Use
+            :class:`keycloak.transport.Urllib3Session` for less overhead per
+            call.
+        :param keycloak.pools.TrafficPools pools: Optional separate
+            connection pools per traffic class (e.g. for logins and for
+            admin calls), with their own size and queueing limits
+        :param keycloak.concurrency.ConcurrencyLimiter concurrency_limiter:
+            Optional adaptive limits per endpoint class of the number of
+            requests in flight, requests wait for their turn
+        :param ssl.SSLContext ssl_context: Optional TLS context for the
+            connections, e.g. one which is shared by all clients of a
+            registry. See :func:`keycloak.tls.create_ssl_context` for one
+            which resumes TLS sessions. It's not pickled with the client.
+        :param str base_path: Path under which Keycloak serves its
+            endpoints, ``auth`` like Keycloak before version 17 by default.
+            Pass an empty string for newer versions, or None to detect it
+            with the first realm which is used, see
+            :meth:`detect_base_path`.
         """
         if logger is None:
             if hasattr(self.__class__, '__qualname__'):
@@ -34,13 +242,64 @@ class KeycloakClient(object):
             logger = logging.getLogger(logger_name)
 
         self.logger = logger
-        self._server_url = server_url
+        urls = server_urls(server_url)
+        self._server_url = urls[0]
+        if len(urls) > 1:
+            self._nodes = NodeSet(urls)
         self._headers = headers or {}
+        self._session_per_thread = session_per_thread
+        self._cassette = cassette
+        self._lazy_json = lazy_json
+        self._hedging = hedging
+        self._rate_limiter = rate_limiter
+        self._session_factory = session_factory
+        self._pools = pools
+        self._concurrency_limiter = concurrency_limiter
+        self._ssl_context = ssl_context
+        self._base_path = None if base_path is None else base_path.strip('/')
+        self._base_path_lock = threading.Lock()
+        self._reset_sessions()
+        self.hooks = default_hooks()
+
+        for event, hook in (hooks or {}).items():
+            self.register_hook(event, hook)
+
+        if slow_call_threshold is not None:
+            from keycloak.slow_calls import SlowCallLog
+            slow_call_log = SlowCallLog(threshold=slow_call_threshold,
+                                        logger=self.logger,
+                                        interval=slow_call_interval)
+            self.register_hook('response', slow_call_log)
+            self.register_hook('error', slow_call_log)
+
+        if tracing.tracer is not None:
+            tracing.instrument_client(self)
 
     @property
     def server_url(self):
         return self._server_url
 
+    @property
+    def ssl_context(self):
+        return self._ssl_context
+
+    @property
+    def base_path(self):
+        """
+        :return: The base path, None when it's not detected yet
+        :rtype: str
+        """
+        return self._base_path
+
+    @base_path.setter
+    def base_path(self, base_path):
+        """
+        Use a known base path, e.g. from a snapshot, instead of detecting it.
+
+        :param str base_path: Base path without leading or trailing slashes
+        """
+        self._base_path = base_path
+
     @property
     def session(self):
         """
@@ -48,45 +307,742 @@ class KeycloakClient(object):
 
         http://docs.python-requests.org/en/master/user/advanced/#session-objects
 
+        The session is created once, also when multiple threads ask for it at
+        the same time. With `session_per_thread` every thread gets its own
+        session.
+
+        When the process got forked (e.g. gunicorn with `--preload`) the
+        sessions of the parent are dropped, so parent and child never share
+        a socket.
+
         :rtype: requests.Session
         """
+        if self._pid != os.getpid():
+            self._reset_sessions()
+
+        if self._session_per_thread:
+            holder = getattr(self._local, 'holder', None)
+            if holder is None:
+                session = self._create_session()
+                holder = self._local.holder = _ThreadSession(session)
+                # The session gets closed when the thread ends
+                ref = weakref.ref(holder, self._thread_ended)
+                with self._session_lock:
+                    self._thread_sessions[ref] = session
+            return holder.session
+
         if self._session is None:
-            self._session = requests.Session()
-            self._session.headers.update(self._headers)
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self._create_session()
         return self._session
 
+    def _thread_ended(self, ref):
+        # Called by the garbage collection, which can happen while the lock is
+        # held. Sessions which were dropped already aren't found.
+        session = self._thread_sessions.pop(ref, None)
+        if session is not None:
+            session.close()
+
+    def _reset_sessions(self):
+        # Sessions which are inherited from a parent process are dropped
+        # without closing them, the sockets are still used by the parent.
+        self._pid = os.getpid()
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._thread_sessions = {}
+        self._pool_sessions = {}
+        self._local = threading.local()
+
+    def pool_session(self, name):
+        """
+        Get the session of a traffic class, see
+        :class:`keycloak.pools.TrafficPools`. It's shared by all threads,
+        also with `session_per_thread`.
+
+        :param str name: Traffic class
+        :rtype: requests.Session
+        """
+        if self._pid != os.getpid():
+            self._reset_sessions()
+
+        session = self._pool_sessions.get(name)
+        if session is None:
+            with self._session_lock:
+                session = self._pool_sessions.get(name)
+                if session is None:
+                    session = self._pool_sessions[name] = \
+                        self._create_session(
+                            maxsize=self._pools.limits(name).maxsize
+                        )
+        return session
+
+    def _create_session(self, maxsize=None):
+        session = (self._session_factory or requests.Session)()
+        session.headers.update(self._headers)
+        if maxsize is not None or self._ssl_context is not None:
+            self._configure_pools(session, maxsize)
+        if self._cassette is not None:
+            self._cassette.mount(session)
+        return session
+
+    def _configure_pools(self, session, maxsize):
+        ssl_context = self._ssl_context
+        if getattr(session, 'adapters', None) is not None:
+            adapter_kwargs = {}
+            if maxsize is not None:
+                adapter_kwargs['pool_maxsize'] = maxsize
+                session.mount('http://', HTTPAdapter(**adapter_kwargs))
+            if ssl_context is not None:
+                from keycloak.tls import SSLContextAdapter
+                session.mount('https://', SSLContextAdapter(ssl_context,
+                                                            **adapter_kwargs))
+            else:
+                session.mount('https://', HTTPAdapter(**adapter_kwargs))
+            return
+
+        # E.g. keycloak.transport.Urllib3Session
+        pool_kwargs = session.poolmanager.connection_pool_kw
+        if maxsize is not None:
+            pool_kwargs['maxsize'] = maxsize
+        if ssl_context is not None:
+            # The context has its CA certificates loaded already
+            pool_kwargs.pop('ca_certs', None)
+            pool_kwargs['ssl_context'] = ssl_context
+
+    def _sessions(self):
+        if self._pid != os.getpid():
+            self._reset_sessions()
+        with self._session_lock:
+            sessions = list(self._thread_sessions.copy().values())
+            sessions.extend(self._pool_sessions.values())
+        if self._session is not None:
+            sessions.append(self._session)
+        return sessions
+
+    def pool_stats(self):
+        """
+        Get the usage of the connection pools of the session.
+
+        :return: List of dicts with `pool`, `maxsize`, `in_use` and `idle`,
+            and the `traffic_class` for the pools of
+            :class:`keycloak.pools.TrafficPools`
+        :rtype: list
+        """
+        stats = []
+        managers = []
+        traffic_classes = dict((id(session), name) for name, session in
+                               list(self._pool_sessions.items()))
+        for session in self._sessions():
+            traffic_class = traffic_classes.get(id(session))
+            adapters = getattr(session, 'adapters', None)
+            if adapters is None:
+                # E.g. keycloak.transport.Urllib3Session
+                managers.append((traffic_class,
+                                 getattr(session, 'poolmanager', None)))
+            else:
+                managers.extend((traffic_class,
+                                 getattr(adapter, 'poolmanager', None))
+                                for adapter in list(adapters.values()))
+
+        for traffic_class, manager in managers:
+            if manager is None:
+                continue
+            for key in list(manager.pools.keys()):
+                pool = manager.pools.get(key)
+                queue = getattr(pool, 'pool', None)
+                if queue is None:
+                    continue
+                # The queue is filled with None for every free slot
+                idle = sum(1 for conn in list(queue.queue)
+                           if conn is not None)
+                pool_stats = {
+                    'pool': '{}://{}:{}'.format(pool.scheme, pool.host,
+                                                pool.port),
+                    'maxsize': queue.maxsize,
+                    'in_use': queue.maxsize - queue.qsize(),
+                    'idle': idle,
+                }
+                if traffic_class is not None:
+                    pool_stats['traffic_class'] = traffic_class
+                stats.append(pool_stats)
+        return stats
+
+    def tls_stats(self):
+        """
+        Get the number of TLS handshakes done with the TLS context of the
+        client, see :func:`keycloak.tls.handshake_stats`. A shared context
+        counts the handshakes of all its clients.
+
+        :return: Dict with the number of `handshakes`, `resumed` and `full`
+            handshakes, None without a TLS context
+        :rtype: dict
+        """
+        if self._ssl_context is None:
+            return None
+        from keycloak.tls import handshake_stats
+        return handshake_stats(self._ssl_context)
+
+    def node_stats(self):
+        """
+        Get the latency and health of the nodes, when the client has multiple
+        server URLs.
+
+        :return: List of dicts with `url`, `latency`, `healthy` and
+            `failures`
+        :rtype: list
+        """
+        if self._nodes is None:
+            return []
+        return self._nodes.stats()
+
+    def open_connections(self, count, url=None):
+        """
+        Open connections to the server ahead of time, so the first requests
+        don't have to wait for the TCP and TLS handshakes.
+
+        The connections are opened by sending up to `count` concurrent HEAD
+        requests, their responses are ignored. Connections which are idle in
+        the pool are reused by them, so fewer new ones may be opened. With
+        traffic class pools (see :class:`keycloak.pools.TrafficPools`) the
+        connections are opened for the session of every traffic class as
+        well, they are the ones the auth, authz and admin calls use.
+
+        :param int count: Number of concurrent connections to open per pool,
+            limited by the size of the pool
+        :param str url: (optional) URL on the server to connect to, defaults
+            to the server URL
+        :return: Number of new connections
+        :rtype: int
+        """
+        url = url or self._server_url
+        sessions = [self.session]
+        if self._pools is not None:
+            sessions.extend(self.pool_session(name)
+                            for name in self._pools.names())
+        return sum(self._open_connections(session, count, url)
+                   for session in sessions)
+
+    def _open_connections(self, session, count, url):
+        pool = self._connection_pool(session, url)
+        if pool is None:
+            return 0
+
+        # Every concurrent HEAD request takes a connection from the pool,
+        # they are all put back when the responses are read
+        start = threading.Event()
+        before = pool.num_connections
+
+        def head():
+            start.wait()
+            try:
+                session.head(url, allow_redirects=False).close()
+            except Exception:
+                self.logger.warning('Could not open connection to %s', url,
+                                    exc_info=True)
+
+        threads = [threading.Thread(target=head)
+                   for _ in range(min(count, pool.pool.maxsize))]
+        for thread in threads:
+            thread.start()
+        start.set()
+        for thread in threads:
+            thread.join()
+
+        return pool.num_connections - before
+
+    @staticmethod
+    def _connection_pool(session, url):
+        """
+        :return: The connection pool the session uses for requests to the
+            URL, or None when it doesn't use one
+        :rtype: urllib3.HTTPConnectionPool
+        """
+        connection_pool = getattr(session, 'connection_pool', None)
+        if connection_pool is not None:
+            # E.g. keycloak.transport.Urllib3Session
+            return connection_pool(url)
+
+        adapter = session.get_adapter(url)
+        if getattr(adapter, 'poolmanager', None) is None:
+            # E.g. a cassette which replays the responses
+            return None
+
+        # Connect with the same settings as requests does when sending, so
+        # the connections end up in the pool which is used for requests.
+        settings = session.merge_environment_settings(url, {}, None, None,
+                                                      None)
+        get_connection = getattr(adapter, 'get_connection_with_tls_context',
+                                 None)
+        if get_connection is not None:
+            return get_connection(requests.Request('GET', url).prepare(),
+                                  settings['verify'],
+                                  proxies=settings['proxies'],
+                                  cert=settings['cert'])
+
+        pool = adapter.get_connection(url, settings['proxies'])
+        adapter.cert_verify(pool, url, settings['verify'], settings['cert'])
+        return pool
+
     def get_full_url(self, path, server_url=None):
+        """
+        :param str path: Path on the server, a path which starts with the
+            legacy base path ``auth`` gets the base path of the server
+        :param str server_url: (optional) Defaults to the server URL
+        :rtype: str
+        """
+        base_path = self._base_path
+        if base_path is not None and base_path != LEGACY_BASE_PATH:
+            path = rebase_path(path, base_path)
         return urljoin(server_url or self._server_url, path)
 
+    @endpoint('discovery.base_path')
+    def detect_base_path(self, realm_name):
+        """
+        Detect the base path by requesting the OpenID Connect discovery
+        document of the realm under every base path of
+        :data:`BASE_PATH_CANDIDATES`, without following redirects. The first
+        one which answers is kept, so every later request goes straight to
+        the right path. When none answers, the legacy base path is used and
+        the detection is tried again after `base_path_retry_interval`
+        seconds.
+
+        :param str realm_name: Realm to request the document of
+        :return: The base path, None when it's not known
+        :rtype: str
+        """
+        if self._base_path is not None or not self._may_detect_base_path():
+            return self._base_path
+
+        with self._base_path_lock:
+            if self._base_path is None and self._may_detect_base_path():
+                self._base_path_failed = clock()
+                for base_path, url in self._base_path_probes(realm_name):
+                    status = self._request('GET', url,
+                                           handler=self._handle_status,
+                                           allow_redirects=False)
+                    if status == 200:
+                        self._base_path = base_path
+                        break
+                else:
+                    self.logger.warning('Could not detect the base path of '
+                                        '%s, using "%s"', self._server_url,
+                                        LEGACY_BASE_PATH)
+        return self._base_path
+
+    def _may_detect_base_path(self):
+        failed = self._base_path_failed
+        return failed is None or \
+            clock() - failed >= self.base_path_retry_interval
+
+    def _base_path_probes(self, realm_name):
+        """
+        :return: The candidate base paths with the URL to probe them
+        :rtype: list
+        """
+        from keycloak.openid_connect import PATH_WELL_KNOWN
+        path = PATH_WELL_KNOWN.format(realm_name)
+        return [(base_path, urljoin(self._server_url,
+                                    rebase_path(path, base_path)))
+                for base_path in BASE_PATH_CANDIDATES]
+
+    def register_hook(self, event, hook):
+        """
+        Register a hook which gets called with a
+        :class:`keycloak.hooks.RequestInfo` for every request.
+
+        * `request`: before the request is sent
+        * `response`: when a response is received (any status)
+        * `error`: when no response could be received
+
+        :param str event: One of `request`, `response` or `error`
+        :param callable | list hook: Hook or list of hooks
+        """
+        if event not in HOOKS:
+            raise ValueError(
+                'Unsupported event "{}", expected one of: {}'.format(
+                    event, ', '.join(HOOKS))
+            )
+
+        if callable(hook):
+            self.hooks[event].append(hook)
+        else:
+            self.hooks[event].extend(h for h in hook if callable(h))
+        self._has_hooks = any(self.hooks.values())
+
+    def deregister_hook(self, event, hook):
+        """
+        Deregister a previously registered hook.
+
+        :param str event:
+        :param callable hook:
+        :return: True if the hook existed, False if not.
+        :rtype: bool
+        """
+        try:
+            self.hooks[event].remove(hook)
+        except ValueError:
+            return False
+        self._has_hooks = any(self.hooks.values())
+        return True
+
     def post(self, url, data, headers=None, **kwargs):
-        return self._handle_response(
-            self.session.post(url, headers=headers or {}, params=kwargs,
-                              data=data)
-        )
+        return self._request('POST', url, headers=headers or {},
+                             params=kwargs, data=data)
 
     def put(self, url, data, headers=None, **kwargs):
-        return self._handle_response(
-            self.session.put(url, headers=headers or {}, params=kwargs,
-                             data=data)
-        )
+        return self._request('PUT', url, headers=headers or {},
+                             params=kwargs, data=data)
 
     def get(self, url, headers=None, **kwargs):
-        return self._handle_response(
-            self.session.get(url, headers=headers or {}, params=kwargs)
-        )
+        return self._request('GET', url, headers=headers or {},
+                             params=kwargs)
+
+    def delete(self, url, headers, read_body=True, **kwargs):
+        """
+        :param str url:
+        :param dict headers:
+        :param bool read_body: (optional) Keep the body in the result,
+            otherwise the response is streamed and its connection released
+            without reading the body
+        :rtype: Result
+        :raises KeycloakClientError: When the response has an error status
+        """
+        if not read_body:
+            kwargs['stream'] = True
+        return self._request('DELETE', url,
+                             handler=partial(self._handle_result,
+                                             read_body=read_body),
+                             headers=headers, **kwargs)
+
+    def _request(self, method, url, handler=None, **kwargs):
+        """
+        :param str method:
+        :param str url:
+        :param callable handler: (optional) Turns the response into the
+            result and releases its connection, by default the decoded body
+            is returned
+        """
+        if handler is None:
+            handler = self._handle_response
+            if self._lazy_json and endpoint_class(current_endpoint()) in \
+                    LAZY_JSON_CLASSES:
+                handler = partial(self._handle_response, lazy=True)
 
-    def delete(self, url, headers, **kwargs):
-        return self.session.delete(url, headers=headers, **kwargs)
+        info = None
+        # The endpoint name must be captured before any call gets deferred
+        # (e.g. by the async client).
+        if self._has_hooks or active_round_trips():
+            info = RequestInfo(method, url, current_endpoint())
+            info.request_size = request_body_size(kwargs.get('data'))
 
-    def _handle_response(self, response):
-        with response:
+        traffic_class = None
+        if self._pools is not None:
+            name = current_endpoint() if info is None else info.endpoint
+            traffic_class = self._pools.traffic_class(endpoint_class(name))
+
+        limit = None
+        if self._concurrency_limiter is not None:
+            name = current_endpoint() if info is None else info.endpoint
+            limit = self._concurrency_limiter.limit(endpoint_class(name))
+
+        if traffic_class is None:
+            send = getattr(self.session, method.lower())
+        else:
+            send = getattr(self.pool_session(traffic_class), method.lower())
+
+        if limit is not None:
+            # Inside the pool and the throttle, the time waiting for a pool
+            # slot or for the rate limit isn't latency
+            send = self._limit(send, limit)
+
+        if traffic_class is not None:
+            send = self._pooled(send, traffic_class)
+
+        hedge_send = send
+        if self._nodes is not None:
+            # The hedged request prefers another node than the first one
+            hedge_send = self._failover(method, send, info, rotate=True)
+            send = self._failover(method, send, info)
+
+        if self._hedging is not None and method in HEDGED_METHODS:
+            send = self._hedge(send, hedge_send, info)
+
+        if self._rate_limiter is not None:
+            name = current_endpoint() if info is None else info.endpoint
+            send = self._throttle(send, info, endpoint_class(name))
+
+        if info is None:
+            return handler(send(url, **kwargs))
+
+        return self._observe(info, send, url, kwargs, handler)
+
+    def _pooled(self, send, name):
+        """
+        Wrap `send` to take a connection slot of the pool of a traffic class
+        for every request which is sent.
+
+        :param callable send:
+        :param str name: Traffic class
+        """
+        pools = self._pools
+
+        def pooled_send(url, **kwargs):
+            pools.acquire(name)
+            try:
+                # The body is read, the connection is back in the pool
+                return send(url, **kwargs)
+            finally:
+                pools.release(name)
+
+        return pooled_send
+
+    def _limit(self, send, limit):
+        """
+        Wrap `send` to wait for a slot of an adaptive concurrency limit and
+        to adapt the limit to the outcome of the request.
+
+        :param callable send:
+        :param keycloak.concurrency.AIMDLimit limit:
+        """
+        def limited_send(url, **kwargs):
+            acquire_slot(limit)
+            started = clock()
+            overloaded = True
+            try:
+                response = send(url, **kwargs)
+                overloaded = response.status_code in OVERLOAD_STATUSES
+                return response
+            finally:
+                limit.record(clock() - started, overloaded)
+                limit.release()
+
+        return limited_send
+
+    def _failover(self, method, send, info, rotate=False):
+        """
+        Wrap `send` to send the request to the fastest healthy node and fail
+        over to the next node on a connection error, or for idempotent
+        requests also on a 502, 503 or 504 response.
+
+        :param str method:
+        :param callable send:
+        :param keycloak.hooks.RequestInfo info: Gets the URL on the node of
+            the last attempt as `url` and the number of failovers as
+            `retries`, None when there are no hooks
+        :param bool rotate: Start with the second best node
+        """
+        nodes = self._nodes
+        idempotent = method in IDEMPOTENT_METHODS
+
+        def failover_send(url, **kwargs):
+            matched = nodes.match(url)
+            if matched is None:
+                return send(url, **kwargs)
+
+            candidates = nodes.candidates(rotate=rotate)
+            for node in candidates:
+                last = node is candidates[-1]
+                node_url = nodes.rewrite(url, matched, node)
+                if info is not None:
+                    info.url = node_url
+                started = clock()
+                try:
+                    response = send(node_url, **kwargs)
+                except (ConnectionError, Timeout) as exc:
+                    nodes.failed(node)
+                    if last or not (idempotent or _not_sent(exc)):
+                        raise
+                    self.logger.warning('Request to %s failed, failing over',
+                                        node.url, exc_info=True)
+                else:
+                    if response.status_code not in FAILOVER_STATUSES:
+                        nodes.succeeded(node, clock() - started)
+                        return response
+                    nodes.failed(node)
+                    if last or not idempotent:
+                        return response
+                    response.close()
+                    self.logger.warning('Node %s responded with %s, failing '
+                                        'over', node.url,
+                                        response.status_code)
+                if info is not None:
+                    info.retries += 1
+
+        return failover_send
+
+    def _throttle(self, send, info, name):
+        """
+        Wrap `send` to wait for a token of the rate limiter first.
+
+        :param callable send:
+        :param keycloak.hooks.RequestInfo info: Gets the seconds waited as
+            `rate_limit_wait`, None when there are no hooks
+        :param str name: Endpoint class of the request
+        """
+        limiter = self._rate_limiter
+
+        def throttled_send(url, **kwargs):
+            wait = limiter.reserve(name)
+            if wait > 0:
+                if info is not None:
+                    info.rate_limit_wait = wait
+                time.sleep(wait)
+            return send(url, **kwargs)
+
+        return throttled_send
+
+    def _hedge(self, send, hedge_send, info):
+        """
+        Wrap `send` to send the request from a thread and, when it's slower
+        than the delay of the hedge policy, send it again with `hedge_send`
+        from another thread. The first response is returned, the other one
+        is closed when it arrives. The first error is only raised when all
+        requests fail.
+
+        :param callable send:
+        :param callable hedge_send:
+        :param keycloak.hooks.RequestInfo info: Gets `hedged` set, None when
+            there are no hooks
+        """
+        policy = self._hedging
+
+        def hedged_send(url, **kwargs):
+            policy.requested()
+            delay = policy.delay()
+            if delay is None:
+                started = clock()
+                response = send(url, **kwargs)
+                policy.record(clock() - started)
+                return response
+
+            results = queue.Queue()
+            lock = threading.Lock()
+            finished = []
+
+            def attempt(send, hedged):
+                started = clock()
+                try:
+                    result = send(url, **kwargs), None
+                except Exception as exc:
+                    result = None, exc
+                else:
+                    if not hedged:
+                        policy.record(clock() - started)
+                with lock:
+                    if not finished:
+                        results.put((hedged, result))
+                        return
+                if result[0] is not None:
+                    result[0].close()
+
+            def start(send, hedged):
+                thread = threading.Thread(target=attempt, args=(send, hedged))
+                thread.daemon = True
+                thread.start()
+
+            start(send, False)
+            pending = 1
+            try:
+                outcome = results.get(timeout=delay)
+            except queue.Empty:
+                outcome = None
+                if policy.acquire():
+                    if info is not None:
+                        info.hedged = True
+                    start(hedge_send, True)
+                    pending += 1
+
+            while True:
+                if outcome is None:
+                    outcome = results.get()
+                pending -= 1
+                hedged, (response, exc) = outcome
+                if exc is None or not pending:
+                    break
+                outcome = None
+
+            with lock:
+                finished.append(True)
+            # A response which arrived while deciding is closed as well
+            while True:
+                try:
+                    _, (other, _) = results.get_nowait()
+                except queue.Empty:
+                    break
+                if other is not None:
+                    other.close()
+
+            if exc is not None:
+                raise exc
+            if hedged:
+                policy.hedge_won()
+            return response
+
+        return hedged_send
+
+    def _observe(self, info, send, url, kwargs, handler):
+        self._dispatch_hook('request', info)
+        try:
+            response = send(url, **kwargs)
+        except Exception as exc:
+            self._dispatch_hook('error', info.finish(exception=exc))
+            raise
+        info.finish(status=response.status_code)
+        if kwargs.get('stream'):
+            # Reading the body would defeat streaming
+            info.response_size = response_body_size(response.headers)
+        else:
+            info.response_size = len(response.content)
+        self._dispatch_hook('response', info)
+        return handler(response)
+
+    def _dispatch_hook(self, event, info):
+        for hook in self.hooks[event]:
             try:
-                response.raise_for_status()
-            except HTTPError as err:
-                self.logger.debug(response.content)
-                self.logger.debug(response.headers)
-                self.logger.debug(response.request.headers)
-                raise KeycloakClientError(original_exc=err)
+                hook(info)
+            except Exception:
+                self.logger.exception('Hook %r for "%s" failed', hook, event)
+
+        if event != 'request':
+            for round_trips in active_round_trips():
+                round_trips.record(info)
+
+    def _raise_for_status(self, response):
+        try:
+            response.raise_for_status()
+        except HTTPError as err:
+            self.logger.debug(response.content)
+            self.logger.debug(response.headers)
+            self.logger.debug(response.request.headers)
+            raise KeycloakClientError(original_exc=err)
+
+    def _handle_status(self, response):
+        with response:
+            return response.status_code
+
+    def _handle_result(self, response, read_body=True):
+        with response:
+            self._raise_for_status(response)
+            if not read_body:
+                _release(response)
+                return Result(response.status_code, response.headers)
+            return Result(response.status_code, response.headers,
+                          response.content)
+
+    def _handle_response(self, response, lazy=False):
+        """
+        :param requests.Response response:
+        :param bool lazy: (optional) Return JSON objects and arrays as lazy
+            views
+        """
+        with response:
+            self._raise_for_status(response)
+
+            if lazy:
+                from keycloak.lazy_json import is_json_container, lazy_json
+                if is_json_container(response.content):
+                    return lazy_json(response.content)
 
             try:
                 return response.json()
@@ -94,9 +1050,37 @@ class KeycloakClient(object):
                 return response.content
 
     def close(self):
-        if self._session is not None:
-            self._session.close()
-            self._session = None
+        if self._pid != os.getpid():
+            self._reset_sessions()
+            return
+
+        with self._session_lock:
+            sessions = list(self._thread_sessions.copy().values())
+            sessions.extend(self._pool_sessions.values())
+            self._thread_sessions = {}
+            self._pool_sessions = {}
+            self._local = threading.local()
+            if self._session is not None:
+                sessions.append(self._session)
+                self._session = None
+
+        for session in sessions:
+            session.close()
+
+    def __getstate__(self):
+        # Sessions, locks and thread locals can't be pickled, the unpickled
+        # client creates new ones.
+        state = self.__dict__.copy()
+        for name in ('_pid', '_session', '_session_lock', '_thread_sessions',
+                     '_pool_sessions', '_local', '_ssl_context',
+                     '_base_path_lock'):
+            state.pop(name, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._base_path_lock = threading.Lock()
+        self._reset_sessions()
 
     def __enter__(self):
         return self
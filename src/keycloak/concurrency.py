@@ -0,0 +1,190 @@
+"""
+Adaptive concurrency limits for bulk work, e.g. admin or UMA jobs: instead
+of guessing a number of workers, the number of requests which are sent at
+the same time follows what Keycloak can handle.
+
+.. code-block:: python
+
+    client = KeycloakClient(..., concurrency_limiter=ConcurrencyLimiter({
+        'admin': AIMDLimit(max_limit=32),
+    }))
+
+    # Any number of threads (or tasks), the limiter decides how many of
+    # their requests are in flight
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        executor.map(update_user, user_ids)
+
+Requests which exceed the current limit wait for their turn.
+"""
+from keycloak.hooks import clock
+from keycloak.pools import PoolLimits, Slots
+
+__all__ = (
+    'AIMDLimit',
+    'ConcurrencyLimiter',
+    'OVERLOAD_STATUSES',
+)
+
+#: Response statuses which mean that Keycloak is overloaded
+OVERLOAD_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+
+def _ewma(average, value, weight):
+    return value if average is None else average + weight * (value - average)
+
+
+class AIMDLimit(Slots):
+    """
+    Concurrency limit with additive increase and multiplicative decrease,
+    like the congestion window of TCP.
+
+    While the limit is used up and the latency stays stable it grows by
+    about one for every `limit` requests. It's multiplied by `backoff` when
+    a request fails, gets an overload status (see :data:`OVERLOAD_STATUSES`)
+    or when the recent latency is more than `tolerance` times the latency
+    without load, at most once per round trip. The latency without load is
+    the lowest recent latency, it's renewed every `window` seconds so it
+    follows lasting changes.
+    """
+
+    def __init__(self, initial=4, min_limit=1, max_limit=64, backoff=0.5,
+                 tolerance=2.0, window=30, max_waiting=None, timeout=None):
+        """
+        :param int initial: (optional) Limit to start with
+        :param int min_limit: (optional) Lowest limit
+        :param int max_limit: (optional) Highest limit
+        :param float backoff: (optional) Factor to decrease the limit with
+        :param float tolerance: (optional) How many times slower than
+            without load requests may get before the limit is decreased
+        :param float window: (optional) Seconds after which the lowest
+            latency is renewed
+        :param int max_waiting: (optional) Number of requests which may wait
+            for their turn, more requests fail right away with
+            :class:`keycloak.exceptions.PoolExhausted`
+        :param float timeout: (optional) Seconds a request may wait for its
+            turn
+        """
+        super(AIMDLimit, self).__init__(
+            'concurrency', PoolLimits(maxsize=max_limit,
+                                      max_waiting=max_waiting,
+                                      timeout=timeout)
+        )
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.window = window
+        self.increases = 0
+        self.decreases = 0
+        self._latency = None
+        self._min_latency = None
+        self._window_min = None
+        self._window_started = clock()
+        self._decreased = None
+
+    def capacity(self):
+        return int(self.limit)
+
+    def record(self, duration, overloaded=False):
+        """
+        Adapt the limit to a finished request. Call it before releasing the
+        slot of the request.
+
+        :param float duration: Seconds the request took
+        :param bool overloaded: (optional) The request failed or got an
+            overload status
+        """
+        with self._lock:
+            now = clock()
+            if not overloaded:
+                overloaded = self._sample(duration, now) > \
+                    self.tolerance * self._min_latency
+
+            if overloaded:
+                # The requests of one round trip all see the same overload
+                if self._decreased is None or \
+                        now - self._decreased >= (self._latency or 0):
+                    self._decreased = now
+                    self.limit = max(self.min_limit,
+                                     self.limit * self.backoff)
+                    self.decreases += 1
+                granted = []
+            elif self.in_use >= self.capacity() and \
+                    self.limit < self.max_limit:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                self.increases += 1
+                granted = self._grant()
+            else:
+                granted = []
+
+        for waiter in granted:
+            waiter.wake()
+
+    def _sample(self, duration, now):
+        """
+        :return: The smoothed latency
+        :rtype: float
+        """
+        self._latency = _ewma(self._latency, duration, 0.2)
+        if self._window_min is None or self._latency < self._window_min:
+            self._window_min = self._latency
+        if now - self._window_started >= self.window:
+            self._min_latency = self._window_min
+            self._window_min = self._latency
+            self._window_started = now
+        elif self._min_latency is None or \
+                self._window_min < self._min_latency:
+            self._min_latency = self._window_min
+        return self._latency
+
+    def stats(self):
+        stats = super(AIMDLimit, self).stats()
+        with self._lock:
+            stats.update({
+                'limit': self.limit,
+                'latency': self._latency,
+                'min_latency': self._min_latency,
+                'increases': self.increases,
+                'decreases': self.decreases,
+            })
+        return stats
+
+
+class ConcurrencyLimiter(object):
+    """
+    An adaptive concurrency limit per endpoint class (e.g. ``admin`` or
+    ``uma``, see :func:`keycloak.hooks.endpoint_class`). Requests of other
+    endpoint classes are not limited.
+    """
+
+    def __init__(self, limits):
+        """
+        :param dict limits: Per endpoint class an :class:`AIMDLimit`, or
+            the maximum limit of one
+        """
+        self._limits = {}
+        for name, limit in limits.items():
+            if not isinstance(limit, AIMDLimit):
+                limit = AIMDLimit(max_limit=limit)
+            self._limits[name] = limit
+
+    def limit(self, name):
+        """
+        :param str name: Endpoint class
+        :return: The limit of the endpoint class, None when it's not
+            limited
+        :rtype: AIMDLimit
+        """
+        return self._limits.get(name)
+
+    def stats(self):
+        """
+        :return: Per endpoint class a dict with the current `limit`, the
+            slots `in_use`, the `waiting` requests, the recent `latency`, the
+            `min_latency`, the number of `increases` and `decreases` of the
+            limit and the totals of :meth:`keycloak.pools.Slots.stats`
+        :rtype: dict
+        """
+        return dict((name, limit.stats())
+                    for name, limit in self._limits.items())
@@ -6,3 +6,10 @@ class KeycloakClientError(Exception):
         """
         self.original_exc = original_exc
         super(KeycloakClientError, self).__init__(*original_exc.args)
+
+
+class PoolExhausted(Exception):
+    """
+    No connection of a traffic class pool became available, see
+    :class:`keycloak.pools.TrafficPools`.
+    """
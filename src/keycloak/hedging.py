@@ -0,0 +1,134 @@
+"""
+Hedged requests: when a read takes longer than usual a second request for
+the same URL is sent and the first response wins.
+
+.. code-block:: python
+
+    client = KeycloakClient(..., hedging=HedgePolicy(budget=0.05))
+"""
+import threading
+from collections import deque
+
+__all__ = (
+    'HEDGED_METHODS',
+    'HedgePolicy',
+)
+
+#: Methods of the requests which can be hedged
+HEDGED_METHODS = frozenset(('GET', 'HEAD'))
+
+
+class HedgePolicy(object):
+    """
+    When to send a second request and how many of them may be sent.
+
+    The delay before hedging is either fixed or a percentile of the recently
+    observed durations of the first requests. The number of hedged requests
+    is capped by a budget: every request adds `budget` to a bucket and every
+    hedge takes one out, so hedging never adds more than `budget` times the
+    number of requests (plus a burst of `burst`) to the load on Keycloak.
+    """
+
+    def __init__(self, delay=None, percentile=95, budget=0.05, burst=10,
+                 window=1000, min_samples=20):
+        """
+        :param float delay: (optional) Seconds to wait before hedging, by
+            default the observed `percentile` is used
+        :param float percentile: (optional) Percentile of the observed
+            durations to wait before hedging
+        :param float budget: (optional) Maximum fraction of extra requests
+        :param int burst: (optional) Maximum number of hedges which can be
+            saved up
+        :param int window: (optional) Number of recent durations to compute
+            the percentile from
+        :param int min_samples: (optional) Number of durations which are
+            needed before hedging with the observed percentile
+        """
+        self.percentile = percentile
+        self.budget = budget
+        self.burst = burst
+        self.min_samples = min_samples
+        self.hedged = 0
+        self.won = 0
+        self._fixed_delay = delay
+        self._delay = delay
+        self._durations = deque(maxlen=window)
+        self._recorded = 0
+        self._tokens = 1.0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        """
+        :return: Seconds to wait before hedging, None when not enough
+            durations were observed yet
+        :rtype: float
+        """
+        return self._delay
+
+    def record(self, duration):
+        """
+        Record the duration of a first (not hedged) request.
+
+        :param float duration:
+        """
+        if self._fixed_delay is not None:
+            return
+        with self._lock:
+            self._durations.append(duration)
+            self._recorded += 1
+            # Sorting the window for every request would cost more than the
+            # hedging saves, the percentile moves slowly anyway.
+            if len(self._durations) >= self.min_samples and \
+                    (self._delay is None or self._recorded % 50 == 0):
+                durations = sorted(self._durations)
+                index = int(len(durations) * self.percentile / 100.0)
+                self._delay = durations[min(index, len(durations) - 1)]
+
+    def acquire(self):
+        """
+        Check if a slow request may be hedged.
+
+        :return: True when a hedge is within the budget, which is then used
+        :rtype: bool
+        """
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self.hedged += 1
+                return True
+            return False
+
+    def requested(self):
+        """
+        Count a request towards the budget.
+        """
+        with self._lock:
+            self._tokens = min(self._tokens + self.budget, self.burst)
+
+    def hedge_won(self):
+        """
+        Count a hedged request which responded first.
+        """
+        with self._lock:
+            self.won += 1
+
+    def stats(self):
+        """
+        :return: Dict with the current `delay`, the number of `hedged`
+            requests and the number of hedges which `won`
+        :rtype: dict
+        """
+        return {
+            'delay': self._delay,
+            'hedged': self.hedged,
+            'won': self.won,
+        }
@@ -0,0 +1,162 @@
+import functools
+import inspect
+import threading
+
+try:
+    from contextvars import ContextVar
+except ImportError:
+    ContextVar = None
+
+try:
+    from time import perf_counter as clock
+except ImportError:
+    from time import time as clock
+
+from keycloak import tracing
+
+__all__ = (
+    'HOOKS',
+    'RequestInfo',
+    'current_endpoint',
+    'default_hooks',
+    'endpoint',
+    'endpoint_class',
+)
+
+HOOKS = ('request', 'response', 'error')
+
+_iscoroutinefunction = getattr(inspect, 'iscoroutinefunction',
+                               lambda func: False)
+
+
+def default_hooks():
+    return dict((event, []) for event in HOOKS)
+
+
+def endpoint_class(name):
+    """
+    Get the class of an endpoint name, e.g. ``admin`` for
+    ``admin.users.single``.
+
+    :param str name:
+    :rtype: str
+    """
+    if name is None:
+        return None
+    return name.split('.', 1)[0]
+
+
+if ContextVar is not None:
+    _current_endpoint = ContextVar('keycloak_endpoint', default=None)
+
+    def current_endpoint():
+        """
+        :return: Name of the endpoint which is being called in the current
+            context or None
+        :rtype: str
+        """
+        return _current_endpoint.get()
+
+    def _set_endpoint(name):
+        return _current_endpoint.set(name)
+
+    def _reset_endpoint(token):
+        _current_endpoint.reset(token)
+else:
+    class _EndpointLocal(threading.local):
+        name = None
+
+    _current_endpoint = _EndpointLocal()
+
+    def current_endpoint():
+        """
+        :return: Name of the endpoint which is being called in the current
+            context or None
+        :rtype: str
+        """
+        return _current_endpoint.name
+
+    def _set_endpoint(name):
+        previous = _current_endpoint.name
+        _current_endpoint.name = name
+        return previous
+
+    def _reset_endpoint(previous):
+        _current_endpoint.name = previous
+
+
+def endpoint(name):
+    """
+    Decorate a method which calls the Keycloak endpoint identified by `name`.
+
+    Requests done by the client while the method runs get reported to the
+    hooks with this templated name (e.g. ``admin.users.single``) instead of
+    the raw URL. When tracing is instrumented the call gets its own span.
+
+    :param str name:
+    """
+    def decorator(func):
+        if _iscoroutinefunction(func):
+            from keycloak.aio.hooks import async_endpoint
+            return async_endpoint(name, func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            token = _set_endpoint(name)
+            try:
+                if tracing.tracer is None:
+                    return func(*args, **kwargs)
+                return tracing.call_in_span(name, func, args, kwargs)
+            finally:
+                _reset_endpoint(token)
+        return wrapper
+    return decorator
+
+
+class RequestInfo(object):
+    """
+    Information about a single HTTP round trip which is passed to the hooks.
+
+    Hooks can keep state for the round trip in the `context` dict, the same
+    object is passed to the `request` hook and to the `response` or `error`
+    hook.
+    """
+    __slots__ = ('method', 'url', 'endpoint', 'status', 'started',
+                 'duration', 'retries', 'hedged', 'rate_limit_wait',
+                 'exception', 'request_size', 'response_size', 'context')
+
+    def __init__(self, method, url, endpoint=None):
+        """
+        :param str method: HTTP method
+        :param str url: Requested URL, with failover it's changed to the
+            URL on the node of the current attempt
+        :param str endpoint: Templated endpoint name
+        """
+        self.method = method
+        self.url = url
+        self.endpoint = endpoint
+        self.status = None
+        self.started = clock()
+        self.duration = None
+        self.retries = 0
+        self.hedged = False
+        self.rate_limit_wait = 0.0
+        self.exception = None
+        self.request_size = None
+        self.response_size = None
+        self.context = {}
+
+    @property
+    def endpoint_class(self):
+        return endpoint_class(self.endpoint)
+
+    def finish(self, status=None, exception=None):
+        self.duration = clock() - self.started
+        self.status = status
+        self.exception = exception
+        return self
+
+    def __repr__(self):
+        return '<RequestInfo {} {} status={}>'.format(
+            self.method, self.endpoint or self.url, self.status
+        )
@@ -0,0 +1,283 @@
+"""
+Read-only views on JSON responses which are only decoded when accessed.
+
+The elements of a top level array (e.g. the users or clients of a realm) are
+decoded one by one when they are accessed and are not kept in memory by the
+view. Iterating over a large list therefore never holds more than one
+decoded element, and reading the first few elements only decodes those.
+Objects are decoded as a whole on first access.
+"""
+import json
+import re
+import threading
+
+try:
+    from collections.abc import Mapping, Sequence
+except ImportError:
+    from collections import Mapping, Sequence
+
+__all__ = (
+    'JSONArray',
+    'JSONObject',
+    'is_json_container',
+    'json_default',
+    'lazy_json',
+)
+
+_JSON_CONTAINER = re.compile(br'\s*([\[{])')
+_WHITESPACE = re.compile(r'\s*')
+_decoder = json.JSONDecoder()
+
+
+def is_json_container(content):
+    """
+    Check, without decoding, if the content looks like a JSON object or
+    array.
+
+    :param bytes content:
+    :rtype: bool
+    """
+    return _JSON_CONTAINER.match(content) is not None
+
+
+def lazy_json(content):
+    """
+    Get a read-only view on a JSON document which is decoded on access.
+
+    :param bytes content: Raw JSON object or array
+    :rtype: JSONObject | JSONArray
+    """
+    if _JSON_CONTAINER.match(content).group(1) == b'[':
+        return JSONArray(raw=content)
+    return JSONObject(raw=content)
+
+
+def json_default(value):
+    """
+    `default` of :func:`json.dumps` which serializes views as plain dicts and
+    lists, e.g. when a fetched representation is sent back to the server.
+
+    :param value:
+    :rtype: dict | list
+    """
+    if isinstance(value, (JSONObject, JSONArray)):
+        return value.to_python()
+    raise TypeError('{!r} is not JSON serializable'.format(value))
+
+
+def _wrap(value):
+    if isinstance(value, dict):
+        return JSONObject(data=value)
+    if isinstance(value, list):
+        return JSONArray(data=value)
+    return value
+
+
+def _unwrap(value):
+    if isinstance(value, (JSONObject, JSONArray)):
+        return value.to_python()
+    return value
+
+
+class JSONObject(Mapping):
+    """
+    Read-only view on a JSON object, nested objects and arrays are returned
+    as views as well.
+    """
+    __slots__ = ('_raw', '_data')
+
+    def __init__(self, raw=None, data=None):
+        """
+        :param bytes raw: Raw JSON which gets decoded on first access
+        :param dict data: Already decoded data
+        """
+        self._raw = raw
+        self._data = data
+
+    def _decoded(self):
+        if self._data is None:
+            self._data = json.loads(self._raw.decode('utf-8'))
+            # Only keep one representation in memory
+            self._raw = None
+        return self._data
+
+    def to_python(self):
+        """
+        Get the data as plain (mutable) dicts and lists.
+
+        :rtype: dict
+        """
+        return json.loads(json.dumps(self._decoded()))
+
+    def __getitem__(self, key):
+        return _wrap(self._decoded()[key])
+
+    def __iter__(self):
+        return iter(self._decoded())
+
+    def __len__(self):
+        return len(self._decoded())
+
+    def __contains__(self, key):
+        return key in self._decoded()
+
+    def __eq__(self, other):
+        return self._decoded() == _unwrap(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '<JSONObject {!r}>'.format(self._decoded())
+
+    def __getstate__(self):
+        return self._decoded()
+
+    def __setstate__(self, state):
+        self._raw = None
+        self._data = state
+
+
+class JSONArray(Sequence):
+    """
+    Read-only view on a JSON array, nested objects and arrays are returned as
+    views as well.
+
+    When created from raw JSON the view only keeps the text and the offsets
+    of the elements which have been found so far, elements are decoded every
+    time they are accessed.
+    """
+    __slots__ = ('_text', '_offsets', '_end', '_done', '_lock', '_data')
+
+    def __init__(self, raw=None, data=None):
+        """
+        :param bytes raw: Raw JSON array
+        :param list data: Already decoded data
+        """
+        self._data = data
+        if data is None:
+            self._text = raw.decode('utf-8')
+            self._offsets = []
+            self._end = _WHITESPACE.match(self._text).end() + 1
+            self._done = False
+            self._lock = threading.Lock()
+
+    def _scan(self):
+        """
+        Decode the next element to find where it ends, must be called with
+        the lock held.
+
+        :return: Decoded element or None when the end of the array is reached
+        """
+        index = _WHITESPACE.match(self._text, self._end).end()
+        if self._text[index] == ']':
+            self._done = True
+            return None
+        if self._offsets:
+            if self._text[index] != ',':
+                raise ValueError(
+                    'Expecting "," delimiter at char {}'.format(index)
+                )
+            index = _WHITESPACE.match(self._text, index + 1).end()
+
+        value, self._end = _decoder.raw_decode(self._text, index)
+        self._offsets.append(index)
+        return value
+
+    def _value(self, index):
+        """
+        Decode the element at a non-negative index.
+        """
+        with self._lock:
+            if index < len(self._offsets):
+                offset = self._offsets[index]
+            else:
+                while not self._done:
+                    value = self._scan()
+                    if len(self._offsets) > index:
+                        return value
+                raise IndexError('list index out of range')
+        return _decoder.raw_decode(self._text, offset)[0]
+
+    def _values(self):
+        if self._data is not None:
+            for value in self._data:
+                yield value
+            return
+
+        index = 0
+        while True:
+            try:
+                yield self._value(index)
+            except IndexError:
+                return
+            index += 1
+
+    def _unwrapped(self, index):
+        if self._data is not None:
+            return self._data[index]
+        if index < 0:
+            index += len(self)
+            if index < 0:
+                raise IndexError('list index out of range')
+        return self._value(index)
+
+    def to_python(self):
+        """
+        Get the data as plain (mutable) dicts and lists.
+
+        :rtype: list
+        """
+        if self._data is not None:
+            return json.loads(json.dumps(self._data))
+        return list(self._values())
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return _wrap(self._unwrapped(index))
+
+        if self._data is not None:
+            return JSONArray(data=self._data[index])
+
+        start, stop, step = index.start or 0, index.stop, index.step or 1
+        if start < 0 or stop is None or stop < 0 or step < 0:
+            # The length is needed, which means all elements are scanned
+            start, stop, step = index.indices(len(self))
+        values = []
+        for position in range(start, stop, step):
+            try:
+                values.append(self._unwrapped(position))
+            except IndexError:
+                break
+        return JSONArray(data=values)
+
+    def __iter__(self):
+        for value in self._values():
+            yield _wrap(value)
+
+    def __len__(self):
+        if self._data is not None:
+            return len(self._data)
+        with self._lock:
+            while not self._done:
+                self._scan()
+            return len(self._offsets)
+
+    def __eq__(self, other):
+        return self.to_python() == _unwrap(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '<JSONArray {!r}>'.format(self.to_python())
+
+    def __getstate__(self):
+        return self.to_python()
+
+    def __setstate__(self, state):
+        self._data = state
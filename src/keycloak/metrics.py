@@ -0,0 +1,399 @@
+import threading
+import weakref
+from bisect import bisect_left
+
+__all__ = (
+    'MetricsCollector',
+)
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+class _Shard(object):
+    """
+    Counters which are only written by a single thread, so no locking is
+    needed on the hot path.
+    """
+
+    def __init__(self, buckets):
+        self.empty_buckets = [0] * (len(buckets) + 1)
+        self.started = {}
+        self.finished = {}
+        self.responses = {}
+        self.errors = {}
+        self.buckets = {}
+        self.duration = {}
+
+
+class _ThreadShard(object):
+    """
+    Holds the shard of a thread in a thread local, it's freed when the
+    thread ends.
+    """
+    __slots__ = ('shard', '__weakref__')
+
+    def __init__(self, shard):
+        self.shard = shard
+
+
+def _totals():
+    return {
+        'started': {}, 'finished': {}, 'responses': {}, 'errors': {},
+        'buckets': {}, 'duration': {},
+    }
+
+
+def _merge(totals, counters):
+    """
+    :param dict totals: See :func:`_totals`
+    :param dict counters: Totals or the attributes of a shard
+    """
+    for name in ('started', 'finished', 'responses', 'errors', 'duration'):
+        target = totals[name]
+        for key, value in dict(counters[name]).items():
+            target[key] = target.get(key, 0) + value
+    for key, counts in dict(counters['buckets']).items():
+        counts = list(counts)
+        target = totals['buckets'].setdefault(key, [0] * len(counts))
+        for index, count in enumerate(counts):
+            target[index] += count
+
+
+class MetricsCollector(object):
+    """
+    Collects request counts, latency histograms, errors, in-flight requests,
+    connection pool usage and TLS handshakes for one or more clients.
+
+    Counters are kept per thread and only summed when a snapshot is taken,
+    so collecting has no lock contention between threads. The counters of a
+    thread which ended are added to the totals of the ended threads.
+
+    .. code-block:: python
+
+        metrics = MetricsCollector()
+        metrics.instrument(realm.client)
+
+        metrics.snapshot()
+        metrics.export_prometheus()
+    """
+
+    def __init__(self, buckets=None, prefix='keycloak'):
+        """
+        :param list buckets: (optional) Upper bounds in seconds of the
+            latency histogram buckets.
+        :param str prefix: (optional) Prefix for the Prometheus metric names
+        """
+        self._buckets = tuple(sorted(buckets or DEFAULT_BUCKETS))
+        self._prefix = prefix
+        self._clients = weakref.WeakSet()
+        self._caches = weakref.WeakSet()
+        self._reset_shards()
+
+    def _reset_shards(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = {}
+        self._ended = []
+        self._retired = _totals()
+
+    def __getstate__(self):
+        # The hooks of an instrumented client are bound to the collector, so
+        # it's pickled with the client. The unpickled collector starts with
+        # empty counters.
+        state = self.__dict__.copy()
+        for name in ('_local', '_lock', '_shards', '_ended', '_retired'):
+            del state[name]
+        state['_clients'] = list(self._clients)
+        state['_caches'] = list(self._caches)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset_shards()
+        self._clients = weakref.WeakSet(state['_clients'])
+        self._caches = weakref.WeakSet(state['_caches'])
+
+    def instrument(self, client):
+        """
+        Collect metrics for all requests done by the client.
+
+        :param keycloak.client.KeycloakClient client:
+        """
+        client.register_hook('request', self._on_request)
+        client.register_hook('response', self._on_response)
+        client.register_hook('error', self._on_error)
+        self._clients.add(client)
+
+    def instrument_cache(self, cache):
+        """
+        Collect how stale the entries are which are served by the cache.
+
+        :param keycloak.cache.StaleCache cache:
+        """
+        self._caches.add(cache)
+
+    def _shard(self):
+        try:
+            return self._local.holder.shard
+        except AttributeError:
+            shard = _Shard(self._buckets)
+            holder = self._local.holder = _ThreadShard(shard)
+            ref = weakref.ref(holder, self._thread_ended)
+            with self._lock:
+                self._shards[ref] = shard
+            return shard
+
+    def _thread_ended(self, ref):
+        # Called by the garbage collection, which can happen while the lock is
+        # held. The shard is added to the retired totals by the next
+        # collection.
+        shard = self._shards.pop(ref, None)
+        if shard is not None:
+            self._ended.append(shard)
+
+    @staticmethod
+    def _incr(counters, key):
+        counters[key] = counters.get(key, 0) + 1
+
+    def _on_request(self, info):
+        self._incr(self._shard().started, info.endpoint_class or 'unknown')
+
+    def _finish(self, info, error):
+        shard = self._shard()
+        key = info.endpoint_class or 'unknown'
+
+        self._incr(shard.finished, key)
+        if error is not None:
+            self._incr(shard.errors, (key, error))
+
+        try:
+            buckets = shard.buckets[key]
+        except KeyError:
+            buckets = shard.buckets[key] = list(shard.empty_buckets)
+        buckets[bisect_left(self._buckets, info.duration)] += 1
+        shard.duration[key] = shard.duration.get(key, 0.0) + info.duration
+
+    def _on_response(self, info):
+        key = info.endpoint_class or 'unknown'
+        self._incr(self._shard().responses, (key, info.status))
+        self._finish(info, str(info.status) if info.status >= 400 else None)
+
+    def _on_error(self, info):
+        self._finish(info, type(info.exception).__name__)
+
+    def _collect(self):
+        with self._lock:
+            shards = list(self._shards.copy().values())
+            # A shard which ended after the copy above is only counted once,
+            # as retired
+            ended = set()
+            while self._ended:
+                shard = self._ended.pop()
+                ended.add(id(shard))
+                _merge(self._retired, vars(shard))
+
+            totals = _totals()
+            _merge(totals, self._retired)
+
+        for shard in shards:
+            if id(shard) not in ended:
+                _merge(totals, vars(shard))
+        return totals
+
+    def pool_stats(self):
+        """
+        Connection pool usage of the instrumented clients.
+
+        :rtype: list
+        """
+        stats = []
+        for client in list(self._clients):
+            stats.extend(client.pool_stats())
+        return stats
+
+    def tls_stats(self):
+        """
+        TLS handshakes done with the TLS contexts of the instrumented
+        clients, a context which is shared by clients is counted once. See
+        :meth:`keycloak.client.KeycloakClient.tls_stats`.
+
+        :rtype: dict
+        """
+        contexts = {}
+        for client in list(self._clients):
+            if client.ssl_context is not None:
+                contexts[id(client.ssl_context)] = client
+
+        stats = {'handshakes': 0, 'resumed': 0, 'full': 0}
+        for client in contexts.values():
+            for name, value in client.tls_stats().items():
+                stats[name] += value
+        return stats
+
+    def cache_stats(self):
+        """
+        Staleness of the entries of the instrumented caches, see
+        :meth:`keycloak.cache.StaleCache.stats`.
+
+        :rtype: dict
+        """
+        stats = {}
+        for cache in list(self._caches):
+            for key, cache_stats in cache.stats().items():
+                target = stats.get(key)
+                if target is None:
+                    stats[key] = dict(cache_stats)
+                    continue
+                for name, value in cache_stats.items():
+                    target[name] = max(target[name], value) \
+                        if name == 'staleness' else target[name] + value
+        return stats
+
+    def snapshot(self):
+        """
+        Get all metrics as a plain dict.
+
+        :rtype: dict
+        """
+        totals = self._collect()
+        snapshot = {
+            'requests': dict(totals['finished']),
+            'in_flight': {},
+            'responses': {},
+            'errors': {},
+            'latency': {},
+            'pools': self.pool_stats(),
+            'caches': self.cache_stats(),
+            'tls': self.tls_stats(),
+        }
+
+        for key, started in totals['started'].items():
+            snapshot['in_flight'][key] = \
+                started - totals['finished'].get(key, 0)
+        for (key, status), count in totals['responses'].items():
+            snapshot['responses'].setdefault(key, {})[status] = count
+        for (key, error), count in totals['errors'].items():
+            snapshot['errors'].setdefault(key, {})[error] = count
+        for key, counts in totals['buckets'].items():
+            cumulative = 0
+            buckets = []
+            for bound, count in zip(self._buckets + (float('inf'),),
+                                    counts):
+                cumulative += count
+                buckets.append((bound, cumulative))
+            snapshot['latency'][key] = {
+                'buckets': buckets,
+                'sum': totals['duration'].get(key, 0.0),
+                'count': cumulative,
+            }
+        return snapshot
+
+    def export_prometheus(self):
+        """
+        Get all metrics in the Prometheus text exposition format.
+
+        :rtype: str
+        """
+        snapshot = self.snapshot()
+        lines = []
+
+        def metric(name, type_, help_, samples):
+            name = '{}_{}'.format(self._prefix, name)
+            lines.append('# HELP {} {}'.format(name, help_))
+            lines.append('# TYPE {} {}'.format(name, type_))
+            for suffix, labels, value in samples:
+                lines.append('{}{}{{{}}} {}'.format(
+                    name, suffix,
+                    ','.join('{}="{}"'.format(label, _escape(label_value))
+                             for label, label_value in labels),
+                    _format_value(value)
+                ))
+
+        metric('requests_total', 'counter',
+               'Finished requests per endpoint class.',
+               [('', [('endpoint_class', key)], value)
+                for key, value in sorted(snapshot['requests'].items())])
+        metric('responses_total', 'counter',
+               'Received responses per endpoint class and status.',
+               [('', [('endpoint_class', key), ('status', status)], value)
+                for key, statuses in sorted(snapshot['responses'].items())
+                for status, value in sorted(statuses.items())])
+        metric('errors_total', 'counter',
+               'Failed requests per endpoint class and status or exception.',
+               [('', [('endpoint_class', key), ('error', error)], value)
+                for key, errors in sorted(snapshot['errors'].items())
+                for error, value in sorted(errors.items())])
+        metric('requests_in_flight', 'gauge',
+               'Requests which are currently in flight.',
+               [('', [('endpoint_class', key)], value)
+                for key, value in sorted(snapshot['in_flight'].items())])
+
+        samples = []
+        for key, latency in sorted(snapshot['latency'].items()):
+            for bound, count in latency['buckets']:
+                samples.append(('_bucket', [('endpoint_class', key),
+                                            ('le', bound)], count))
+            samples.append(('_sum', [('endpoint_class', key)],
+                            latency['sum']))
+            samples.append(('_count', [('endpoint_class', key)],
+                            latency['count']))
+        metric('request_duration_seconds', 'histogram',
+               'Request latency per endpoint class.', samples)
+
+        samples = []
+        for pool in snapshot['pools']:
+            for state in ('in_use', 'idle'):
+                samples.append(('', _pool_labels(pool) + [('state', state)],
+                                pool[state]))
+        metric('pool_connections', 'gauge',
+               'Pooled connections per pool and state.', samples)
+        metric('pool_maxsize', 'gauge',
+               'Maximum number of connections per pool.',
+               [('', _pool_labels(pool), pool['maxsize'])
+                for pool in snapshot['pools']])
+
+        metric('tls_handshakes_total', 'counter',
+               'TLS handshakes, resumed sessions and full handshakes.',
+               [('', [('resumed', 'true')], snapshot['tls']['resumed']),
+                ('', [('resumed', 'false')], snapshot['tls']['full'])])
+
+        caches = sorted(snapshot['caches'].items())
+        metric('cache_staleness_seconds', 'gauge',
+               'Seconds since the served cache entry expired, 0 when it is '
+               'fresh.',
+               [('', [('key', key)], stats['staleness'])
+                for key, stats in caches])
+        metric('cache_served_stale_total', 'counter',
+               'Expired cache entries which were served.',
+               [('', [('key', key)], stats['served_stale'])
+                for key, stats in caches])
+        metric('cache_refresh_errors_total', 'counter',
+               'Failed refreshes of cache entries.',
+               [('', [('key', key)], stats['refresh_errors'])
+                for key, stats in caches])
+
+        return '\n'.join(lines) + '\n'
+
+
+def _pool_labels(pool):
+    labels = [('pool', pool['pool'])]
+    if 'traffic_class' in pool:
+        labels.append(('traffic_class', pool['traffic_class']))
+    return labels
+
+
+def _escape(value):
+    if isinstance(value, float):
+        return _format_value(value)
+    return str(value).replace('\\', r'\\').replace('"', r'\"') \
+        .replace('\n', r'\n')
+
+
+def _format_value(value):
+    if value is None:
+        return 'NaN'
+    if value == float('inf'):
+        return '+Inf'
+    return repr(value) if isinstance(value, float) else str(value)
@@ -1,5 +1,9 @@
+import threading
+
 from keycloak.well_known import KeycloakWellKnown
 
+_well_known_lock = threading.Lock()
+
 
 class WellKnownMixin(object):
     _well_known = None
@@ -11,10 +15,15 @@ class WellKnownMixin(object):
     @property
     def well_known(self):
         if self._well_known is None:
-            self._well_known = KeycloakWellKnown(
-                realm=self._realm,
-                path=self._realm.client.get_full_url(
-                    self.get_path_well_known().format(self._realm.realm_name)
-                )
-            )
+            # Only held while creating the object, fetching the contents is
+            # locked by the object itself.
+            with _well_known_lock:
+                if self._well_known is None:
+                    self._well_known = KeycloakWellKnown(
+                        realm=self._realm,
+                        path=self._realm.client.get_full_url(
+                            self.get_path_well_known().format(
+                                self._realm.realm_name)
+                        )
+                    )
         return self._well_known
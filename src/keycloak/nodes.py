@@ -0,0 +1,180 @@
+"""
+Latency-aware selection of the Keycloak node to send a request to, when a
+client is created with more than one server URL.
+
+Every node keeps an exponentially weighted moving average (EWMA) of its
+response times. Requests go to the fastest healthy node, a node which fails
+is marked unhealthy for a cool-down period and the request fails over to the
+next node.
+"""
+import threading
+
+from keycloak.hooks import clock
+
+__all__ = (
+    'Node',
+    'NodeSet',
+    'server_urls',
+)
+
+#: Statuses on which an idempotent request fails over to the next node
+FAILOVER_STATUSES = frozenset((502, 503, 504))
+
+#: Methods which can safely be sent again to another node after a response
+IDEMPOTENT_METHODS = frozenset(('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'))
+
+
+def server_urls(server_url):
+    """
+    :param str | list | tuple server_url: One or more base URLs
+    :return: The base URLs
+    :rtype: tuple
+    """
+    if isinstance(server_url, (list, tuple)):
+        if not server_url:
+            raise ValueError('At least one server URL is required')
+        return tuple(server_url)
+    return (server_url,)
+
+
+class Node(object):
+    """
+    A Keycloak node with its latency and health.
+    """
+    __slots__ = ('url', 'latency', 'failures', 'down_until')
+
+    def __init__(self, url):
+        """
+        :param str url: Base URL of the node
+        """
+        self.url = url
+        self.latency = None
+        self.failures = 0
+        self.down_until = 0
+
+    def healthy(self, now):
+        return self.down_until <= now
+
+    def __repr__(self):
+        return '<Node {} latency={}>'.format(self.url, self.latency)
+
+
+class NodeSet(object):
+    """
+    The nodes of a Keycloak cluster which all serve the same realms.
+    """
+
+    def __init__(self, urls, decay=0.3, cooldown=30, max_cooldown=300):
+        """
+        :param list urls: Base URLs of the nodes, requests are done on the
+            first one
+        :param float decay: (optional) Weight of a new response time in the
+            moving average
+        :param float cooldown: (optional) Seconds a failed node is skipped,
+            doubled for every consecutive failure
+        :param float max_cooldown: (optional) Maximum number of seconds a
+            failed node is skipped
+        """
+        self.nodes = [Node(url) for url in urls]
+        self.decay = decay
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def match(self, url):
+        """
+        :param str url:
+        :return: The node which serves the URL or None when it's not on one
+            of the nodes (e.g. an endpoint of the .well-known document on
+            another host)
+        :rtype: Node
+        """
+        for node in self.nodes:
+            base = node.url.rstrip('/')
+            if url.startswith(base) and \
+                    url[len(base):len(base) + 1] in ('', '/', '?', '#'):
+                return node
+        return None
+
+    @staticmethod
+    def rewrite(url, matched, node):
+        """
+        :param str url: URL on the `matched` node
+        :param Node matched:
+        :param Node node:
+        :return: The same URL on another node
+        :rtype: str
+        """
+        if node is matched:
+            return url
+        return node.url.rstrip('/') + url[len(matched.url.rstrip('/')):]
+
+    def candidates(self, rotate=False):
+        """
+        :param bool rotate: (optional) Move the best node to the end, e.g.
+            for a hedged request
+        :return: The healthy nodes from fast to slow followed by the
+            unhealthy ones from the first to recover to the last. Nodes
+            without a measurement are tried first, so every node gets
+            measured.
+        :rtype: list
+        """
+        now = clock()
+        nodes = list(self.nodes)
+        healthy = sorted((node for node in nodes if node.healthy(now)),
+                         key=lambda node: node.latency or 0)
+        unhealthy = sorted((node for node in nodes if not node.healthy(now)),
+                           key=lambda node: node.down_until)
+        candidates = healthy + unhealthy
+        if rotate:
+            return candidates[1:] + candidates[:1]
+        return candidates
+
+    def succeeded(self, node, duration):
+        """
+        :param Node node:
+        :param float duration: Seconds the round trip took
+        """
+        with self._lock:
+            if node.latency is None:
+                node.latency = duration
+            else:
+                node.latency += self.decay * (duration - node.latency)
+            node.failures = 0
+            node.down_until = 0
+
+    def failed(self, node):
+        """
+        :param Node node:
+        """
+        with self._lock:
+            node.failures += 1
+            cooldown = min(self.cooldown * 2 ** min(node.failures - 1, 16),
+                           self.max_cooldown)
+            node.down_until = clock() + cooldown
+
+    def stats(self):
+        """
+        :return: List of dicts with `url`, `latency`, `healthy` and
+            `failures` per node
+        :rtype: list
+        """
+        now = clock()
+        return [{
+            'url': node.url,
+            'latency': node.latency,
+            'healthy': node.healthy(now),
+            'failures': node.failures,
+        } for node in self.nodes]
@@ -1,3 +1,5 @@
+from keycloak.cache import get_or_fetch
+from keycloak.hooks import endpoint
 from keycloak.mixins import WellKnownMixin
 
 try:
@@ -5,8 +7,6 @@ try:
 except ImportError:
     from urllib import urlencode  # noqa: F041
 
-from jose import jwt
-
 PATH_WELL_KNOWN = "auth/realms/{}/.well-known/openid-configuration"
 
 
@@ -90,12 +90,15 @@ class KeycloakOpenidConnect(WellKnownMixin):
         :raises jose.exceptions.JWTClaimsError: If any claim is invalid in any
             way.
         """
+        # python-jose and its crypto backends take a while to import
+        from jose import jwt
         return jwt.decode(
             token, key,
             audience=kwargs.pop('audience', None) or self._client_id,
             algorithms=algorithms or ['RS256'], **kwargs
         )
 
+    @endpoint('token.logout')
     def logout(self, refresh_token):
         """
         The logout endpoint logs out the authenticated user.
@@ -109,6 +112,7 @@ class KeycloakOpenidConnect(WellKnownMixin):
                                            'client_secret': self._client_secret
                                        })
 
+    @endpoint('discovery.jwks')
     def certs(self):
         """
         The certificate endpoint returns the public keys enabled by the realm,
@@ -117,10 +121,15 @@ class KeycloakOpenidConnect(WellKnownMixin):
 
         https://tools.ietf.org/html/rfc7517
 
+        When the realm has a cache the keys are cached as well.
+
         :rtype: dict
         """
-        return self._realm.client.get(self.get_url('jwks_uri'))
+        url = self.get_url('jwks_uri')
+        return get_or_fetch(self._realm.cache, url,
+                            lambda: self._realm.client.get(url))
 
+    @endpoint('userinfo')
     def userinfo(self, token):
         """
         The UserInfo Endpoint is an OAuth 2.0 Protected Resource that returns
@@ -143,6 +152,7 @@ class KeycloakOpenidConnect(WellKnownMixin):
                                           )
                                       })
 
+    @endpoint('authz.uma_ticket')
     def uma_ticket(self, token, **kwargs):
         """
         :param str audience: (optional) Client ID to get te permissions for.
@@ -183,6 +193,7 @@ class KeycloakOpenidConnect(WellKnownMixin):
 
         return '{}?{}'.format(url, params)
 
+    @endpoint('token.grant')
     def authorization_code(self, code, redirect_uri):
         """
         Retrieve access token by `authorization_code` grant.
@@ -199,6 +210,7 @@ class KeycloakOpenidConnect(WellKnownMixin):
         return self._token_request(grant_type='authorization_code', code=code,
                                    redirect_uri=redirect_uri)
 
+    @endpoint('token.grant')
     def password_credentials(self, username, password, **kwargs):
         """
         Retrieve access token by 'password credentials' grant.
@@ -214,6 +226,7 @@ class KeycloakOpenidConnect(WellKnownMixin):
                                    username=username, password=password,
                                    **kwargs)
 
+    @endpoint('token.grant')
     def client_credentials(self, **kwargs):
         """
         Retrieve access token by `client_credentials` grant.
@@ -226,6 +239,7 @@ class KeycloakOpenidConnect(WellKnownMixin):
         """
         return self._token_request(grant_type='client_credentials', **kwargs)
 
+    @endpoint('token.grant')
     def refresh_token(self, refresh_token, **kwargs):
         """
         Refresh an access token
@@ -240,6 +254,7 @@ class KeycloakOpenidConnect(WellKnownMixin):
         return self._token_request(grant_type='refresh_token',
                                    refresh_token=refresh_token, **kwargs)
 
+    @endpoint('token.grant')
     def token_exchange(self, **kwargs):
         """
         Token exchange is the process of using a set of credentials or token to
@@ -0,0 +1,290 @@
+"""
+Separate connection pools per traffic class, so e.g. a bulk admin export
+can't take the connections which logins and token validation need.
+
+.. code-block:: python
+
+    client = KeycloakClient(..., pools=TrafficPools({
+        'auth': 20,
+        'authz': 10,
+        'admin': PoolLimits(maxsize=4, max_waiting=100, timeout=30),
+    }))
+
+Every traffic class gets its own session (and so its own connection pool)
+and at most `maxsize` requests of a class are sent at the same time, the
+others wait in line. Requests of endpoint classes without a pool use the
+session of the client like before.
+"""
+import threading
+from collections import deque
+
+from keycloak.exceptions import PoolExhausted
+
+__all__ = (
+    'PoolLimits',
+    'Slots',
+    'TRAFFIC_CLASSES',
+    'TrafficPools',
+    'acquire_slot',
+)
+
+#: Traffic class per endpoint class (see :func:`keycloak.hooks.endpoint_class`)
+TRAFFIC_CLASSES = {
+    'discovery': 'auth',
+    'token': 'auth',
+    'userinfo': 'auth',
+    'authz': 'authz',
+    'uma': 'authz',
+    'admin': 'admin',
+}
+
+
+class PoolLimits(object):
+    """
+    Size and queueing limits of the pool of a traffic class.
+    """
+
+    def __init__(self, maxsize=10, max_waiting=None, timeout=None):
+        """
+        :param int maxsize: (optional) Number of connections, which is the
+            number of requests sent at the same time
+        :param int max_waiting: (optional) Number of requests which may wait
+            for a connection, more requests fail right away. Unlimited by
+            default.
+        :param float timeout: (optional) Seconds a request may wait for a
+            connection, waits as long as needed by default
+        """
+        self.maxsize = maxsize
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+
+    def __repr__(self):
+        return '<PoolLimits maxsize={} max_waiting={} timeout={}>'.format(
+            self.maxsize, self.max_waiting, self.timeout
+        )
+
+
+class _Waiter(object):
+    __slots__ = ('wake', 'granted')
+
+    def __init__(self, wake):
+        self.wake = wake
+        self.granted = False
+
+
+class Slots(object):
+    """
+    Slots for requests which are sent at the same time, e.g. the connections
+    of a traffic class. A released slot is handed to the request which waits
+    the longest, so waiting requests are served in order.
+    """
+
+    def __init__(self, name, limits):
+        self.name = name
+        self.limits = limits
+        self.in_use = 0
+        self.requests = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        state['in_use'] = 0
+        state['_waiters'] = deque()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def capacity(self):
+        """
+        :return: Number of slots
+        :rtype: int
+        """
+        return self.limits.maxsize
+
+    def enter(self, wake):
+        """
+        Take a slot or get in line for one.
+
+        :param callable wake: Called without arguments (from the thread
+            which releases a slot) when a slot is granted to the waiter
+        :return: None when a slot is taken, otherwise the waiter
+        :raises PoolExhausted: When too many requests are waiting already
+        """
+        with self._lock:
+            self.requests += 1
+            if self.in_use < self.capacity() and not self._waiters:
+                self.in_use += 1
+                return None
+            if self.limits.max_waiting is not None and \
+                    len(self._waiters) >= self.limits.max_waiting:
+                self.rejected += 1
+                raise PoolExhausted(
+                    'Too many requests are waiting for a connection of the '
+                    '"{}" pool'.format(self.name)
+                )
+            waiter = _Waiter(wake)
+            self._waiters.append(waiter)
+            self.queued += 1
+            return waiter
+
+    def cancel(self, waiter, timeout=True):
+        """
+        Stop waiting for a slot.
+
+        :param _Waiter waiter:
+        :param bool timeout: (optional) Count it as a timeout
+        :return: False when the slot was granted already, the caller owns it
+        :rtype: bool
+        """
+        with self._lock:
+            if waiter.granted:
+                return False
+            self._waiters.remove(waiter)
+            if timeout:
+                self.timeouts += 1
+            return True
+
+    def timed_out(self):
+        return PoolExhausted(
+            'Timed out after {}s waiting for a connection of the "{}" '
+            'pool'.format(self.limits.timeout, self.name)
+        )
+
+    def release(self):
+        with self._lock:
+            # The capacity may have shrunk since the slot was taken
+            if not self._waiters or self.in_use > self.capacity():
+                self.in_use -= 1
+                return
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+        waiter.wake()
+
+    def _grant(self):
+        """
+        Hand free slots to waiters, after the capacity grew. Must be called
+        with the lock held.
+
+        :return: The waiters to wake after releasing the lock
+        :rtype: list
+        """
+        granted = []
+        while self._waiters and self.in_use < self.capacity():
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+            self.in_use += 1
+            granted.append(waiter)
+        return granted
+
+    def stats(self):
+        with self._lock:
+            return {
+                'maxsize': self.capacity(),
+                'in_use': self.in_use,
+                'waiting': len(self._waiters),
+                'requests': self.requests,
+                'queued': self.queued,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+            }
+
+
+def acquire_slot(slots):
+    """
+    Take a slot, waits for one when they are all in use.
+
+    :param Slots slots: E.g. the pool of a traffic class
+    :raises PoolExhausted: When too many requests are waiting or the
+        timeout of the slots passed
+    """
+    event = threading.Event()
+    waiter = slots.enter(event.set)
+    if waiter is None:
+        return
+    if not event.wait(slots.limits.timeout) and slots.cancel(waiter):
+        raise slots.timed_out()
+
+
+class TrafficPools(object):
+    """
+    The pools per traffic class and which endpoint classes use them.
+    """
+
+    def __init__(self, limits, classes=None):
+        """
+        :param dict limits: Per traffic class the size of the pool or
+            :class:`PoolLimits`
+        :param dict classes: (optional) Traffic class per endpoint class,
+            defaults to :data:`TRAFFIC_CLASSES`
+        """
+        self.classes = dict(TRAFFIC_CLASSES if classes is None else classes)
+        self._pools = {}
+        for name, pool_limits in limits.items():
+            if not isinstance(pool_limits, PoolLimits):
+                pool_limits = PoolLimits(maxsize=pool_limits)
+            self._pools[name] = Slots(name, pool_limits)
+
+    def names(self):
+        """
+        :return: The traffic classes which have a pool
+        :rtype: list
+        """
+        return sorted(self._pools)
+
+    def traffic_class(self, endpoint_class):
+        """
+        :param str endpoint_class:
+        :return: The traffic class of the endpoint class, None when it has
+            no pool
+        :rtype: str
+        """
+        name = self.classes.get(endpoint_class)
+        return name if name in self._pools else None
+
+    def pool(self, name):
+        """
+        :param str name: Traffic class
+        :rtype: Slots
+        """
+        return self._pools[name]
+
+    def limits(self, name):
+        """
+        :param str name: Traffic class
+        :rtype: PoolLimits
+        """
+        return self._pools[name].limits
+
+    def acquire(self, name):
+        """
+        Take a connection slot of the pool, waits for one when they are all
+        in use.
+
+        :param str name: Traffic class
+        :raises PoolExhausted: When too many requests are waiting or the
+            timeout of the pool passed
+        """
+        acquire_slot(self._pools[name])
+
+    def release(self, name):
+        """
+        :param str name: Traffic class
+        """
+        self._pools[name].release()
+
+    def stats(self):
+        """
+        :return: Per traffic class a dict with the `maxsize`, the slots
+            `in_use`, the number of `waiting` requests and the totals of
+            `requests`, `queued` requests, `rejected` requests and
+            `timeouts`
+        :rtype: dict
+        """
+        return dict((name, pool.stats()) for name, pool in self._pools.items())
@@ -0,0 +1,134 @@
+"""
+Client-side rate limiting per endpoint class, so e.g. a bulk admin job can't
+slow down the logins which are served by the same Keycloak.
+
+.. code-block:: python
+
+    client = KeycloakClient(..., rate_limiter=RateLimiter({
+        'admin': 5,             # 5 requests per second
+        'token': (50, 100),     # 50 requests per second, bursts of 100
+    }))
+
+Requests which exceed the rate wait (block or sleep in the event loop) for
+their turn instead of failing.
+"""
+import threading
+
+from keycloak.hooks import clock
+
+__all__ = (
+    'RateLimiter',
+    'TokenBucket',
+)
+
+
+class TokenBucket(object):
+    """
+    Token bucket which hands out reservations: a request which finds the
+    bucket empty takes a token in advance and waits until it's refilled.
+    Waiting requests are served in the order they arrived.
+    """
+
+    def __init__(self, rate, burst=None):
+        """
+        :param float rate: Tokens added per second
+        :param float burst: (optional) Size of the bucket, defaults to one
+            second worth of tokens (at least one)
+        """
+        self.rate = float(rate)
+        self.burst = float(max(1, rate) if burst is None else burst)
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Take a token.
+
+        :return: Seconds to wait before the token may be used
+        :rtype: float
+        """
+        with self._lock:
+            now = clock()
+            self._tokens = min(self.burst, self._tokens +
+                               (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class RateLimiter(object):
+    """
+    A token bucket per endpoint class (e.g. ``admin``, ``token``, ``authz``
+    or ``userinfo``, see :func:`keycloak.hooks.endpoint_class`). Requests of
+    other endpoint classes are not limited.
+    """
+
+    def __init__(self, limits):
+        """
+        :param dict limits: Per endpoint class the number of requests per
+            second, a tuple with the rate and the burst size or a
+            :class:`TokenBucket`
+        """
+        self._buckets = {}
+        for name, limit in limits.items():
+            if not isinstance(limit, TokenBucket):
+                limit = TokenBucket(*limit) if isinstance(limit, tuple) \
+                    else TokenBucket(limit)
+            self._buckets[name] = limit
+        self._lock = threading.Lock()
+        self._stats = dict((name, {'requests': 0, 'delayed': 0,
+                                   'waited': 0.0})
+                           for name in self._buckets)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def reserve(self, name):
+        """
+        Take a token for a request.
+
+        :param str name: Endpoint class of the request
+        :return: Seconds to wait before sending the request
+        :rtype: float
+        """
+        bucket = self._buckets.get(name)
+        if bucket is None:
+            return 0.0
+
+        wait = bucket.reserve()
+        with self._lock:
+            stats = self._stats[name]
+            stats['requests'] += 1
+            if wait > 0:
+                stats['delayed'] += 1
+                stats['waited'] += wait
+        return wait
+
+    def stats(self):
+        """
+        :return: Per endpoint class a dict with the number of `requests`,
+            the number of `delayed` requests and the total seconds they
+            `waited` for a token
+        :rtype: dict
+        """
+        with self._lock:
+            return dict((name, dict(stats))
+                        for name, stats in self._stats.items())
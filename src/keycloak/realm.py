@@ -1,9 +1,32 @@
-from keycloak.admin import KeycloakAdmin
-from keycloak.authz import KeycloakAuthz
+import threading
+
 from keycloak.client import KeycloakClient
-from keycloak.openid_connect import KeycloakOpenidConnect
-from keycloak.uma import KeycloakUMA
-from keycloak.uma1 import KeycloakUMA1
+
+
+def _run_concurrently(*funcs):
+    """
+    Call every function in its own thread and wait for all of them.
+
+    The first exception which is raised by one of the functions is raised.
+    """
+    errors = []
+
+    def target(func):
+        try:
+            func()
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=target, args=(func,))
+               for func in funcs[1:]]
+    for thread in threads:
+        thread.start()
+    target(funcs[0])
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
 
 
 class KeycloakRealm(object):
@@ -13,29 +36,86 @@ class KeycloakRealm(object):
 
     _headers = None
     _client = None
+    _client_params = None
+    _owns_client = True
+    _cache = None
 
-    def __init__(self, server_url, realm_name, headers=None):
+    def __init__(self, server_url, realm_name, headers=None, client=None,
+                 cache=None, **client_params):
         """
-        :param str server_url: The base URL where the Keycloak server can be
-            found
+        :param str | list server_url: The base URL where the Keycloak server
+            can be found, or a list with the base URLs of the nodes of a
+            cluster, see :class:`keycloak.client.KeycloakClient`
         :param str realm_name: REALM name
         :param dict headers: Optional extra headers to send with requests to
             the server
+        :param keycloak.client.KeycloakClient client: Optional client to use,
+            e.g. one which is shared with other realms on the same server.
+            It's not closed when the realm gets closed.
+        :param keycloak.cache.BaseCache cache: Optional cache for the
+            .well-known documents and the JWKS, it can be shared between
+            realms.
+        :param client_params: Optional extra parameters for the client, e.g.
+            `hooks` or `slow_call_threshold`
         """
         self._server_url = server_url
         self._realm_name = realm_name
         self._headers = headers
+        self._client = client
+        self._owns_client = client is None
+        self._cache = cache
+        self._client_params = client_params
+        self._client_lock = threading.Lock()
 
     @property
     def client(self):
         """
+        :rtype: keycloak.client.KeycloakClient
+        """
+        client = self._get_client()
+        if client.base_path is None:
+            self._detect_base_path(client)
+        return client
+
+    def _get_client(self):
+        """
+        Get the client without detecting the base path.
+
         :rtype: keycloak.client.KeycloakClient
         """
         if self._client is None:
-            self._client = KeycloakClient(server_url=self._server_url,
-                                          headers=self._headers)
+            with self._client_lock:
+                if self._client is None:
+                    self._client = KeycloakClient(
+                        server_url=self._server_url,
+                        headers=self._headers,
+                        **self._client_params
+                    )
         return self._client
 
+    def _detect_base_path(self, client):
+        """
+        Detect the base path of the server with this realm, see
+        :meth:`keycloak.client.KeycloakClient.detect_base_path`. Until it's
+        known the legacy base path is used.
+        """
+        try:
+            client.detect_base_path(self._realm_name)
+        except Exception:
+            client.logger.warning('Could not detect the base path of %s',
+                                  client.server_url, exc_info=True)
+
+    @property
+    def cache(self):
+        """
+        :rtype: keycloak.cache.BaseCache
+        """
+        return self._cache
+
+    @cache.setter
+    def cache(self, cache):
+        self._cache = cache
+
     @property
     def realm_name(self):
         return self._realm_name
@@ -46,6 +126,7 @@ class KeycloakRealm(object):
 
     @property
     def admin(self):
+        from keycloak.admin import KeycloakAdmin
         return KeycloakAdmin(realm=self)
 
     def open_id_connect(self, client_id, client_secret):
@@ -56,6 +137,7 @@ class KeycloakRealm(object):
         :param str client_secret:
         :rtype: keycloak.openid_connect.KeycloakOpenidConnect
         """
+        from keycloak.openid_connect import KeycloakOpenidConnect
         return KeycloakOpenidConnect(realm=self, client_id=client_id,
                                      client_secret=client_secret)
 
@@ -66,6 +148,7 @@ class KeycloakRealm(object):
         :param str client_id:
         :rtype: keycloak.authz.KeycloakAuthz
         """
+        from keycloak.authz import KeycloakAuthz
         return KeycloakAuthz(realm=self, client_id=client_id)
 
     def uma(self):
@@ -84,6 +167,7 @@ class KeycloakRealm(object):
         Starting from Keycloak 4 UMA2 is supported
         :rtype: keycloak.uma.KeycloakUMA
         """
+        from keycloak.uma import KeycloakUMA
         return KeycloakUMA(realm=self)
 
     @property
@@ -91,12 +175,108 @@ class KeycloakRealm(object):
         """
         :rtype: keycloak.uma1.KeycloakUMA1
         """
+        from keycloak.uma1 import KeycloakUMA1
         return KeycloakUMA1(realm=self)
 
+    def warmup(self, connections=1, cache=None):
+        """
+        Prepare the realm for traffic, e.g. from a readiness probe.
+
+        The OpenID Connect and UMA2 .well-known documents are fetched
+        concurrently, the JWKS as soon as the OpenID Connect document is
+        known, while the requested number of pooled connections are opened.
+
+        The documents are stored in the cache of the realm. Without a cache
+        they are only fetched to check that Keycloak can be reached, the
+        first requests fetch them again.
+
+        :param int connections: (optional) Number of connections to open
+            ahead of time
+        :param keycloak.cache.BaseCache cache: (optional) Cache for the realm
+            when it has none, e.g. a :class:`keycloak.cache.MemoryCache`
+        :return: The fetched documents (`openid_configuration`,
+            `uma2_configuration` and `jwks`) and the number of opened
+            `connections`
+        :rtype: dict
+        """
+        if self._cache is None:
+            self._cache = cache
+
+        openid_connect = self.open_id_connect(client_id=None,
+                                              client_secret=None)
+        uma = self.uma2
+        result = {}
+
+        def fetch_openid_connect():
+            result['openid_configuration'] = openid_connect.well_known.contents
+            result['jwks'] = openid_connect.certs()
+
+        def fetch_uma2():
+            result['uma2_configuration'] = uma.well_known.contents
+
+        def open_connections():
+            result['connections'] = self.client.open_connections(connections)
+
+        _run_concurrently(fetch_openid_connect, fetch_uma2, open_connections)
+        return result
+
+    def export_snapshot(self, path):
+        """
+        Write the .well-known documents and the JWKS of the realm to a
+        snapshot file, see :mod:`keycloak.snapshot`.
+
+        :param str path:
+        :rtype: keycloak.snapshot.Snapshot
+        """
+        from keycloak.snapshot import Snapshot
+        snapshot = Snapshot.fetch(self)
+        snapshot.dump(path)
+        return snapshot
+
+    def load_snapshot(self, path, revalidate=True, retry_interval=30):
+        """
+        Use the documents of a snapshot file instead of fetching them from
+        Keycloak. The documents are put in the cache of the realm.
+
+        :param str path:
+        :param bool revalidate: (optional) Fetch fresh documents in a
+            background thread, while Keycloak can't be reached the documents
+            of the snapshot are kept.
+        :param float retry_interval: (optional) Seconds between two
+            revalidation attempts
+        :rtype: keycloak.snapshot.Snapshot
+        """
+        from keycloak.snapshot import Snapshot
+        snapshot = Snapshot.load(path)
+        snapshot.install(self)
+        if revalidate:
+            snapshot.revalidate_in_background(self, retry_interval)
+        return snapshot
+
     def close(self):
-        if self._client is not None:
-            self._client.close()
-            self._client = None
+        if not self._owns_client:
+            return
+
+        with self._client_lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    def __getstate__(self):
+        # The client is pickled without its sessions, so a realm can be sent
+        # to another process. Like the client it drops the TLS context, which
+        # can't be pickled.
+        state = self.__dict__.copy()
+        del state['_client_lock']
+        if 'ssl_context' in self._client_params:
+            client_params = self._client_params.copy()
+            del client_params['ssl_context']
+            state['_client_params'] = client_params
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._client_lock = threading.Lock()
 
     def __enter__(self):
         return self
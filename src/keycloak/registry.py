@@ -0,0 +1,112 @@
+import threading
+from collections import OrderedDict
+
+from keycloak.client import KeycloakClient
+from keycloak.realm import KeycloakRealm
+
+__all__ = (
+    'KeycloakRealmRegistry',
+)
+
+
+class KeycloakRealmRegistry(object):
+    """
+    Hands out realms by server URL and realm name. All realms on the same
+    server share a single client and therefore a single connection pool.
+
+    When more than `max_realms` realms are registered the least recently used
+    realm is evicted. Evicted realms may still be in use, so the client of a
+    server is kept (and shared with its next realms) until the registry gets
+    closed.
+
+    .. code-block:: python
+
+        registry = KeycloakRealmRegistry(max_realms=100)
+
+        realm = registry.get('https://example.com', 'tenant-1')
+
+    Pass ``ssl_context=create_ssl_context()`` (see :mod:`keycloak.tls`) to
+    share one TLS context with session resumption between all clients.
+    """
+
+    realm_class = KeycloakRealm
+    client_class = KeycloakClient
+
+    def __init__(self, max_realms=None, headers=None, cache=None,
+                 **client_params):
+        """
+        :param int max_realms: (optional) Maximum number of realms to keep
+        :param dict headers: (optional) Extra headers for all requests
+        :param keycloak.cache.BaseCache cache: (optional) Cache which is
+            shared by all realms
+        :param client_params: Extra parameters for the shared clients
+        """
+        self._max_realms = max_realms
+        self._headers = headers
+        self._cache = cache
+        self._client_params = client_params
+        self._lock = threading.Lock()
+        self._realms = OrderedDict()
+        self._clients = {}
+
+    def get(self, server_url, realm_name):
+        """
+        Get the realm, it's created when it's not registered yet.
+
+        :param str | tuple server_url: Base URL, or the base URLs of the
+            nodes of a cluster
+        :param str realm_name:
+        :rtype: keycloak.realm.KeycloakRealm
+        """
+        if isinstance(server_url, list):
+            server_url = tuple(server_url)
+        key = (server_url, realm_name)
+        with self._lock:
+            realm = self._realms.pop(key, None)
+            if realm is None:
+                realm = self.realm_class(
+                    server_url, realm_name, headers=self._headers,
+                    client=self._get_client(server_url), cache=self._cache
+                )
+            self._realms[key] = realm
+            self._evict()
+        return realm
+
+    def _get_client(self, server_url):
+        client = self._clients.get(server_url)
+        if client is None:
+            client = self._clients[server_url] = self.client_class(
+                server_url=server_url,
+                headers=self._headers,
+                **self._client_params
+            )
+        return client
+
+    def _evict(self):
+        """
+        Evict the least recently used realms, must be called with the lock.
+        """
+        while self._max_realms is not None \
+                and len(self._realms) > self._max_realms:
+            self._realms.popitem(last=False)
+
+    def __len__(self):
+        return len(self._realms)
+
+    def __contains__(self, key):
+        return key in self._realms
+
+    def close(self):
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._realms.clear()
+
+        for client in clients:
+            client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
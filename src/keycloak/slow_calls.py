@@ -0,0 +1,95 @@
+import os
+import sys
+import threading
+
+from keycloak.hooks import clock
+
+__all__ = (
+    'SlowCallLog',
+)
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+
+
+def get_call_site():
+    """
+    Find the frame outside of this library which caused the current call.
+
+    :return: "path:line in function" or None
+    :rtype: str
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if not filename.startswith(_PACKAGE_DIR):
+            return '{}:{} in {}'.format(filename, frame.f_lineno,
+                                        frame.f_code.co_name)
+        frame = frame.f_back
+    return None
+
+
+class SlowCallLog(object):
+    """
+    Hook which logs requests taking longer than a threshold.
+
+    To prevent a slow Keycloak from flooding the logs at most one record per
+    endpoint is emitted every `interval` seconds, the record contains the
+    number of slow calls which were suppressed in the meantime.
+    """
+
+    def __init__(self, threshold, logger, interval=60):
+        """
+        :param float threshold: Duration in seconds from which a call is slow
+        :param logging.Logger logger:
+        :param float interval: (optional) Minimum number of seconds between
+            two records for the same endpoint
+        """
+        self.threshold = threshold
+        self.interval = interval
+        self._logger = logger
+        self._lock = threading.Lock()
+        self._last_logged = {}
+        self._suppressed = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __call__(self, info):
+        if info.duration < self.threshold:
+            return
+
+        now = clock()
+        with self._lock:
+            last_logged = self._last_logged.get(info.endpoint)
+            if last_logged is not None and now - last_logged < self.interval:
+                self._suppressed[info.endpoint] = \
+                    self._suppressed.get(info.endpoint, 0) + 1
+                return
+            self._last_logged[info.endpoint] = now
+            suppressed = self._suppressed.pop(info.endpoint, 0)
+
+        record = {
+            'endpoint': info.endpoint,
+            'method': info.method,
+            'url': info.url,
+            'status': info.status,
+            'duration': info.duration,
+            'threshold': self.threshold,
+            'request_size': info.request_size,
+            'response_size': info.response_size,
+            'retries': info.retries,
+            'call_site': get_call_site(),
+            'suppressed': suppressed,
+        }
+        self._logger.warning(
+            'Slow Keycloak call: %s %s took %.3fs (threshold %.3fs) from %s',
+            info.method, info.endpoint or info.url, info.duration,
+            self.threshold, record['call_site'],
+            extra={'keycloak_slow_call': record}
+        )
@@ -0,0 +1,294 @@
+"""
+Snapshots of the metadata of a realm (the OpenID Connect and UMA2 .well-known
+documents and the JWKS), so a service can start without calling Keycloak.
+
+Create a snapshot at build time:
+
+.. code-block:: bash
+
+    python -m keycloak.snapshot https://example.com my_realm snapshot.json
+
+And load it at startup:
+
+.. code-block:: python
+
+    realm = KeycloakRealm(server_url='https://example.com',
+                          realm_name='my_realm')
+    realm.load_snapshot('snapshot.json')
+"""
+import argparse
+import io
+import json
+import logging
+import threading
+import time
+
+from keycloak.cache import MemoryCache
+from keycloak.client import rebase_path
+from keycloak.hooks import endpoint
+from keycloak.nodes import server_urls
+from keycloak.openid_connect import PATH_WELL_KNOWN as OPENID_PATH_WELL_KNOWN
+from keycloak.uma import PATH_WELL_KNOWN as UMA2_PATH_WELL_KNOWN
+
+__all__ = (
+    'Snapshot',
+)
+
+#: Version of the snapshot file format
+SNAPSHOT_VERSION = 1
+
+#: Documents in a snapshot and the endpoint to fetch them with
+DOCUMENTS = (
+    ('openid_configuration', 'discovery.well_known'),
+    ('uma2_configuration', 'discovery.well_known'),
+    ('jwks', 'discovery.jwks'),
+)
+
+logger = logging.getLogger(__name__)
+
+
+@endpoint('discovery.well_known')
+def fetch_well_known(realm, url):
+    return realm.client.get(url)
+
+
+@endpoint('discovery.jwks')
+def fetch_jwks(realm, url):
+    return realm.client.get(url)
+
+
+#: Function to fetch a document per endpoint, they return an awaitable for
+#: the async client.
+FETCHERS = {
+    'discovery.well_known': fetch_well_known,
+    'discovery.jwks': fetch_jwks,
+}
+
+
+def document_urls(realm, openid_configuration):
+    """
+    :param keycloak.realm.KeycloakRealm realm:
+    :param dict openid_configuration:
+    :return: URL per document name, with the base path the client of the
+        realm uses at the moment
+    :rtype: dict
+    """
+    client = realm._get_client()
+    return {
+        'openid_configuration': client.get_full_url(
+            OPENID_PATH_WELL_KNOWN.format(realm.realm_name)
+        ),
+        'uma2_configuration': client.get_full_url(
+            UMA2_PATH_WELL_KNOWN.format(realm.realm_name)
+        ),
+        'jwks': openid_configuration['jwks_uri'],
+    }
+
+
+class Snapshot(object):
+    """
+    The metadata of a realm, by document name the URL and the document.
+    """
+
+    def __init__(self, server_url, realm_name, documents, created=None):
+        """
+        :param str server_url:
+        :param str realm_name:
+        :param dict documents: Per name a dict with `url` and `document`
+        :param float created: (optional) Timestamp of the snapshot
+        """
+        self.server_url = server_url
+        self.realm_name = realm_name
+        self.documents = documents
+        self.created = time.time() if created is None else created
+        self.revalidated = threading.Event()
+
+    @property
+    def base_path(self):
+        """
+        :return: The base path the documents were fetched with, None when
+            it can't be told from the URL of the OpenID Connect document
+        :rtype: str
+        """
+        url = self.documents['openid_configuration']['url']
+        path = rebase_path(OPENID_PATH_WELL_KNOWN.format(self.realm_name), '')
+        for server_url in server_urls(self.server_url):
+            prefix = server_url.rstrip('/') + '/'
+            if url.startswith(prefix) and url.endswith(path):
+                return url[len(prefix):len(url) - len(path)].strip('/')
+        return None
+
+    @classmethod
+    def fetch(cls, realm):
+        """
+        Fetch the metadata of a realm.
+
+        :param keycloak.realm.KeycloakRealm realm:
+        :rtype: Snapshot
+        """
+        return cls.from_documents(realm, realm.warmup(connections=0))
+
+    @classmethod
+    def from_documents(cls, realm, documents):
+        """
+        :param keycloak.realm.KeycloakRealm realm:
+        :param dict documents: Document per name, as returned by
+            :meth:`keycloak.realm.KeycloakRealm.warmup`
+        :rtype: Snapshot
+        """
+        urls = document_urls(realm, documents['openid_configuration'])
+        return cls(realm.server_url, realm.realm_name, dict(
+            (name, {'url': urls[name], 'document': documents[name]})
+            for name, _ in DOCUMENTS
+        ))
+
+    @classmethod
+    def load(cls, path):
+        """
+        :param str path:
+        :rtype: Snapshot
+        :raises ValueError: When the file has an unsupported version
+        """
+        with io.open(path, encoding='utf-8') as snapshot_file:
+            data = json.load(snapshot_file)
+
+        if data.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(
+                'Unsupported snapshot version {!r}, expected {}'.format(
+                    data.get('version'), SNAPSHOT_VERSION)
+            )
+        return cls(data['server_url'], data['realm_name'],
+                   data['documents'], created=data['created'])
+
+    def dump(self, path):
+        """
+        :param str path:
+        """
+        content = json.dumps({
+            'version': SNAPSHOT_VERSION,
+            'created': self.created,
+            'server_url': self.server_url,
+            'realm_name': self.realm_name,
+            'documents': self.documents,
+        }, indent=2, sort_keys=True)
+        with io.open(path, 'w', encoding='utf-8') as snapshot_file:
+            snapshot_file.write(u'{}\n'.format(content))
+
+    def install(self, realm):
+        """
+        Put the documents in the cache of the realm, a
+        :class:`keycloak.cache.MemoryCache` is created when the realm has no
+        cache.
+
+        When the client of the realm doesn't know its base path yet, it gets
+        the base path of the snapshot, so it isn't detected while Keycloak
+        may be unreachable. The .well-known documents are cached under the
+        URLs of the base path the client uses.
+
+        :param keycloak.realm.KeycloakRealm realm:
+        :raises ValueError: When the snapshot is of another realm
+        """
+        if (self.server_url, self.realm_name) != \
+                (realm.server_url, realm.realm_name):
+            raise ValueError(
+                'Snapshot of realm "{}" on {} can\'t be used for realm "{}" '
+                'on {}'.format(self.realm_name, self.server_url,
+                               realm.realm_name, realm.server_url)
+            )
+        if realm.cache is None:
+            realm.cache = MemoryCache()
+
+        client = realm._get_client()
+        if client.base_path is None and self.base_path is not None:
+            client.base_path = self.base_path
+
+        openid_configuration = \
+            self.documents['openid_configuration']['document']
+        urls = document_urls(realm, openid_configuration)
+        for name, document in self.documents.items():
+            document['url'] = urls[name]
+            realm.cache.set(document['url'], document['document'])
+
+    def refresh(self, realm):
+        """
+        Fetch the documents from Keycloak and put them in the cache of the
+        realm.
+
+        :param keycloak.realm.KeycloakRealm realm:
+        """
+        for name, endpoint_name in DOCUMENTS:
+            url = self.document_url(name)
+            self.documents[name] = {
+                'url': url,
+                'document': FETCHERS[endpoint_name](realm, url),
+            }
+        self.install(realm)
+
+    def document_url(self, name):
+        """
+        :param str name: Name of the document
+        :return: URL to fetch the document from, the JWKS URL is taken from
+            the (possibly refreshed) OpenID Connect document.
+        :rtype: str
+        """
+        if name == 'jwks':
+            return self.documents['openid_configuration']['document'][
+                'jwks_uri']
+        return self.documents[name]['url']
+
+    def revalidate(self, realm, retry_interval=30):
+        """
+        Refresh the documents until it succeeds. While Keycloak can't be
+        reached the documents of the snapshot are kept in the cache.
+
+        :param keycloak.realm.KeycloakRealm realm:
+        :param float retry_interval: (optional) Seconds between two attempts
+        """
+        while True:
+            try:
+                self.refresh(realm)
+            except Exception:
+                logger.warning('Could not revalidate the snapshot of realm '
+                               '"%s", retrying in %ss', self.realm_name,
+                               retry_interval, exc_info=True)
+                self.install(realm)
+                time.sleep(retry_interval)
+            else:
+                self.created = time.time()
+                self.revalidated.set()
+                return
+
+    def revalidate_in_background(self, realm, retry_interval=30):
+        """
+        Revalidate in a daemon thread.
+
+        :param keycloak.realm.KeycloakRealm realm:
+        :param float retry_interval: (optional) Seconds between two attempts
+        :rtype: threading.Thread
+        """
+        thread = threading.Thread(target=self.revalidate,
+                                  args=(realm, retry_interval),
+                                  name='keycloak-snapshot-revalidate')
+        thread.daemon = True
+        thread.start()
+        return thread
+
+
+def main(args=None):
+    from keycloak.realm import KeycloakRealm
+
+    parser = argparse.ArgumentParser(
+        prog='python -m keycloak.snapshot',
+        description='Export the metadata of a Keycloak realm to a snapshot.'
+    )
+    parser.add_argument('server_url')
+    parser.add_argument('realm_name')
+    parser.add_argument('path')
+    args = parser.parse_args(args)
+
+    with KeycloakRealm(args.server_url, args.realm_name) as realm:
+        realm.export_snapshot(args.path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""
+One TLS context which is shared by clients, with TLS session resumption, so
+reconnecting to Keycloak costs an abbreviated handshake instead of a full
+one.
+
+.. code-block:: python
+
+    from keycloak.tls import create_ssl_context
+
+    registry = KeycloakRealmRegistry(ssl_context=create_ssl_context())
+
+    realm = registry.get('https://example.com', 'tenant-1')
+    realm.client.tls_stats()  # {'handshakes': 12, 'resumed': 11, 'full': 1}
+
+The most recent session of a host is offered when the next connection to
+that host is opened, the server decides whether it's resumed.
+"""
+import ssl
+import threading
+import time
+
+from requests.adapters import HTTPAdapter
+from requests.utils import DEFAULT_CA_BUNDLE_PATH
+
+__all__ = (
+    'ResumingSSLContext',
+    'SSLContextAdapter',
+    'create_ssl_context',
+    'handshake_stats',
+)
+
+#: Python 2.7 can't resume TLS sessions, the context is only shared there
+SESSION_RESUMPTION = hasattr(ssl, 'SSLSession')
+
+_PROTOCOL = getattr(ssl, 'PROTOCOL_TLS_CLIENT', ssl.PROTOCOL_SSLv23)
+
+
+def handshake_stats(ssl_context):
+    """
+    Count the TLS handshakes done with a context, as counted by OpenSSL.
+
+    :param ssl.SSLContext ssl_context:
+    :return: The number of `handshakes`, the ones which `resumed` a session
+        and the `full` ones
+    :rtype: dict
+    """
+    stats = ssl_context.session_stats()
+    handshakes = stats.get('connect_good', 0)
+    resumed = stats.get('hits', 0)
+    return {
+        'handshakes': handshakes,
+        'resumed': resumed,
+        'full': handshakes - resumed,
+    }
+
+
+def _resumable(connection):
+    """
+    :param ssl.SSLSocket | ssl.SSLObject connection:
+    :return: The session of the connection, None when it can't be resumed
+        (yet)
+    :rtype: ssl.SSLSession
+    """
+    session = connection.session
+    if session is None:
+        return None
+    # TLS 1.3 sessions get their ticket after the handshake, when the first
+    # data is received
+    if not session.has_ticket and \
+            (not session.id or connection.version() == 'TLSv1.3'):
+        return None
+    return session
+
+
+if SESSION_RESUMPTION:
+    class _SessionSocket(ssl.SSLSocket):
+        """
+        Socket which hands its session to the context as soon as it can be
+        resumed, before the connection gets closed.
+        """
+        _session_stored = False
+
+        def read(self, *args, **kwargs):
+            data = super(_SessionSocket, self).read(*args, **kwargs)
+            if not self._session_stored:
+                self._session_stored = self.context.store_session(self)
+            return data
+
+    class _SessionObject(ssl.SSLObject):
+        """
+        SSL object of asyncio which hands its session to the context as soon
+        as it can be resumed.
+        """
+        _session_stored = False
+
+        def read(self, *args, **kwargs):
+            data = super(_SessionObject, self).read(*args, **kwargs)
+            if not self._session_stored:
+                self._session_stored = self.context.store_session(self)
+            return data
+
+
+class ResumingSSLContext(ssl.SSLContext):
+    """
+    :class:`ssl.SSLContext` which resumes the TLS session of a recent
+    connection to the same host. It works for sockets (the sync client) and
+    for the SSL objects of asyncio (the asyncio client).
+    """
+
+    if SESSION_RESUMPTION:
+        sslsocket_class = _SessionSocket
+        sslobject_class = _SessionObject
+
+    def __new__(cls, protocol=_PROTOCOL, *args, **kwargs):
+        return super(ResumingSSLContext, cls).__new__(cls, protocol, *args,
+                                                      **kwargs)
+
+    def __init__(self, protocol=_PROTOCOL):
+        """
+        :param int protocol: (optional) Defaults to
+            :data:`ssl.PROTOCOL_TLS_CLIENT`
+        """
+        self._session_lock = threading.Lock()
+        self._sessions = {}
+
+    def wrap_socket(self, sock, *args, **kwargs):
+        if SESSION_RESUMPTION:
+            self._resume(kwargs)
+        return super(ResumingSSLContext, self).wrap_socket(
+            sock, *args, **kwargs
+        )
+
+    def wrap_bio(self, incoming, outgoing, *args, **kwargs):
+        if SESSION_RESUMPTION:
+            self._resume(kwargs)
+        return super(ResumingSSLContext, self).wrap_bio(
+            incoming, outgoing, *args, **kwargs
+        )
+
+    def _resume(self, kwargs):
+        hostname = kwargs.get('server_hostname')
+        if hostname is None or kwargs.get('server_side') or \
+                kwargs.get('session') is not None:
+            return
+        with self._session_lock:
+            session = self._sessions.get(hostname)
+            if session is not None and \
+                    session.time + session.timeout <= time.time():
+                del self._sessions[hostname]
+                session = None
+        kwargs['session'] = session
+
+    def store_session(self, connection):
+        """
+        Remember the session of a connection, so the next connection to the
+        same host resumes it.
+
+        :param ssl.SSLSocket | ssl.SSLObject connection:
+        :return: False when the session can't be resumed yet
+        :rtype: bool
+        """
+        hostname = connection.server_hostname
+        if hostname is None or connection.server_side:
+            return True
+        session = _resumable(connection)
+        if session is None:
+            return False
+        with self._session_lock:
+            self._sessions[hostname] = session
+        return True
+
+    def handshake_stats(self):
+        """
+        See :func:`handshake_stats`.
+
+        :rtype: dict
+        """
+        return handshake_stats(self)
+
+
+def create_ssl_context(cafile=None, capath=None, cadata=None, certfile=None,
+                       keyfile=None, password=None):
+    """
+    Create a context which verifies certificates and host names and resumes
+    TLS sessions. Like requests it trusts the certifi CA bundle, unless other
+    CA certificates are given.
+
+    :param str cafile: (optional) File with the CA certificates to trust
+    :param str capath: (optional) Directory with the CA certificates to
+        trust
+    :param str | bytes cadata: (optional) CA certificates to trust
+    :param str certfile: (optional) Client certificate file, with the key
+        unless `keyfile` is given
+    :param str keyfile: (optional) Key file of the client certificate
+    :param str password: (optional) Password of the key
+    :rtype: ResumingSSLContext
+    """
+    context = ResumingSSLContext()
+    context.verify_mode = ssl.CERT_REQUIRED
+    context.check_hostname = True
+    if cafile is None and capath is None and cadata is None:
+        cafile = DEFAULT_CA_BUNDLE_PATH
+    context.load_verify_locations(cafile, capath, cadata)
+    if certfile is not None:
+        context.load_cert_chain(certfile, keyfile, password)
+    return context
+
+
+class SSLContextAdapter(HTTPAdapter):
+    """
+    Transport adapter for a :class:`requests.Session` which connects with
+    the given TLS context.
+    """
+
+    def __init__(self, ssl_context, **kwargs):
+        """
+        :param ssl.SSLContext ssl_context:
+        :param kwargs: Arguments of :class:`requests.adapters.HTTPAdapter`
+        """
+        self.ssl_context = ssl_context
+        super(SSLContextAdapter, self).__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['ssl_context'] = self.ssl_context
+        super(SSLContextAdapter, self).init_poolmanager(*args, **kwargs)
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        proxy_kwargs['ssl_context'] = self.ssl_context
+        return super(SSLContextAdapter, self).proxy_manager_for(
+            proxy, **proxy_kwargs
+        )
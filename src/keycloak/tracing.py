@@ -0,0 +1,152 @@
+"""
+Optional OpenTelemetry instrumentation.
+
+Nothing is traced until :func:`instrument` is called, which requires the
+`opentelemetry-api` package. After that every high-level API call (e.g.
+:meth:`keycloak.openid_connect.KeycloakOpenidConnect.client_credentials`)
+gets a span, with a child span for every HTTP round trip done by clients
+which are created afterwards.
+"""
+__all__ = (
+    'instrument',
+    'instrument_client',
+    'uninstrument',
+)
+
+#: Tracer which is used when instrumented, None otherwise.
+tracer = None
+
+_SPAN_KEY = 'tracing.span'
+
+
+def instrument(tracer_provider=None):
+    """
+    Enable tracing of all Keycloak calls.
+
+    Call this before the realms get created, clients which already exist are
+    not instrumented for HTTP round trips.
+
+    :param opentelemetry.trace.TracerProvider tracer_provider: (optional)
+        Defaults to the global tracer provider.
+    """
+    global tracer
+    from opentelemetry import trace
+
+    tracer = trace.get_tracer('keycloak', tracer_provider=tracer_provider)
+
+
+def uninstrument():
+    global tracer
+    tracer = None
+
+
+def instrument_client(client):
+    """
+    Register the hooks which create a span for every HTTP round trip.
+
+    :param keycloak.client.KeycloakClient client:
+    """
+    client.register_hook('request', _start_request_span)
+    client.register_hook('response', _end_request_span)
+    client.register_hook('error', _end_request_span)
+
+
+def _endpoint_attributes(name):
+    return {
+        'keycloak.endpoint': name or 'unknown',
+        'keycloak.endpoint_class': (name or 'unknown').split('.', 1)[0],
+    }
+
+
+def _realm_name(instance):
+    realm_name = getattr(instance, '_realm_name', None)
+    if realm_name is None:
+        realm_name = getattr(getattr(instance, '_realm', None),
+                             'realm_name', None)
+    return realm_name
+
+
+def start_call_span(name, func, args):
+    """
+    Start the span for a high-level API call.
+
+    :param str name: Templated endpoint name
+    :param func: Called method
+    :param tuple args: Arguments of the call, the first one is the instance
+    :rtype: opentelemetry.trace.Span
+    """
+    span_name = func.__name__
+    attributes = _endpoint_attributes(name)
+
+    if args:
+        span_name = '{}.{}'.format(type(args[0]).__name__, span_name)
+        realm_name = _realm_name(args[0])
+        if realm_name is not None:
+            attributes['keycloak.realm'] = str(realm_name)
+
+    return tracer.start_span(span_name, attributes=attributes)
+
+
+def call_in_span(name, func, args, kwargs):
+    """
+    Execute a high-level API call in its own span.
+
+    When the call returns an awaitable (the async client) the span stays
+    open until the awaitable is done.
+    """
+    from opentelemetry import trace
+
+    span = start_call_span(name, func, args)
+    try:
+        with trace.use_span(span, end_on_exit=False):
+            result = func(*args, **kwargs)
+    except BaseException:
+        span.end()
+        raise
+
+    if hasattr(result, '__await__'):
+        from keycloak.aio.tracing import end_span_after
+        return end_span_after(span, result)
+
+    span.end()
+    return result
+
+
+def _start_request_span(info):
+    from opentelemetry.trace import SpanKind
+
+    attributes = _endpoint_attributes(info.endpoint)
+    attributes['http.request.method'] = info.method
+    attributes['url.full'] = info.url
+
+    info.context[_SPAN_KEY] = tracer.start_span(
+        '{} {}'.format(info.method, info.endpoint or 'unknown'),
+        kind=SpanKind.CLIENT,
+        attributes=attributes
+    )
+
+
+def _end_request_span(info):
+    from opentelemetry.trace import Status, StatusCode
+
+    span = info.context.pop(_SPAN_KEY, None)
+    if span is None:
+        return
+
+    # With failover the URL of the node which was tried last
+    span.set_attribute('url.full', info.url)
+    if info.retries:
+        span.set_attribute('keycloak.retries', info.retries)
+    if info.hedged:
+        span.set_attribute('keycloak.hedged', True)
+    if info.rate_limit_wait:
+        span.set_attribute('keycloak.rate_limit_wait', info.rate_limit_wait)
+
+    if info.exception is not None:
+        span.record_exception(info.exception)
+        span.set_status(Status(StatusCode.ERROR, str(info.exception)))
+    else:
+        span.set_attribute('http.response.status_code', info.status)
+        if info.status >= 400:
+            span.set_status(Status(StatusCode.ERROR))
+    span.end()
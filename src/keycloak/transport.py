@@ -0,0 +1,272 @@
+"""
+Lean transport for the sync client, built directly on a
+:class:`urllib3.PoolManager` instead of a :class:`requests.Session`.
+
+It skips what the client doesn't need from requests for every call (hooks,
+transport adapters, the cookie jar, proxy and environment lookups and the
+merging of settings), which matters for small and frequent calls like token
+requests and userinfo.
+
+.. code-block:: python
+
+    from keycloak.transport import Urllib3Session
+
+    realm = KeycloakRealm(..., session_factory=Urllib3Session)
+
+Responses and errors look like the ones of requests (the same exception
+classes are raised), but proxies, the ``REQUESTS_CA_BUNDLE`` environment
+variable and cookies are not supported, and it can't be combined with a
+cassette.
+"""
+import json
+
+import urllib3
+from requests import exceptions
+from requests.structures import CaseInsensitiveDict
+from requests.utils import DEFAULT_CA_BUNDLE_PATH
+from urllib3.exceptions import (
+    ConnectTimeoutError, MaxRetryError, NewConnectionError, ProtocolError,
+    ReadTimeoutError, SSLError,
+)
+
+try:
+    from http.client import responses
+except ImportError:
+    from httplib import responses
+
+try:
+    from urllib.parse import urlencode
+except ImportError:
+    from urllib import urlencode
+
+__all__ = (
+    'Urllib3Response',
+    'Urllib3Session',
+)
+
+try:
+    _text_type = unicode
+except NameError:
+    _text_type = str
+
+_FORM_CONTENT_TYPE = 'application/x-www-form-urlencoded'
+
+
+class _PreparedRequest(object):
+    """
+    The parts of :class:`requests.PreparedRequest` which are used for error
+    reporting.
+    """
+    __slots__ = ('method', 'url', 'headers', 'body')
+
+    def __init__(self, method, url, headers, body):
+        self.method = method
+        self.url = url
+        self.headers = headers
+        self.body = body
+
+
+class Urllib3Response(object):
+    """
+    Response with the parts of :class:`requests.Response` which are used by
+    the client. The body is read before the response is returned, unless it's
+    streamed.
+    """
+
+    def __init__(self, request, response):
+        """
+        :param _PreparedRequest request:
+        :param urllib3.response.HTTPResponse response:
+        """
+        self.request = request
+        self.url = request.url
+        self.status_code = response.status
+        self.reason = response.reason or responses.get(response.status)
+        self.headers = response.headers
+        self.raw = response
+
+    @property
+    def content(self):
+        # Read on first access for streamed responses
+        return self.raw.data
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', 'replace')
+
+    def json(self, **kwargs):
+        return json.loads(self.content.decode('utf-8'), **kwargs)
+
+    def raise_for_status(self):
+        if 400 <= self.status_code < 500:
+            kind = 'Client'
+        elif 500 <= self.status_code < 600:
+            kind = 'Server'
+        else:
+            return
+        raise exceptions.HTTPError(
+            '{} {} Error: {} for url: {}'.format(
+                self.status_code, kind, self.reason, self.url
+            ),
+            response=self
+        )
+
+    def close(self):
+        # The connection of a response which is read is back in the pool
+        # already
+        self.raw.release_conn()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __repr__(self):
+        return '<Urllib3Response [{}]>'.format(self.status_code)
+
+
+def _translate(exc, request):
+    """
+    Get the requests exception for an urllib3 exception, so callers (and
+    the failover of the client) handle errors the same way for both
+    transports.
+    """
+    reason = exc.reason if isinstance(exc, MaxRetryError) else exc
+    if isinstance(reason, NewConnectionError):
+        return exceptions.ConnectionError(exc, request=request)
+    if isinstance(reason, ConnectTimeoutError):
+        return exceptions.ConnectTimeout(exc, request=request)
+    if isinstance(reason, ReadTimeoutError):
+        return exceptions.ReadTimeout(exc, request=request)
+    if isinstance(reason, SSLError):
+        return exceptions.SSLError(exc, request=request)
+    return exceptions.ConnectionError(exc, request=request)
+
+
+class Urllib3Session(object):
+    """
+    Drop-in replacement for the :class:`requests.Session` of the sync
+    client, see the module documentation for what it doesn't support.
+    """
+
+    def __init__(self, num_pools=10, maxsize=10, timeout=None, verify=True,
+                 cert=None, max_redirects=30):
+        """
+        :param int num_pools: (optional) Number of hosts to keep a connection
+            pool for
+        :param int maxsize: (optional) Number of connections to keep per host
+        :param float timeout: (optional) Seconds to wait for a connection and
+            for data, waits forever by default like requests does
+        :param bool | str verify: (optional) Verify TLS certificates, or the
+            path of a CA bundle to verify them with
+        :param str | tuple cert: (optional) Client certificate file, or a
+            tuple of a certificate and a key file
+        :param int max_redirects: (optional) Maximum number of redirects to
+            follow
+        """
+        self.headers = CaseInsensitiveDict()
+        self.timeout = timeout
+        pool_kwargs = {
+            'num_pools': num_pools,
+            'maxsize': maxsize,
+            'cert_reqs': 'CERT_REQUIRED' if verify else 'CERT_NONE',
+        }
+        if verify:
+            pool_kwargs['ca_certs'] = DEFAULT_CA_BUNDLE_PATH \
+                if verify is True else verify
+        if cert is not None:
+            cert_file, key_file = cert if isinstance(cert, tuple) \
+                else (cert, None)
+            pool_kwargs['cert_file'] = cert_file
+            pool_kwargs['key_file'] = key_file
+        self.poolmanager = urllib3.PoolManager(**pool_kwargs)
+        self._retries = urllib3.Retry(total=False, connect=0, read=0,
+                                      status=0, redirect=max_redirects,
+                                      raise_on_redirect=True)
+
+    def connection_pool(self, url):
+        """
+        :param str url:
+        :return: The pool which is used for requests to the URL
+        :rtype: urllib3.HTTPConnectionPool
+        """
+        return self.poolmanager.connection_from_url(url)
+
+    def mount(self, prefix, adapter):
+        raise TypeError(
+            'Urllib3Session does not support transport adapters (e.g. of a '
+            'cassette), use requests.Session'
+        )
+
+    def request(self, method, url, headers=None, params=None, data=None,
+                allow_redirects=True, stream=False):
+        """
+        :param str method:
+        :param str url:
+        :param dict headers: (optional) Headers on top of the session
+            headers
+        :param dict params: (optional) Query parameters
+        :param dict | str | bytes data: (optional) Body, a dict is form
+            encoded
+        :param bool allow_redirects: (optional) Follow redirects, otherwise
+            the redirect response is returned
+        :param bool stream: (optional) Don't read the body before the
+            response is returned
+        :rtype: Urllib3Response
+        """
+        if params:
+            url = '{}{}{}'.format(url, '&' if '?' in url else '?',
+                                  urlencode(params, doseq=True))
+
+        request_headers = CaseInsensitiveDict(self.headers)
+        request_headers.update(headers or {})
+
+        if isinstance(data, (dict, list, tuple)):
+            body = urlencode(data, doseq=True).encode('utf-8')
+            request_headers.setdefault('Content-Type', _FORM_CONTENT_TYPE)
+        elif isinstance(data, _text_type):
+            body = data.encode('utf-8')
+        else:
+            body = data
+
+        request = _PreparedRequest(method, url, request_headers, body)
+        try:
+            response = self.poolmanager.urlopen(
+                method, url, body=body, headers=dict(request_headers),
+                retries=self._retries, timeout=self.timeout,
+                preload_content=not stream,
+                redirect=allow_redirects
+            )
+        except (MaxRetryError, NewConnectionError, ConnectTimeoutError,
+                ReadTimeoutError, ProtocolError, SSLError) as exc:
+            raise _translate(exc, request)
+        return Urllib3Response(request, response)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request('HEAD', url, **kwargs)
+
+    def close(self):
+        self.poolmanager.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -5,6 +5,7 @@ try:
 except ImportError:
     from urllib import urlencode  # noqa: F401
 
+from keycloak.hooks import endpoint
 from keycloak.mixins import WellKnownMixin
 
 PATH_WELL_KNOWN = "auth/realms/{}/.well-known/uma2-configuration"
@@ -23,6 +24,7 @@ class KeycloakUMA(WellKnownMixin, object):
     def get_path_well_known(self):
         return PATH_WELL_KNOWN
 
+    @endpoint('uma.resource_set.collection')
     def resource_set_create(self, token, name, **kwargs):
         """
         Create a resource set.
@@ -47,6 +49,7 @@ class KeycloakUMA(WellKnownMixin, object):
             headers=self.get_headers(token)
         )
 
+    @endpoint('uma.resource_set.single')
     def resource_set_update(self, token, id, name, **kwargs):
         """
         Update a resource set.
@@ -69,6 +72,7 @@ class KeycloakUMA(WellKnownMixin, object):
             headers=self.get_headers(token)
         )
 
+    @endpoint('uma.resource_set.single')
     def resource_set_read(self, token, id):
         """
         Read a resource set.
@@ -85,6 +89,7 @@ class KeycloakUMA(WellKnownMixin, object):
             headers=self.get_headers(token)
         )
 
+    @endpoint('uma.resource_set.single')
     def resource_set_delete(self, token, id):
         """
         Delete a resource set.
@@ -100,6 +105,7 @@ class KeycloakUMA(WellKnownMixin, object):
             headers=self.get_headers(token)
         )
 
+    @endpoint('uma.resource_set.collection')
     def resource_set_list(self, token, **kwargs):
         """
         List a resource set.
@@ -120,6 +126,7 @@ class KeycloakUMA(WellKnownMixin, object):
             **kwargs
         )
 
+    @endpoint('uma.permission_ticket')
     def resource_create_ticket(self, token, id, scopes, **kwargs):
         """
         Create a ticket form permission to resource.
@@ -139,6 +146,7 @@ class KeycloakUMA(WellKnownMixin, object):
             headers=self.get_headers(token)
         )
 
+    @endpoint('uma.policy.single')
     def resource_associate_permission(self, token, id, name, scopes, **kwargs):
         """
         Associates a permission with a Resource.
@@ -162,6 +170,7 @@ class KeycloakUMA(WellKnownMixin, object):
             headers=self.get_headers(token)
         )
 
+    @endpoint('uma.policy.single')
     def permission_update(self, token, id, **kwargs):
         """
         To update an existing permission.
@@ -179,6 +188,7 @@ class KeycloakUMA(WellKnownMixin, object):
             headers=self.get_headers(token)
         )
 
+    @endpoint('uma.policy.single')
     def permission_delete(self, token, id):
         """
         Removing a Permission.
@@ -195,6 +205,7 @@ class KeycloakUMA(WellKnownMixin, object):
             headers=self.get_headers(token)
         )
 
+    @endpoint('uma.policy.collection')
     def permission_list(self, token, **kwargs):
         """
         Querying permission
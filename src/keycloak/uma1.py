@@ -5,6 +5,7 @@ try:
 except ImportError:
     from urllib import urlencode  # noqa: F401
 
+from keycloak.hooks import endpoint
 from keycloak.mixins import WellKnownMixin
 
 PATH_WELL_KNOWN = "auth/realms/{}/.well-known/uma-configuration"
@@ -26,6 +27,7 @@ class KeycloakUMA1(WellKnownMixin, object):
     def get_path_well_known(self):
         return PATH_WELL_KNOWN
 
+    @endpoint('uma.resource_set.collection')
     def resource_set_create(self, token, name, **kwargs):
         """
         Create a resource set.
@@ -46,6 +48,7 @@ class KeycloakUMA1(WellKnownMixin, object):
             headers=self.get_headers(token)
         )
 
+    @endpoint('uma.resource_set.single')
     def resource_set_update(self, token, id, name, **kwargs):
         """
         Update a resource set.
@@ -68,6 +71,7 @@ class KeycloakUMA1(WellKnownMixin, object):
             headers=self.get_headers(token)
         )
 
+    @endpoint('uma.resource_set.single')
     def resource_set_read(self, token, id):
         """
         Read a resource set.
@@ -84,6 +88,7 @@ class KeycloakUMA1(WellKnownMixin, object):
             headers=self.get_headers(token)
         )
 
+    @endpoint('uma.resource_set.single')
     def resource_set_delete(self, token, id):
         """
         Delete a resource set.
@@ -99,6 +104,7 @@ class KeycloakUMA1(WellKnownMixin, object):
             headers=self.get_headers(token)
         )
 
+    @endpoint('uma.resource_set.collection')
     def resource_set_list(self, token, **kwargs):
         """
         List a resource set.
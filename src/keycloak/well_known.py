@@ -1,14 +1,20 @@
+import threading
+
 try:
     from collections import Mapping
 except ImportError:
     from collections.abc import Mapping
 
+from keycloak.cache import get_or_fetch
+from keycloak.hooks import endpoint
+
 
 class KeycloakWellKnown(Mapping):
 
     _contents = None
     _realm = None
     _path = None
+    _static = False
 
     def __init__(self, realm, path, content=None):
         """
@@ -18,18 +24,51 @@ class KeycloakWellKnown(Mapping):
         """
         self._realm = realm
         self._path = path
+        self._fetch_lock = threading.Lock()
         if content:
-            self._contents = content
+            self.contents = content
 
     @property
     def contents(self):
+        """
+        The .well-known document. It's fetched once, or when the realm has a
+        cache it's looked up in the cache on every access, so it expires
+        (and is served stale) like any other cache entry.
+
+        :rtype: dict
+        """
+        if self._cached:
+            return self._fetch()
+
         if self._contents is None:
-            self._contents = self._realm.client.get(self._path)
+            with self._fetch_lock:
+                if self._contents is None:
+                    self._contents = self._fetch()
         return self._contents
 
     @contents.setter
     def contents(self, content):
+        # Given contents are never refreshed
         self._contents = content
+        self._static = True
+
+    @property
+    def _cached(self):
+        return not self._static and self._realm.cache is not None
+
+    @endpoint('discovery.well_known')
+    def _fetch(self):
+        return get_or_fetch(self._realm.cache, self._path,
+                            lambda: self._realm.client.get(self._path))
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_fetch_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._fetch_lock = threading.Lock()
 
     def __getitem__(self, key):
         return self.contents[key]
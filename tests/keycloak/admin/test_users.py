@@ -3,6 +3,7 @@ from unittest import TestCase
 import mock
 
 from keycloak.admin import KeycloakAdmin
+from keycloak.lazy_json import lazy_json
 from keycloak.realm import KeycloakRealm
 
 
@@ -117,6 +118,33 @@ class KeycloakAdminUsersTestCase(TestCase):
             }
         )
 
+    def test_update_lazy_json(self):
+        """
+        Case: A user fetched by a client with lazy JSON gets updated
+        Expected: The nested views of the fetched user are sent as plain
+            JSON
+        """
+        self.realm.client.get.return_value = lazy_json(
+            b'{"id": "user-id", "access": {"manage": true},'
+            b' "requiredActions": ["VERIFY_EMAIL"]}'
+        )
+        user = self.admin.realms.by_name('realm-name').users.by_id("user-id")
+        user.update(email='my-email')
+
+        self.realm.client.put.assert_called_once_with(
+            url=self.realm.client.get_full_url.return_value,
+            data='{'
+                 '"access": {"manage": true}, '
+                 '"email": "my-email", '
+                 '"id": "user-id", '
+                 '"requiredActions": ["VERIFY_EMAIL"]'
+                 '}',
+            headers={
+                'Authorization': 'Bearer some-token',
+                'Content-Type': 'application/json'
+            }
+        )
+
     @mock.patch('keycloak.admin.users.User.user', {"id": "user-id"})
     def test_delete(self):
         user = self.admin.realms.by_name('realm-name').users.by_id("user-id")
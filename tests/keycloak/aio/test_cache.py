@@ -0,0 +1,65 @@
+import asyncio
+
+import asynctest
+import mock
+
+try:
+    import aiohttp  # noqa: F401
+except ImportError:
+    aiohttp = None
+else:
+    from keycloak.aio.cache import get_or_fetch
+    from keycloak.cache import MemoryCache, StaleCache
+
+
+@asynctest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class GetOrFetchTestCase(asynctest.TestCase):
+
+    async def test_get_or_fetch_concurrently(self):
+        """
+        Case: Many tasks request a missing value at the same time
+        Expected: It's fetched once and all tasks get it
+        """
+        cache = MemoryCache()
+
+        async def fetch():
+            await asyncio.sleep(0.01)
+            return {'keys': []}
+
+        fetch_mock = asynctest.CoroutineMock(side_effect=fetch)
+
+        results = await asyncio.gather(*[
+            get_or_fetch(cache, 'key', fetch_mock) for _ in range(10)
+        ])
+
+        fetch_mock.assert_awaited_once_with()
+        self.assertEqual(results, [{'keys': []}] * 10)
+        self.assertEqual(cache.get('key'), {'keys': []})
+
+    @mock.patch('keycloak.cache.clock', autospec=True)
+    @mock.patch('keycloak.cache.time.time', autospec=True)
+    async def test_stale(self, time_mock, clock_mock):
+        """
+        Case: An expired entry is requested within its stale windows
+        Expected: It's returned right away and refreshed in a task, or
+            returned when refreshing fails
+        """
+        time_mock.return_value = clock_mock.return_value = 100
+        cache = StaleCache(MemoryCache(ttl=10), stale_while_revalidate=5,
+                           stale_if_error=60)
+        cache.set('key', {'keys': [1]})
+
+        time_mock.return_value = clock_mock.return_value = 112
+        fetch = asynctest.CoroutineMock(return_value={'keys': [2]})
+        self.assertEqual(await get_or_fetch(cache, 'key', fetch),
+                         {'keys': [1]})
+        await asyncio.sleep(0)
+        fetch.assert_awaited_once_with()
+        self.assertEqual(await get_or_fetch(cache, 'key', fetch),
+                         {'keys': [2]})
+
+        time_mock.return_value = clock_mock.return_value = 140
+        fetch = asynctest.CoroutineMock(side_effect=IOError('unreachable'))
+        self.assertEqual(await get_or_fetch(cache, 'key', fetch),
+                         {'keys': [2]})
+        self.assertEqual(cache.stats()['key']['refresh_errors'], 1)
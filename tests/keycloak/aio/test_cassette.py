@@ -0,0 +1,61 @@
+import json
+import os
+import shutil
+import tempfile
+
+import asynctest
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+else:
+    from keycloak.aio.client import KeycloakClient
+    from keycloak.cassette import Cassette, NoRecordedResponse
+    from keycloak.exceptions import KeycloakClientError
+
+
+@asynctest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class CassetteTestCase(asynctest.TestCase):
+
+    async def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'cassette.jsonl')
+
+        with open(path, 'w') as cassette:
+            for entry in (
+                {'method': 'GET', 'url': 'https://example.com/users?b=2&a=1',
+                 'status': 200, 'headers': {}, 'duration': 0.1,
+                 'text': '[1]'},
+                {'method': 'GET', 'url': 'https://example.com/fail',
+                 'status': 500, 'headers': {}, 'duration': 0.1, 'text': ''},
+                {'method': 'DELETE', 'url': 'https://example.com/users/1',
+                 'status': 204, 'headers': {}, 'duration': 0.1, 'text': ''},
+            ):
+                cassette.write(json.dumps(entry) + '\n')
+
+        self.client = await KeycloakClient(server_url='https://example.com',
+                                           headers={}, loop=self.loop,
+                                           cassette=Cassette(path))
+
+    async def tearDown(self):
+        await self.client.close()
+
+    async def test_replay(self):
+        """
+        Case: Requests are done with a replaying cassette
+        Expected: The recorded responses are returned without a server
+        """
+        self.assertEqual(
+            await self.client.get('https://example.com/users', a=1, b=2), [1]
+        )
+        response = await self.client.delete('https://example.com/users/1',
+                                            headers={})
+        self.assertEqual(response.status, 204)
+
+        with self.assertRaises(KeycloakClientError):
+            await self.client.get('https://example.com/fail')
+
+        with self.assertRaises(NoRecordedResponse):
+            await self.client.get('https://example.com/unknown')
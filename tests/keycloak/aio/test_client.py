@@ -1,3 +1,5 @@
+import asyncio
+
 import asynctest
 
 try:
@@ -5,7 +7,16 @@ try:
 except ImportError:
     aiohttp = None
 else:
+    from keycloak.accounting import RoundTrips
     from keycloak.aio.client import KeycloakClient
+    from keycloak.client import Result
+    from keycloak.concurrency import AIMDLimit, ConcurrencyLimiter
+    from keycloak.hedging import HedgePolicy
+    from keycloak.hooks import endpoint
+    from keycloak.pools import TrafficPools
+    from keycloak.rate_limit import RateLimiter
+    from keycloak.tls import create_ssl_context
+    from keycloak.lazy_json import JSONObject
 
 
 @asynctest.skipIf(aiohttp is None, 'aiohttp is not installed')
@@ -167,24 +178,41 @@ class KeycloakClientTestCase(asynctest.TestCase):
     async def test_delete(self):
         """
         Case: A DELETE request get executed
-        Expected: The correct parameters get given to the request library
+        Expected: The correct parameters get given to the request library,
+            the response is released and a result is returned
         """
         self.Session_mock.return_value.headers = asynctest.MagicMock()
-        self.Session_mock.return_value.delete = asynctest.CoroutineMock()
+        delete = self.Session_mock.return_value.delete = asynctest.MagicMock()
+        response_mock = delete.return_value.__aenter__.return_value
+        response_mock.status = 204
+        response_mock.raise_for_status = asynctest.MagicMock()
+        response_mock.read = asynctest.CoroutineMock(return_value=b'')
 
         response = await self.client.delete(url='https://example.com/test',
                                             headers={'some': 'header'},
                                             extra='param')
 
-        self.Session_mock.return_value.delete.assert_called_once_with(
+        delete.assert_called_once_with(
             'https://example.com/test',
             headers={'some': 'header'},
             extra='param'
         )
-        self.assertEqual(
-            response,
-            self.Session_mock.return_value.delete.return_value
+        delete.return_value.__aexit__.assert_awaited_once_with(
+            None, None, None
         )
+        self.assertIsInstance(response, Result)
+        self.assertEqual(response.status, 204)
+        self.assertEqual(response.content, b'')
+
+        response_mock.read.reset_mock()
+        response_mock.headers = {'Content-Length': '0'}
+        response_hook = asynctest.MagicMock()
+        self.client.register_hook('response', response_hook)
+        response = await self.client.delete(url='https://example.com/test',
+                                            headers={}, read_body=False)
+        self.assertIsNone(response.content)
+        response_mock.read.assert_not_awaited()
+        self.assertEqual(response_hook.call_args[0][0].response_size, 0)
 
     async def test_handle_response(self):
         """
@@ -207,3 +235,387 @@ class KeycloakClientTestCase(asynctest.TestCase):
         processed_response = await self.client._handle_response(req_ctx)
 
         self.assertEqual(processed_response, await response.read())
+
+    async def test_handle_response_lazy_json(self):
+        """
+        Case: Response of the admin API get processed by a client with lazy
+              JSON
+        Expected: JSON objects are returned as lazy views without calling
+                  json()
+        """
+        req_ctx = asynctest.MagicMock()
+        response = req_ctx.__aenter__.return_value
+        response.json = asynctest.CoroutineMock()
+        response.read = asynctest.CoroutineMock(return_value=b'{"id": "a"}')
+
+        processed_response = await self.client._handle_response(req_ctx,
+                                                                lazy=True)
+
+        self.assertIsInstance(processed_response, JSONObject)
+        self.assertEqual(processed_response, {'id': 'a'})
+        response.json.assert_not_awaited()
+
+    async def test_hooks(self):
+        """
+        Case: Hooks are registered and a request is executed
+        Expected: The hooks are called with the status of the response
+        """
+        req_ctx = self.Session_mock.return_value.get.return_value
+        response = req_ctx.__aenter__.return_value
+        response.status = 200
+        response.json = asynctest.CoroutineMock()
+
+        response_hook = asynctest.MagicMock()
+        self.client.register_hook('response', response_hook)
+
+        result = await self.client.get(url='https://example.com/test')
+
+        self.assertEqual(result, response.json.return_value)
+        info = response_hook.call_args[0][0]
+        self.assertEqual(info.method, 'GET')
+        self.assertEqual(info.status, 200)
+        self.assertIsNotNone(info.duration)
+
+    async def test_failover(self):
+        """
+        Case: A client with multiple nodes requests while the first node
+              refuses connections
+        Expected: The request fails over to the next node
+        """
+        client = await KeycloakClient(
+            server_url=['https://a.example.com', 'https://b.example.com'],
+            headers=self.headers,
+            session_factory=self.Session_mock,
+            loop=self.loop,
+        )
+        session = client.session
+        refused = asynctest.MagicMock()
+        refused.__aenter__.side_effect = aiohttp.ClientConnectorError(
+            asynctest.MagicMock(), OSError('refused')
+        )
+        req_ctx = asynctest.MagicMock()
+        response = req_ctx.__aenter__.return_value
+        response.status = 200
+        response.json = asynctest.CoroutineMock(return_value={'a': 'b'})
+        session.get.side_effect = [refused, req_ctx]
+
+        response_hook = asynctest.MagicMock()
+        client.register_hook('response', response_hook)
+
+        result = await client.get(url='https://a.example.com/auth/test')
+
+        self.assertEqual(result, {'a': 'b'})
+        self.assertEqual(
+            [call[0][0] for call in session.get.call_args_list],
+            ['https://a.example.com/auth/test',
+             'https://b.example.com/auth/test']
+        )
+        self.assertEqual(response_hook.call_args[0][0].retries, 1)
+        self.assertEqual(response_hook.call_args[0][0].url,
+                         'https://b.example.com/auth/test')
+        self.assertEqual([node['healthy'] for node in client.node_stats()],
+                         [False, True])
+        await client.close()
+
+    def test_pool_stats(self):
+        """
+        Case: The connector of the session has connections to two nodes
+        Expected: The usage is reported per node
+        """
+        node_a = asynctest.MagicMock(host='a.example.com', port=443,
+                                     is_ssl=True)
+        node_b = asynctest.MagicMock(host='b.example.com', port=8080,
+                                     is_ssl=False)
+        connector = self.client.session.connector
+        connector.limit = 100
+        connector.limit_per_host = 0
+        connector._acquired_per_host = {node_a: {1, 2}}
+        connector._conns = {node_a: [1], node_b: [1, 2, 3]}
+
+        self.assertEqual(self.client.pool_stats(), [
+            {'pool': 'http://b.example.com:8080', 'maxsize': 100,
+             'in_use': 0, 'idle': 3},
+            {'pool': 'https://a.example.com:443', 'maxsize': 100,
+             'in_use': 2, 'idle': 1},
+        ])
+
+    async def test_hedging(self):
+        """
+        Case: A GET is slower than the hedge delay
+        Expected: The request is sent again, the first response wins and the
+                  slow request is cancelled
+        """
+        client = await KeycloakClient(
+            server_url=self.server_url,
+            headers=self.headers,
+            session_factory=self.Session_mock,
+            loop=self.loop,
+            hedging=HedgePolicy(delay=0.01),
+        )
+        session = client.session
+        slow_ctx = asynctest.MagicMock()
+        cancelled = asyncio.Event()
+
+        async def slow_enter():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        slow_ctx.__aenter__.side_effect = slow_enter
+        fast_ctx = asynctest.MagicMock()
+        response = fast_ctx.__aenter__.return_value
+        response.status = 200
+        response.json = asynctest.CoroutineMock(return_value={'a': 'b'})
+        session.get.side_effect = [slow_ctx, fast_ctx]
+
+        result = await client.get(url='https://example.com/test')
+
+        self.assertEqual(result, {'a': 'b'})
+        await asyncio.wait_for(cancelled.wait(), 1)
+        self.assertEqual(client._hedging.stats()['won'], 1)
+        await client.close()
+
+    async def test_rate_limiter(self):
+        """
+        Case: Requests of a rate limited endpoint class exceed the rate
+        Expected: Requests wait for a token in the event loop
+        """
+        client = await KeycloakClient(
+            server_url=self.server_url,
+            headers=self.headers,
+            session_factory=self.Session_mock,
+            loop=self.loop,
+            rate_limiter=RateLimiter({'admin': 1}),
+        )
+        req_ctx = client.session.get.return_value
+        response = req_ctx.__aenter__.return_value
+        response.status = 200
+        response.json = asynctest.CoroutineMock(return_value={'a': 'b'})
+
+        @endpoint('admin.users.all')
+        async def call():
+            return await client.get(url='https://example.com/test')
+
+        with asynctest.patch('keycloak.aio.client.asyncio.sleep') as sleep:
+            self.assertEqual(await call(), {'a': 'b'})
+            self.assertFalse(sleep.called)
+            self.assertEqual(await call(), {'a': 'b'})
+            self.assertGreater(sleep.call_args[0][0], 0.9)
+        await client.close()
+
+    async def test_pools(self):
+        """
+        Case: Requests of an endpoint class with a traffic class pool are
+            sent
+        Expected: A session with a connector of the pool size is used and
+            the slot is held until the response is released
+        """
+        pools = TrafficPools({'admin': 1})
+        client = await KeycloakClient(
+            server_url=self.server_url,
+            headers=self.headers,
+            session_factory=self.Session_mock,
+            loop=self.loop,
+            pools=pools,
+        )
+        connector = self.Session_mock.call_args[1]['connector']
+        self.assertEqual(connector.limit, 1)
+
+        req_ctx = client.pool_session('admin').get.return_value
+        response = req_ctx.__aenter__.return_value
+        response.status = 200
+
+        async def json(**kwargs):
+            return pools.stats()['admin']['in_use']
+
+        response.json = asynctest.CoroutineMock(side_effect=json)
+
+        @endpoint('admin.users.all')
+        async def call():
+            return await client.get(url='https://example.com/test')
+
+        self.assertEqual(await call(), 1)
+        self.assertEqual(pools.stats()['admin']['in_use'], 0)
+        await client.close()
+
+    async def test_concurrency_limiter(self):
+        """
+        Case: Requests of an endpoint class with an adaptive concurrency
+            limit are sent
+        Expected: The slot is held until the response is released and the
+            limit is decreased on an overload status
+        """
+        limit = AIMDLimit(initial=8)
+        client = await KeycloakClient(
+            server_url=self.server_url,
+            headers=self.headers,
+            session_factory=self.Session_mock,
+            loop=self.loop,
+            concurrency_limiter=ConcurrencyLimiter({'admin': limit}),
+        )
+
+        req_ctx = self.Session_mock.return_value.get.return_value
+        response = req_ctx.__aenter__.return_value
+        response.status = 200
+
+        async def json(**kwargs):
+            return limit.stats()['in_use']
+
+        response.json = asynctest.CoroutineMock(side_effect=json)
+
+        @endpoint('admin.users.all')
+        async def call():
+            return await client.get(url='https://example.com/test')
+
+        self.assertEqual(await call(), 1)
+        self.assertEqual(limit.stats()['in_use'], 0)
+
+        response.status = 503
+        await call()
+        self.assertEqual(limit.limit, 4)
+        self.assertEqual(limit.stats()['in_use'], 0)
+        await client.close()
+
+    async def test_concurrency_limiter_pools(self):
+        """
+        Case: More requests of an endpoint class with an adaptive
+            concurrency limit than its traffic class pool has slots are sent
+            to a healthy server
+        Expected: The time waiting for a pool slot isn't latency, the limit
+            doesn't shrink
+        """
+        limit = AIMDLimit(initial=8)
+        client = await KeycloakClient(
+            server_url=self.server_url,
+            headers=self.headers,
+            session_factory=self.Session_mock,
+            loop=self.loop,
+            pools=TrafficPools({'admin': 2}),
+            concurrency_limiter=ConcurrencyLimiter({'admin': limit}),
+        )
+
+        req_ctx = self.Session_mock.return_value.get.return_value
+        response = asynctest.MagicMock(status=200)
+        response.json = asynctest.CoroutineMock(return_value={})
+
+        async def enter():
+            await asyncio.sleep(0.01)
+            return response
+
+        req_ctx.__aenter__ = asynctest.CoroutineMock(side_effect=enter)
+
+        @endpoint('admin.users.all')
+        async def call():
+            return await client.get(url='https://example.com/test')
+
+        await asyncio.gather(*[call() for _ in range(16)])
+
+        self.assertEqual(req_ctx.__aenter__.await_count, 16)
+        self.assertEqual(limit.decreases, 0)
+        self.assertEqual(limit.limit, 8)
+        await client.close()
+
+    async def test_ssl_context(self):
+        """
+        Case: A client with a TLS context and traffic class pools is created
+        Expected: The connectors of all sessions use the context
+        """
+        ssl_context = create_ssl_context()
+        client = await KeycloakClient(
+            server_url=self.server_url,
+            headers=self.headers,
+            session_factory=self.Session_mock,
+            loop=self.loop,
+            pools=TrafficPools({'admin': 2}),
+            ssl_context=ssl_context,
+        )
+
+        connectors = [call[1]['connector']
+                      for call in self.Session_mock.call_args_list]
+        self.assertEqual([connector._ssl for connector in connectors],
+                         [ssl_context, ssl_context])
+        self.assertEqual(connectors[1].limit, 2)
+        self.assertEqual(client.tls_stats()['handshakes'], 0)
+        await client.close()
+
+    async def test_open_connections_pools(self):
+        """
+        Case: Connections are opened ahead of time by a client with traffic
+              class pools
+        Expected: HEAD requests are sent with the session of the client and
+                  with the session of every traffic class
+        """
+        client = await KeycloakClient(
+            server_url=self.server_url,
+            headers=self.headers,
+            session_factory=self.Session_mock,
+            loop=self.loop,
+            pools=TrafficPools({'auth': 2}),
+        )
+
+        self.assertEqual(await client.open_connections(2), 0)
+
+        for session in (client.session, client.pool_session('auth')):
+            self.assertEqual(session.head.call_count, 2)
+            session.head.assert_called_with(self.server_url,
+                                            allow_redirects=False)
+        await client.close()
+
+    async def test_detect_base_path(self):
+        """
+        Case: The base path of a legacy server gets detected
+        Expected: The candidates are probed without following redirects
+            until one answers, after that URLs use the base path
+        """
+        client = await KeycloakClient(
+            server_url=self.server_url,
+            headers=self.headers,
+            session_factory=self.Session_mock,
+            loop=self.loop,
+            base_path=None,
+        )
+        redirect, found = asynctest.MagicMock(), asynctest.MagicMock()
+        redirect.__aenter__.return_value.status = 301
+        found.__aenter__.return_value.status = 200
+        session = client.session
+        session.get.side_effect = [redirect, found]
+
+        self.assertEqual(await client.detect_base_path('a'), 'auth')
+        self.assertEqual(await client.detect_base_path('a'), 'auth')
+
+        self.assertEqual(session.get.call_args_list, [
+            asynctest.call('https://example.com/realms/a/.well-known/'
+                           'openid-configuration', allow_redirects=False),
+            asynctest.call('https://example.com/auth/realms/a/.well-known/'
+                           'openid-configuration', allow_redirects=False),
+        ])
+        self.assertEqual(client.get_full_url('auth/realms/a'),
+                         'https://example.com/auth/realms/a')
+        await client.close()
+
+    async def test_round_trips(self):
+        """
+        Case: Requests are done in a round trips block
+        Expected: The round trips of the block are counted
+        """
+        req_ctx = self.Session_mock.return_value.get.return_value
+        response = req_ctx.__aenter__.return_value
+        response.status = 200
+        response.json = asynctest.CoroutineMock()
+        response.read = asynctest.CoroutineMock(return_value=b'{}')
+        response.headers = {'Content-Length': '2'}
+
+        @endpoint('admin.users.single')
+        async def call():
+            return await self.client.get(url='https://example.com/test')
+
+        with RoundTrips() as round_trips:
+            await asyncio.gather(call(), call())
+        await call()
+
+        self.assertEqual(round_trips.round_trips, 2)
+        self.assertEqual(
+            round_trips.endpoints['admin.users.single'].bytes_received, 4
+        )
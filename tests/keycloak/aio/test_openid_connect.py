@@ -6,6 +6,7 @@ except ImportError:
     aiohttp = None
 else:
     from keycloak.aio.client import KeycloakClient
+    from keycloak.cache import MemoryCache
     from keycloak.aio.openid_connect import KeycloakOpenidConnect
     from keycloak.aio.realm import KeycloakRealm
     from keycloak.aio.well_known import KeycloakWellKnown
@@ -15,6 +16,7 @@ else:
 class KeycloakOpenidConnectTestCase(asynctest.TestCase):
     async def setUp(self):
         self.realm = asynctest.MagicMock(spec_set=KeycloakRealm)
+        self.realm.cache = None
         self.realm.client = asynctest.MagicMock(spec_set=KeycloakClient)
         self.realm.client.get = asynctest.CoroutineMock()
         self.realm.client.post = asynctest.CoroutineMock()
@@ -54,6 +56,33 @@ class KeycloakOpenidConnectTestCase(asynctest.TestCase):
         self.assertIsInstance(well_known, KeycloakWellKnown)
         self.assertEqual(well_known, self.openid_client.well_known)
 
+    async def test_well_known_cached(self):
+        """
+        Case: The .well-known of a realm with a cache expires
+        Expected: The last one is used while it's fetched again in a task
+        """
+        self.realm.cache = cache = MemoryCache()
+        self.realm.client.get.side_effect = [
+            {'token_endpoint': 'https://token'},
+            {'token_endpoint': 'https://new-token'},
+        ]
+        openid_client = await KeycloakOpenidConnect(
+            realm=self.realm,
+            client_id=self.client_id,
+            client_secret=self.client_secret
+        )
+        self.assertEqual(openid_client.get_url('token_endpoint'),
+                         'https://token')
+
+        cache.clear()
+        self.assertEqual(openid_client.get_url('token_endpoint'),
+                         'https://token')
+        await openid_client.well_known._refreshing
+
+        self.assertEqual(openid_client.get_url('token_endpoint'),
+                         'https://new-token')
+        self.assertEqual(self.realm.client.get.await_count, 2)
+
     async def test_logout(self):
         result = await self.openid_client.logout(refresh_token='refresh-token')
         self.realm.client.post.assert_awaited_once_with(
@@ -11,6 +11,7 @@ else:
     from keycloak.aio.openid_connect import KeycloakOpenidConnect
     from keycloak.aio.uma import KeycloakUMA
     from keycloak.aio.realm import KeycloakRealm
+    from keycloak.cache import MemoryCache
 
 
 async def wraps_awaitable(return_value):
@@ -98,7 +99,7 @@ class KeycloakRealmTestCase(asynctest.TestCase):
         Case: Admin client get requested
         Expected: Admin client get returned
         """
-        with asynctest.patch('keycloak.realm.KeycloakAdmin',
+        with asynctest.patch('keycloak.admin.KeycloakAdmin',
                              autospec=True) as mocked_admin_client:
             async with self.realm:
                 admin_client = self.realm.admin
@@ -133,3 +134,38 @@ class KeycloakRealmTestCase(asynctest.TestCase):
 
                 self.assertIsInstance(uma_client, KeycloakUMA)
                 mocked_uma_client.assert_called_once_with(realm=self.realm)
+
+    async def test_warmup(self):
+        """
+        Case: Realm gets warmed up
+        Expected: The .well-known documents and the JWKS are fetched and
+                  cached, connections are opened
+        """
+        documents = {
+            'https://example.com/auth/realms/some-realm/.well-known/'
+            'openid-configuration': {'jwks_uri': 'https://example.com/certs'},
+            'https://example.com/auth/realms/some-realm/.well-known/'
+            'uma2-configuration': {'issuer': 'https://example.com'},
+            'https://example.com/certs': {'keys': []},
+        }
+        client = asynctest.MagicMock(spec_set=KeycloakClient)
+        client.get_full_url.side_effect = \
+            lambda path: 'https://example.com/' + path
+        client.get = asynctest.CoroutineMock(
+            side_effect=documents.__getitem__
+        )
+        client.open_connections = asynctest.CoroutineMock(return_value=2)
+        realm = await KeycloakRealm('https://example.com', 'some-realm',
+                                    client=client, loop=self.loop)
+
+        result = await realm.warmup(connections=2, cache=MemoryCache())
+
+        self.assertEqual(result, {
+            'openid_configuration': {'jwks_uri': 'https://example.com/certs'},
+            'uma2_configuration': {'issuer': 'https://example.com'},
+            'jwks': {'keys': []},
+            'connections': 2,
+        })
+        client.open_connections.assert_awaited_once_with(2)
+        self.assertEqual(realm.cache.get('https://example.com/certs'),
+                         {'keys': []})
@@ -0,0 +1,66 @@
+import asynctest
+
+try:
+    import aiohttp  # noqa: F401
+except ImportError:
+    aiohttp = None
+else:
+    from keycloak.aio.realm import KeycloakRealm
+    from keycloak.aio.registry import KeycloakRealmRegistry
+
+
+@asynctest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class KeycloakRealmRegistryTestCase(asynctest.TestCase):
+
+    async def setUp(self):
+        self.client_patcher = asynctest.patch.object(
+            KeycloakRealmRegistry, 'client_class'
+        )
+        self.client_class = self.client_patcher.start()
+
+        async def create_client(**kwargs):
+            client = asynctest.MagicMock()
+            client.close = asynctest.CoroutineMock()
+            return client
+
+        self.client_class.side_effect = create_client
+        self.addCleanup(self.client_patcher.stop)
+
+        self.registry = await KeycloakRealmRegistry(max_realms=1,
+                                                    loop=self.loop)
+
+    async def test_get(self):
+        """
+        Case: Realms are requested
+        Expected: Realms on the same server share one client
+        """
+        async with self.registry:
+            realm = await self.registry.get('https://example.com', 'a')
+            self.assertIsInstance(realm, KeycloakRealm)
+            self.assertIs(
+                realm, await self.registry.get('https://example.com', 'a')
+            )
+            other_realm = await self.registry.get('https://example.com', 'b')
+            self.assertIs(realm.client, other_realm.client)
+            self.assertEqual(len(self.registry), 1)
+
+        realm.client.close.assert_awaited_once_with()
+
+    async def test_evict(self):
+        """
+        Case: A realm gets evicted by a realm of another server
+        Expected: The client of the evicted realm stays open until the
+                  registry is closed
+        """
+        realm = await self.registry.get('https://a.example.com', 'a')
+        await self.registry.get('https://b.example.com', 'b')
+
+        self.assertNotIn(('https://a.example.com', 'a'), self.registry)
+        self.assertFalse(realm.client.close.called)
+        self.assertIs(
+            (await self.registry.get('https://a.example.com', 'a')).client,
+            realm.client
+        )
+
+        await self.registry.close()
+        realm.client.close.assert_awaited_once_with()
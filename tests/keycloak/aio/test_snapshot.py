@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+
+import asynctest
+
+try:
+    import aiohttp  # noqa: F401
+except ImportError:
+    aiohttp = None
+else:
+    from keycloak.aio.realm import KeycloakRealm
+    from keycloak.aio.snapshot import revalidate_snapshot
+
+OPENID_URL = 'https://example.com/auth/realms/some-realm/.well-known/' \
+             'openid-configuration'
+UMA2_URL = 'https://example.com/auth/realms/some-realm/.well-known/' \
+           'uma2-configuration'
+JWKS_URL = 'https://example.com/certs'
+
+
+@asynctest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class SnapshotTestCase(asynctest.TestCase):
+
+    async def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'snapshot.json')
+
+        self.documents = {
+            OPENID_URL: {'jwks_uri': JWKS_URL},
+            UMA2_URL: {'issuer': 'https://example.com'},
+            JWKS_URL: {'keys': [{'kid': 'a'}]},
+        }
+        self.responses = []
+
+        async def get(url):
+            if self.responses:
+                raise self.responses.pop()
+            return self.documents[url]
+
+        self.client = asynctest.MagicMock()
+        self.client.get_full_url.side_effect = \
+            lambda path: 'https://example.com/' + path
+        self.client.get.side_effect = get
+        self.client.open_connections = asynctest.CoroutineMock(
+            return_value=0
+        )
+        self.realm = await KeycloakRealm('https://example.com', 'some-realm',
+                                         client=self.client, loop=self.loop)
+
+    async def test_export_and_load(self):
+        """
+        Case: A snapshot is exported and loaded without revalidation
+        Expected: The documents are served from the cache of the realm
+        """
+        await self.realm.export_snapshot(self.path)
+
+        self.client.get.reset_mock()
+        realm = await KeycloakRealm('https://example.com', 'some-realm',
+                                    client=self.client, loop=self.loop)
+        realm.load_snapshot(self.path, revalidate=False)
+
+        openid_connect = await realm.open_id_connect('client', 'secret')
+        self.assertEqual(await openid_connect.certs(),
+                         {'keys': [{'kid': 'a'}]})
+        self.assertFalse(self.client.get.called)
+
+    async def test_revalidate(self):
+        """
+        Case: A snapshot is revalidated while Keycloak is unreachable for the
+              first attempt
+        Expected: Fresh documents are fetched on the next attempt
+        """
+        snapshot = await self.realm.export_snapshot(self.path)
+        self.documents[JWKS_URL] = {'keys': [{'kid': 'b'}]}
+        self.responses.append(aiohttp.ClientError('unreachable'))
+
+        await revalidate_snapshot(snapshot, self.realm, retry_interval=0)
+
+        self.assertTrue(snapshot.revalidated.is_set())
+        self.assertEqual(self.realm.cache.get(JWKS_URL),
+                         {'keys': [{'kid': 'b'}]})
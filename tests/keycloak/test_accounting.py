@@ -0,0 +1,93 @@
+import threading
+from unittest import TestCase
+
+import mock
+
+from keycloak.accounting import RoundTrips, request_body_size
+from keycloak.client import KeycloakClient
+from keycloak.hooks import endpoint
+
+
+class RoundTripsTestCase(TestCase):
+
+    def setUp(self):
+        self.client = KeycloakClient(server_url='https://example.com')
+        session = self.client._session = mock.MagicMock()
+        session.get.return_value.content = b'{"id": "a"}'
+        session.post.return_value.content = b'{}'
+        self.client._handle_response = mock.MagicMock()
+
+    @endpoint('admin.users.single')
+    def get_user(self):
+        return self.client.get('https://example.com/auth/users/a')
+
+    def test_round_trips(self):
+        """
+        Case: Requests are done in a block
+        Expected: Round trips, bytes and time are counted per endpoint
+        """
+        with RoundTrips() as round_trips:
+            self.get_user()
+            self.get_user()
+            self.client.post('https://example.com/token',
+                             data={'grant_type': 'password'})
+
+        # Outside the block
+        self.get_user()
+
+        self.assertEqual(round_trips.round_trips, 3)
+        self.assertEqual(round_trips.bytes_sent, 19)
+        self.assertEqual(round_trips.bytes_received, 24)
+        totals = round_trips.endpoints['admin.users.single']
+        self.assertEqual(totals.round_trips, 2)
+        self.assertEqual(totals.bytes_received, 22)
+        self.assertGreater(totals.duration, 0)
+        self.assertIn('POST https://example.com/token',
+                      round_trips.endpoints)
+
+        round_trips.assert_at_most(3)
+        round_trips.assert_at_most(2, endpoint='admin.users.single')
+        with self.assertRaises(AssertionError) as context:
+            round_trips.assert_at_most(1, endpoint='admin.users.single')
+        self.assertIn('admin.users.single: 2 round trips',
+                      str(context.exception))
+
+    def test_budget(self):
+        """
+        Case: A block with a budget does more round trips
+        Expected: AssertionError is raised when leaving the block
+        """
+        with RoundTrips(budget=1):
+            self.get_user()
+
+        with self.assertRaises(AssertionError):
+            with RoundTrips(budget=1):
+                self.get_user()
+                self.get_user()
+
+    def test_nested_and_threads(self):
+        """
+        Case: Blocks are nested and requests are done in another thread
+        Expected: Outer blocks count the requests of inner blocks, requests
+                  of other threads are not counted
+        """
+        with RoundTrips() as outer:
+            with RoundTrips() as inner:
+                self.get_user()
+            thread = threading.Thread(target=self.get_user)
+            thread.start()
+            thread.join()
+
+        self.assertEqual(inner.round_trips, 1)
+        self.assertEqual(outer.round_trips, 1)
+
+    def test_request_body_size(self):
+        """
+        Case: The size of request bodies is computed
+        Expected: Bodies are measured as they are encoded
+        """
+        self.assertEqual(request_body_size(None), 0)
+        self.assertEqual(request_body_size(b'abc'), 3)
+        self.assertEqual(request_body_size(u'é'), 2)
+        self.assertEqual(request_body_size({'a': 'b c'}), 5)
+        self.assertIsNone(request_body_size(object()))
@@ -0,0 +1,387 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import TestCase, skipIf
+
+import mock
+
+from keycloak.cache import (
+    FileCache, MemoryCache, RedisCache, SingleFlight, StaleCache,
+    get_or_fetch,
+)
+from keycloak.lazy_json import lazy_json
+
+
+class GetOrFetchTestCase(TestCase):
+
+    def test_get_or_fetch(self):
+        """
+        Case: A value is requested twice through a cache
+        Expected: It's only fetched the first time
+        """
+        cache = MemoryCache()
+        fetch = mock.MagicMock(return_value={'keys': []})
+
+        self.assertEqual(get_or_fetch(cache, 'key', fetch), {'keys': []})
+        self.assertEqual(get_or_fetch(cache, 'key', fetch), {'keys': []})
+        fetch.assert_called_once_with()
+
+    def test_get_or_fetch_without_cache(self):
+        """
+        Case: A value is requested twice without a cache
+        Expected: It's fetched every time
+        """
+        fetch = mock.MagicMock(return_value={'keys': []})
+
+        get_or_fetch(None, 'key', fetch)
+        get_or_fetch(None, 'key', fetch)
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_get_or_fetch_concurrently(self):
+        """
+        Case: Many threads request a missing value at the same time
+        Expected: It's fetched once and all threads get it
+        """
+        cache = MemoryCache()
+        release = threading.Event()
+        fetch = mock.MagicMock(side_effect=lambda: release.wait(5) and
+                               {'keys': []})
+        results = []
+
+        def target():
+            results.append(get_or_fetch(cache, 'key', fetch))
+
+        threads = [threading.Thread(target=target) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        while not fetch.called:
+            release.wait(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        fetch.assert_called_once_with()
+        self.assertEqual(results, [{'keys': []}] * 10)
+
+    def test_get_or_fetch_caches_concurrently(self):
+        """
+        Case: Two caches request the same missing key at the same time
+        Expected: Both fetch it and store it
+        """
+        caches = [MemoryCache(), MemoryCache()]
+        fetches = []
+        started = threading.Event()
+
+        def fetch():
+            # Both fetches run at the same time
+            fetches.append(1)
+            if len(fetches) == 2:
+                started.set()
+            started.wait(5)
+            return {'keys': []}
+
+        threads = [threading.Thread(target=get_or_fetch,
+                                    args=(cache, 'key', fetch))
+                   for cache in caches]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(fetches), 2)
+        self.assertEqual([cache.get('key') for cache in caches],
+                         [{'keys': []}] * 2)
+
+    @skipIf(not hasattr(os, 'register_at_fork'), 'fork hooks are missing')
+    def test_get_or_fetch_forked(self):
+        """
+        Case: A process forks while a fetch is in flight
+        Expected: The child fetches the value itself instead of waiting for
+            the fetch of the parent
+        """
+        cache = MemoryCache()
+        release = threading.Event()
+        started = threading.Event()
+
+        def fetch():
+            started.set()
+            release.wait(5)
+            return {'keys': []}
+
+        thread = threading.Thread(target=get_or_fetch,
+                                  args=(cache, 'key', fetch))
+        thread.start()
+        started.wait(5)
+
+        pid = os.fork()
+        if not pid:
+            child = threading.Thread(target=get_or_fetch, args=(
+                cache, 'key', lambda: {'keys': [1]}
+            ))
+            child.start()
+            child.join(5)
+            os._exit(0 if cache.get('key') == {'keys': [1]} else 1)
+
+        release.set()
+        thread.join()
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(status, 0)
+
+
+class SingleFlightTestCase(TestCase):
+
+    def test_do(self):
+        """
+        Case: A call fails while another thread waits for its result
+        Expected: Both get the exception, the next call calls again
+        """
+        flights = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        errors = []
+
+        def fail():
+            started.set()
+            release.wait(5)
+            raise IOError('unreachable')
+
+        def target(func):
+            try:
+                flights.do('key', func)
+            except IOError as exc:
+                errors.append(exc)
+
+        leader = threading.Thread(target=target, args=(fail,))
+        leader.start()
+        started.wait(5)
+        follower = threading.Thread(target=target,
+                                    args=(mock.MagicMock(),))
+        follower.start()
+        # Give the follower time to join the call of the leader
+        time.sleep(0.1)
+        release.set()
+        leader.join()
+        follower.join()
+
+        self.assertEqual(len(errors), 2)
+        self.assertIs(errors[0], errors[1])
+        self.assertEqual(flights.do('key', lambda: 'value'), 'value')
+
+    def test_start(self):
+        """
+        Case: A call is started in the background while another is running
+        Expected: Only the first one is called, waiting threads get its
+            result
+        """
+        flights = SingleFlight()
+        release = threading.Event()
+        other = mock.MagicMock()
+
+        self.assertTrue(flights.start('key', lambda: release.wait(5) and 1))
+        self.assertFalse(flights.start('key', other))
+        release.set()
+
+        self.assertEqual(flights.do('key', other), 1)
+        other.assert_not_called()
+
+
+class StaleCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.now = 100
+        for target in ('keycloak.cache.clock', 'keycloak.cache.time.time'):
+            patcher = mock.patch(target, side_effect=lambda: self.now)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.cache = StaleCache(MemoryCache(ttl=10),
+                                stale_while_revalidate=5, stale_if_error=60)
+        self.cache.set('key', {'keys': [1]})
+
+    def test_get(self):
+        """
+        Case: An entry is read before and after it expired
+        Expected: It's only returned while it's fresh, it's kept for the
+            stale windows
+        """
+        self.assertEqual(self.cache.get('key'), {'keys': [1]})
+        self.assertEqual(self.cache.lookup('key'), ({'keys': [1]}, 0))
+
+        self.now = 115
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.lookup('key'), ({'keys': [1]}, 5))
+
+        self.now = 171
+        self.assertEqual(self.cache.lookup('key'), (None, None))
+
+    def test_stale_while_revalidate(self):
+        """
+        Case: An entry which expired within the revalidation window is
+            requested
+        Expected: It's returned and refreshed in the background
+        """
+        self.now = 112
+        release = threading.Event()
+        fetch = mock.MagicMock(side_effect=lambda: release.wait(5) and
+                               {'keys': [2]})
+
+        self.assertEqual(get_or_fetch(self.cache, 'key', fetch),
+                         {'keys': [1]})
+        self.assertEqual(get_or_fetch(self.cache, 'key', fetch),
+                         {'keys': [1]})
+        release.set()
+        for _ in range(500):
+            if self.cache.get('key') is not None:
+                break
+            time.sleep(0.01)
+
+        fetch.assert_called_once_with()
+        self.assertEqual(get_or_fetch(self.cache, 'key', fetch),
+                         {'keys': [2]})
+        self.assertEqual(self.cache.stats()['key'], {
+            'staleness': 0.0, 'served_stale': 2, 'revalidations': 1,
+            'refresh_errors': 0,
+        })
+
+    def test_stale_if_error(self):
+        """
+        Case: Refreshing an entry fails while it's within the error window
+        Expected: The expired entry is returned and its staleness is
+            reported until it's refreshed
+        """
+        self.now = 130
+        fetch = mock.MagicMock(side_effect=IOError('unreachable'))
+
+        self.assertEqual(get_or_fetch(self.cache, 'key', fetch),
+                         {'keys': [1]})
+        fetch.assert_called_once_with()
+
+        self.now = 140
+        self.assertEqual(self.cache.stats()['key'], {
+            'staleness': 30.0, 'served_stale': 1, 'revalidations': 0,
+            'refresh_errors': 1,
+        })
+
+        self.now = 171
+        with self.assertRaises(IOError):
+            get_or_fetch(self.cache, 'key', fetch)
+
+        get_or_fetch(self.cache, 'key', lambda: {'keys': [2]})
+        self.assertEqual(self.cache.stats()['key']['staleness'], 0)
+
+
+class MemoryCacheTestCase(TestCase):
+
+    @mock.patch('keycloak.cache.clock', autospec=True)
+    def test_ttl(self, clock_mock):
+        """
+        Case: Entries are read after their TTL
+        Expected: They are expired
+        """
+        clock_mock.return_value = 100
+        cache = MemoryCache(ttl=10)
+        cache.set('default', 1)
+        cache.set('longer', 2, ttl=30)
+
+        clock_mock.return_value = 115
+        self.assertIsNone(cache.get('default'))
+        self.assertEqual(cache.get('longer'), 2)
+
+    def test_lru(self):
+        """
+        Case: More entries than allowed are stored
+        Expected: The least recently used entry is evicted
+        """
+        cache = MemoryCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+
+        cache.delete('a')
+        self.assertIsNone(cache.get('a'))
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+
+class FileCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_shared(self):
+        """
+        Case: Two caches use the same directory
+        Expected: Entries stored by one are read by the other
+        """
+        FileCache(self.directory).set('https://certs', {'keys': [1]})
+
+        cache = FileCache(self.directory)
+        self.assertEqual(cache.get('https://certs'), {'keys': [1]})
+        self.assertIsNone(cache.get('https://other'))
+
+        cache.delete('https://certs')
+        cache.delete('https://certs')
+        self.assertIsNone(cache.get('https://certs'))
+
+    @mock.patch('keycloak.cache.time.time', autospec=True)
+    def test_ttl(self, time_mock):
+        """
+        Case: An entry is read after its TTL
+        Expected: It's expired
+        """
+        time_mock.return_value = 100
+        cache = FileCache(self.directory, ttl=10)
+        cache.set('key', 'value')
+
+        time_mock.return_value = 109
+        self.assertEqual(cache.get('key'), 'value')
+        time_mock.return_value = 111
+        self.assertIsNone(cache.get('key'))
+
+    def test_lazy_json(self):
+        """
+        Case: A lazy JSON view gets stored
+        Expected: It's stored as plain data
+        """
+        cache = FileCache(self.directory)
+        cache.set('key', lazy_json(b'{"keys": [{"kid": "a"}]}'))
+
+        self.assertEqual(cache.get('key'), {'keys': [{'kid': 'a'}]})
+
+        cache.clear()
+        self.assertIsNone(cache.get('key'))
+
+
+class RedisCacheTestCase(TestCase):
+
+    def test_cache(self):
+        """
+        Case: Entries are stored in a Redis like client
+        Expected: Values are stored as JSON with the prefix and TTL
+        """
+        client = mock.MagicMock()
+        client.get.return_value = b'{"keys":[]}'
+        cache = RedisCache(client, ttl=60)
+
+        cache.set('https://certs', {'keys': []})
+        self.assertEqual(cache.get('https://certs'), {'keys': []})
+        cache.delete('https://certs')
+
+        client.set.assert_called_once_with('keycloak:https://certs',
+                                           json.dumps({'keys': []},
+                                                      separators=(',', ':')),
+                                           ex=60)
+        client.get.assert_called_once_with('keycloak:https://certs')
+        client.delete.assert_called_once_with('keycloak:https://certs')
+
+        client.get.return_value = None
+        self.assertIsNone(cache.get('https://other'))
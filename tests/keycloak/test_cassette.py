@@ -0,0 +1,120 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import mock
+from requests import Response
+from requests.adapters import HTTPAdapter
+
+from keycloak.cassette import Cassette, NoRecordedResponse, request_key
+from keycloak.client import KeycloakClient
+from keycloak.exceptions import KeycloakClientError
+from keycloak.hooks import endpoint
+
+
+class CassetteTestCase(TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'cassette.jsonl')
+
+    def write(self, *entries):
+        with open(self.path, 'w') as cassette:
+            for entry in entries:
+                cassette.write(json.dumps(entry) + '\n')
+
+    def test_request_key(self):
+        """
+        Case: Keys are made for URLs with query strings and parameters
+        Expected: The order of the query parameters doesn't matter
+        """
+        self.assertEqual(
+            request_key('get', 'https://example.com/path?b=2&a=1'),
+            request_key('GET', 'https://example.com/path', {'a': 1, 'b': '2'})
+        )
+
+    @mock.patch.object(HTTPAdapter, 'send', autospec=True)
+    def test_record(self, send_mock):
+        """
+        Case: Requests are done with a recording cassette
+        Expected: The response and endpoint are appended to the cassette,
+                  the request body isn't
+        """
+        response = Response()
+        response.status_code = 200
+        response.headers['Content-Type'] = 'application/json'
+        response._content = b'{"id": "abc"}'
+        send_mock.return_value = response
+
+        client = KeycloakClient(server_url='https://example.com',
+                                cassette=Cassette(self.path, record=True))
+
+        @endpoint('admin.users.single')
+        def get_user():
+            return client.post('https://example.com/users',
+                               data={'password': 'secret'}, b=2, a=1)
+
+        self.assertEqual(get_user(), {'id': 'abc'})
+
+        with open(self.path) as cassette:
+            entry = json.loads(cassette.readline())
+        self.assertEqual(entry['method'], 'POST')
+        self.assertEqual(entry['url'], 'https://example.com/users?b=2&a=1')
+        self.assertEqual(entry['endpoint'], 'admin.users.single')
+        self.assertEqual(entry['status'], 200)
+        self.assertEqual(entry['headers'],
+                         {'Content-Type': 'application/json'})
+        self.assertEqual(entry['text'], '{"id": "abc"}')
+        self.assertNotIn('secret', json.dumps(entry))
+
+    def test_replay(self):
+        """
+        Case: Requests are done with a replaying cassette
+        Expected: The recorded responses are returned in order and start over
+                  when all are served
+        """
+        self.write(
+            {'method': 'GET', 'url': 'https://example.com/users?a=1',
+             'status': 200, 'headers': {}, 'duration': 0.1, 'text': '[1]'},
+            {'method': 'GET', 'url': 'https://example.com/users?a=1',
+             'status': 200, 'headers': {}, 'duration': 0.1, 'text': '[2]'},
+            {'method': 'GET', 'url': 'https://example.com/fail',
+             'status': 500, 'headers': {}, 'duration': 0.1, 'text': ''},
+            {'method': 'DELETE', 'url': 'https://example.com/users/1',
+             'status': 204, 'headers': {}, 'duration': 0.1, 'text': ''},
+        )
+        client = KeycloakClient(server_url='https://example.com',
+                                cassette=Cassette(self.path))
+
+        self.assertEqual(client.get('https://example.com/users', a=1), [1])
+        self.assertEqual(client.get('https://example.com/users', a=1), [2])
+        self.assertEqual(client.get('https://example.com/users', a=1), [1])
+        self.assertEqual(
+            client.delete('https://example.com/users/1', headers={})
+            .status_code, 204
+        )
+
+        with self.assertRaises(KeycloakClientError):
+            client.get('https://example.com/fail')
+
+        with self.assertRaises(NoRecordedResponse):
+            client.get('https://example.com/unknown')
+
+    @mock.patch('keycloak.cassette.time.sleep', autospec=True)
+    def test_replay_latency(self, sleep_mock):
+        """
+        Case: Requests are replayed with the recorded latency
+        Expected: The response is delayed with the recorded duration
+        """
+        self.write({'method': 'GET', 'url': 'https://example.com/users',
+                    'status': 200, 'headers': {}, 'duration': 0.25,
+                    'base64': 'W10='})
+        client = KeycloakClient(server_url='https://example.com',
+                                cassette=Cassette(self.path,
+                                                  replay_latency=True))
+
+        self.assertEqual(client.get('https://example.com/users'), [])
+        sleep_mock.assert_called_once_with(0.25)
@@ -1,9 +1,42 @@
+import gc
+import pickle
+import threading
+import time
 from unittest import TestCase
 
 import mock
-from requests import Session
-
-from keycloak.client import KeycloakClient
+from requests import ConnectionError, HTTPError, Session
+
+from keycloak.client import KeycloakClient, Result, rebase_path
+from keycloak.concurrency import AIMDLimit, ConcurrencyLimiter
+from keycloak.exceptions import KeycloakClientError
+from keycloak.hedging import HedgePolicy
+from keycloak.hooks import endpoint
+from keycloak.lazy_json import JSONArray, JSONObject
+from keycloak.pools import TrafficPools
+from keycloak.rate_limit import RateLimiter
+from keycloak.tls import create_ssl_context
+from keycloak.transport import Urllib3Session
+
+
+def run_in_threads(func, count=20):
+    """
+    Call `func` from `count` threads which are started at the same time.
+    """
+    start = threading.Event()
+    results = []
+
+    def target():
+        start.wait()
+        results.append(func())
+
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    start.set()
+    for thread in threads:
+        thread.join()
+    return results
 
 
 class KeycloakClientTestCase(TestCase):
@@ -138,22 +171,59 @@ class KeycloakClientTestCase(TestCase):
     def test_delete(self, request_mock):
         """
         Case: A DELETE request get executed
-        Expected: The correct parameters get given to the request library
+        Expected: The correct parameters get given to the request library,
+            the response is closed and a result is returned
         """
         request_mock.Session.return_value.headers = mock.MagicMock()
+        delete = request_mock.Session.return_value.delete
+        delete.return_value.status_code = 204
+        delete.return_value.content = b''
 
-        self.client._handle_response = mock.MagicMock()
         response = self.client.delete(url='https://example.com/test',
                                       headers={'some': 'header'},
                                       extra='param')
 
-        request_mock.Session.return_value.delete.assert_called_once_with(
+        delete.assert_called_once_with(
             'https://example.com/test',
             headers={'some': 'header'},
             extra='param'
         )
-        self.assertEqual(response,
-                         request_mock.Session.return_value.delete.return_value)
+        delete.return_value.raise_for_status.assert_called_once_with()
+        delete.return_value.__exit__.assert_called_once_with(
+            None, None, None
+        )
+        self.assertIsInstance(response, Result)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(response.content, b'')
+        self.assertTrue(response.ok)
+
+        delete.reset_mock()
+        delete.return_value.headers = {'Content-Length': '0'}
+        response_hook = mock.MagicMock()
+        self.client.register_hook('response', response_hook)
+        response = self.client.delete(url='https://example.com/test',
+                                      headers={}, read_body=False)
+        self.assertIsNone(response.content)
+        delete.assert_called_once_with('https://example.com/test',
+                                       headers={}, stream=True)
+        delete.return_value.raw.drain_conn.assert_called_once_with()
+        self.assertEqual(response_hook.call_args[0][0].response_size, 0)
+
+    @mock.patch('keycloak.client.requests', autospec=True)
+    def test_delete_error(self, request_mock):
+        """
+        Case: A DELETE request gets an error response
+        Expected: It's raised like for the other methods
+        """
+        request_mock.Session.return_value.headers = mock.MagicMock()
+        delete = request_mock.Session.return_value.delete
+        delete.return_value.raise_for_status.side_effect = HTTPError()
+
+        with self.assertRaises(KeycloakClientError):
+            self.client.delete(url='https://example.com/test', headers={})
+        delete.return_value.__exit__.assert_called_once_with(
+            KeycloakClientError, mock.ANY, mock.ANY
+        )
 
     def test_handle_response(self):
         """
@@ -173,3 +243,643 @@ class KeycloakClientTestCase(TestCase):
         processed_response = self.client._handle_response(response=response)
 
         self.assertEqual(processed_response, response.content)
+
+    def test_handle_response_lazy_json(self):
+        """
+        Case: Response get processed by a client with lazy JSON
+        Expected: JSON objects and arrays are returned as lazy views, other
+                  content is returned as before
+        """
+        client = KeycloakClient(server_url=self.server_url, lazy_json=True)
+        response = mock.MagicMock()
+        response.content = b' [{"id": "abc"}]'
+
+        processed_response = client._handle_response(response=response,
+                                                     lazy=True)
+
+        self.assertIsInstance(processed_response, JSONArray)
+        self.assertEqual(processed_response[0]['id'], 'abc')
+        self.assertFalse(response.json.called)
+
+        response.content = b'not json'
+        response.json.side_effect = ValueError
+        processed_response = client._handle_response(response=response,
+                                                     lazy=True)
+
+        self.assertEqual(processed_response, b'not json')
+
+    def test_lazy_json_endpoint_classes(self):
+        """
+        Case: A client with lazy JSON requests the admin API and the JWKS
+        Expected: Only the admin response is a lazy view, the JWKS which the
+                  library uses itself is a plain dict
+        """
+        client = KeycloakClient(server_url=self.server_url, lazy_json=True)
+        client._session = mock.MagicMock()
+        response = client._session.get.return_value
+        response.content = b'{"keys": []}'
+        response.json.return_value = {'keys': []}
+
+        admin = endpoint('admin.users.collection')(client.get)
+        jwks = endpoint('discovery.jwks')(client.get)
+
+        self.assertIsInstance(admin('https://example.com/users'),
+                              JSONObject)
+        self.assertEqual(jwks('https://example.com/certs'), {'keys': []})
+        self.assertIsInstance(jwks('https://example.com/certs'), dict)
+
+    @mock.patch('keycloak.client.requests', autospec=True)
+    def test_hooks(self, request_mock):
+        """
+        Case: Hooks are registered and a request is executed
+        Expected: The hooks are called with the request info
+        """
+        session = request_mock.Session.return_value
+        session.headers = mock.MagicMock()
+        session.get.return_value.status_code = 200
+        self.client._handle_response = mock.MagicMock()
+
+        request_hook = mock.MagicMock()
+        response_hook = mock.MagicMock()
+        self.client.register_hook('request', request_hook)
+        self.client.register_hook('response', [response_hook])
+
+        @endpoint('admin.users.all')
+        def call():
+            return self.client.get(url='https://example.com/test')
+
+        response = call()
+
+        self.assertEqual(response, self.client._handle_response.return_value)
+        info = request_hook.call_args[0][0]
+        response_hook.assert_called_once_with(info)
+        self.assertEqual(info.method, 'GET')
+        self.assertEqual(info.url, 'https://example.com/test')
+        self.assertEqual(info.endpoint, 'admin.users.all')
+        self.assertEqual(info.status, 200)
+        self.assertIsNotNone(info.duration)
+
+    @mock.patch('keycloak.client.requests', autospec=True)
+    def test_error_hook(self, request_mock):
+        """
+        Case: A request fails without response
+        Expected: The error hook is called and the exception is re-raised
+        """
+        session = request_mock.Session.return_value
+        session.headers = mock.MagicMock()
+        session.post.side_effect = IOError('connection refused')
+
+        error_hook = mock.MagicMock()
+        self.client.register_hook('error', error_hook)
+
+        with self.assertRaises(IOError):
+            self.client.post(url='https://example.com/test', data=None)
+
+        info = error_hook.call_args[0][0]
+        self.assertIsInstance(info.exception, IOError)
+        self.assertIsNone(info.status)
+
+    def test_failover(self):
+        """
+        Case: A client with multiple nodes requests while the first node
+              refuses connections
+        Expected: The request fails over to the next node, the failed node is
+                  skipped for next requests and the hooks get the URL on the
+                  node which responded
+        """
+        client = KeycloakClient(
+            server_url=['https://a.example.com', 'https://b.example.com/'],
+            headers=self.headers
+        )
+        session = mock.MagicMock()
+        client._session = session
+        client._handle_response = mock.MagicMock()
+        response = mock.MagicMock(status_code=200)
+        session.get.side_effect = [ConnectionError('refused'), response,
+                                   response]
+        response_hook = mock.MagicMock()
+        client.register_hook('response', response_hook)
+
+        self.assertEqual(client.server_url, 'https://a.example.com')
+        client.get(client.get_full_url('/auth/test'), headers={'a': 'b'})
+        client.get(client.get_full_url('/auth/test'))
+
+        self.assertEqual(session.get.call_args_list, [
+            mock.call('https://a.example.com/auth/test', headers={'a': 'b'},
+                      params={}),
+            mock.call('https://b.example.com/auth/test', headers={'a': 'b'},
+                      params={}),
+            mock.call('https://b.example.com/auth/test', headers={},
+                      params={}),
+        ])
+        client._handle_response.assert_called_with(response)
+        self.assertEqual(
+            [call[0][0].retries for call in response_hook.call_args_list],
+            [1, 0]
+        )
+        self.assertEqual(
+            [call[0][0].url for call in response_hook.call_args_list],
+            ['https://b.example.com/auth/test'] * 2
+        )
+        stats = client.node_stats()
+        self.assertEqual([node['healthy'] for node in stats], [False, True])
+        self.assertIsNotNone(stats[1]['latency'])
+
+    def test_failover_status(self):
+        """
+        Case: A node of a client with multiple nodes responds with 503
+        Expected: A GET fails over to the next node, a POST gets the 503
+                  response
+        """
+        client = KeycloakClient(
+            server_url=['https://a.example.com', 'https://b.example.com'],
+            headers=self.headers
+        )
+        session = mock.MagicMock()
+        client._session = session
+        client._handle_response = mock.MagicMock()
+        unavailable = mock.MagicMock(status_code=503)
+        response = mock.MagicMock(status_code=200)
+        session.get.side_effect = [unavailable, response]
+        session.post.return_value = unavailable
+
+        client.get('https://a.example.com/auth/test')
+        client._handle_response.assert_called_with(response)
+        unavailable.close.assert_called_once_with()
+
+        # Node b is the only healthy one
+        session.post.return_value = unavailable
+        client.post('https://b.example.com/auth/test', data={})
+        client._handle_response.assert_called_with(unavailable)
+        session.post.assert_called_once_with(
+            'https://b.example.com/auth/test', headers={}, params={},
+            data={}
+        )
+
+        # URLs which are not on a node are sent as is
+        session.get.side_effect = None
+        session.get.return_value = response
+        client.get('https://other.example.com/auth/test')
+        session.get.assert_called_with('https://other.example.com/auth/test',
+                                       headers={}, params={})
+
+    def test_hedging(self):
+        """
+        Case: A GET is slower than the hedge delay
+        Expected: The request is sent again, the first response wins and the
+                  slow response is closed when it arrives
+        """
+        client = KeycloakClient(server_url=self.server_url,
+                                headers=self.headers,
+                                hedging=HedgePolicy(delay=0.01))
+        session = mock.MagicMock()
+        client._session = session
+        client._handle_response = mock.MagicMock()
+        release = threading.Event()
+        slow_response = mock.MagicMock(status_code=200)
+        fast_response = mock.MagicMock(status_code=200)
+
+        def get(url, **kwargs):
+            if session.get.call_count == 1:
+                release.wait(5)
+                return slow_response
+            return fast_response
+
+        session.get.side_effect = get
+        response_hook = mock.MagicMock()
+        client.register_hook('response', response_hook)
+
+        client.get('https://example.com/test')
+
+        client._handle_response.assert_called_once_with(fast_response)
+        self.assertEqual(session.get.call_count, 2)
+        self.assertTrue(response_hook.call_args[0][0].hedged)
+        self.assertEqual(client._hedging.stats()['won'], 1)
+
+        release.set()
+        for _ in range(100):
+            if slow_response.close.called:
+                break
+            time.sleep(0.01)
+        slow_response.close.assert_called_once_with()
+
+        # Other methods are never hedged
+        session.post.return_value = fast_response
+        client.post('https://example.com/test', data={})
+        session.post.assert_called_once_with('https://example.com/test',
+                                             headers={}, params={}, data={})
+
+    def test_concurrency_limiter(self):
+        """
+        Case: Requests of an endpoint class with an adaptive concurrency
+            limit are sent
+        Expected: They take a slot and the limit is adapted to their status
+        """
+        limit = AIMDLimit(initial=8)
+        client = KeycloakClient(
+            server_url=self.server_url, headers=self.headers,
+            concurrency_limiter=ConcurrencyLimiter({'admin': limit})
+        )
+        client._session = mock.MagicMock()
+        client._handle_response = mock.MagicMock()
+        client._session.get.side_effect = \
+            lambda *args, **kwargs: mock.MagicMock(
+                status_code=200 + limit.stats()['in_use']
+            )
+
+        @endpoint('admin.users.all')
+        def call():
+            return client.get(url='https://example.com/test')
+
+        call()
+        self.assertEqual(
+            client._handle_response.call_args[0][0].status_code, 201
+        )
+
+        client._session.get.side_effect = None
+        client._session.get.return_value.status_code = 503
+        call()
+        self.assertEqual(limit.limit, 4)
+        self.assertEqual(limit.stats()['in_use'], 0)
+
+    @mock.patch('keycloak.client.requests', autospec=True)
+    def test_concurrency_limiter_pools(self, request_mock):
+        """
+        Case: More requests of an endpoint class with an adaptive
+            concurrency limit than its traffic class pool has slots are sent
+            to a healthy server
+        Expected: The time waiting for a pool slot isn't latency, the limit
+            doesn't shrink
+        """
+        session = request_mock.Session.return_value = mock.MagicMock()
+        limit = AIMDLimit(initial=8)
+        client = KeycloakClient(
+            server_url=self.server_url, headers=self.headers,
+            pools=TrafficPools({'admin': 2}),
+            concurrency_limiter=ConcurrencyLimiter({'admin': limit})
+        )
+        client._handle_response = mock.MagicMock()
+
+        def get(*args, **kwargs):
+            time.sleep(0.01)
+            return mock.MagicMock(status_code=200)
+
+        session.get.side_effect = get
+
+        @endpoint('admin.users.all')
+        def call():
+            return client.get(url='https://example.com/test')
+
+        run_in_threads(call, count=16)
+
+        self.assertEqual(session.get.call_count, 16)
+        self.assertEqual(limit.decreases, 0)
+        self.assertEqual(limit.limit, 8)
+
+    @mock.patch('keycloak.client.requests', autospec=True)
+    def test_pools(self, request_mock):
+        """
+        Case: Requests of endpoint classes with and without a traffic class
+            pool are sent
+        Expected: Pooled requests use the session of their traffic class
+            which has a pool of the configured size, others the default
+            session
+        """
+        sessions = [mock.MagicMock(), mock.MagicMock()]
+        request_mock.Session.side_effect = sessions
+        pools = TrafficPools({'admin': 2})
+        client = KeycloakClient(server_url=self.server_url,
+                                headers=self.headers, pools=pools)
+        client._handle_response = mock.MagicMock()
+
+        @endpoint('admin.users.all')
+        def call():
+            self.assertEqual(pools.stats()['admin']['in_use'], 0)
+            return client.get(url='https://example.com/test')
+
+        sessions[0].get.side_effect = \
+            lambda *args, **kwargs: pools.stats()['admin']['in_use']
+        call()
+        client.get(url='https://example.com/other')
+
+        self.assertIs(client.pool_session('admin'), sessions[0])
+        client._handle_response.assert_any_call(1)
+        adapter = sessions[0].mount.call_args[0][1]
+        self.assertEqual(adapter._pool_maxsize, 2)
+        sessions[1].get.assert_called_once_with(
+            'https://example.com/other', headers={}, params={}
+        )
+        self.assertEqual(pools.stats()['admin']['in_use'], 0)
+
+    def test_get_full_url_base_path(self):
+        """
+        Case: Full URLs are built for a server without base path
+        Expected: The legacy base path is replaced, other paths are kept
+        """
+        client = KeycloakClient(server_url=self.server_url, base_path='/')
+
+        self.assertEqual(
+            client.get_full_url('/auth/admin/realms/a/users'),
+            'https://example.com/admin/realms/a/users'
+        )
+        self.assertEqual(
+            client.get_full_url('auth/realms/a/.well-known/uma'),
+            'https://example.com/realms/a/.well-known/uma'
+        )
+        self.assertEqual(client.get_full_url('/authz/a'),
+                         'https://example.com/authz/a')
+        self.assertEqual(rebase_path('/auth/realms/a', 'kc'), '/kc/realms/a')
+        self.assertEqual(self.client.get_full_url('/auth/realms/a'),
+                         'https://example.com/auth/realms/a')
+
+    @mock.patch('keycloak.client.clock', autospec=True, return_value=100)
+    def test_detect_base_path(self, clock_mock):
+        """
+        Case: The base path of a legacy server gets detected
+        Expected: The candidates are probed without following redirects
+            until one answers, after that URLs use the base path and no
+            more probes are sent
+        """
+        client = KeycloakClient(server_url=self.server_url, base_path=None)
+        client._session = mock.MagicMock()
+        client._session.get.side_effect = [
+            mock.MagicMock(status_code=301), mock.MagicMock(status_code=200)
+        ]
+
+        self.assertEqual(client.detect_base_path('a'), 'auth')
+        self.assertEqual(client.detect_base_path('a'), 'auth')
+
+        self.assertEqual(client._session.get.call_args_list, [
+            mock.call('https://example.com/realms/a/.well-known/'
+                      'openid-configuration', allow_redirects=False),
+            mock.call('https://example.com/auth/realms/a/.well-known/'
+                      'openid-configuration', allow_redirects=False),
+        ])
+
+    @mock.patch('keycloak.client.clock', autospec=True, return_value=100)
+    def test_detect_base_path_failed(self, clock_mock):
+        """
+        Case: No candidate base path answers
+        Expected: The legacy base path is used and the detection is only
+            tried again after the retry interval
+        """
+        client = KeycloakClient(server_url=self.server_url, base_path=None)
+        client._session = mock.MagicMock()
+        client._session.get.return_value.status_code = 404
+
+        self.assertIsNone(client.detect_base_path('a'))
+        clock_mock.return_value = 129
+        self.assertIsNone(client.detect_base_path('a'))
+        self.assertEqual(client._session.get.call_count, 2)
+        self.assertEqual(client.get_full_url('auth/realms/a'),
+                         'https://example.com/auth/realms/a')
+
+        clock_mock.return_value = 130
+        client._session.get.return_value.status_code = 200
+        self.assertEqual(client.detect_base_path('a'), '')
+
+    def test_ssl_context(self):
+        """
+        Case: A client with a TLS context creates its sessions
+        Expected: HTTPS connections use the context, also with the urllib3
+            transport, and its handshakes are counted
+        """
+        ssl_context = create_ssl_context()
+        client = KeycloakClient(server_url=self.server_url,
+                                ssl_context=ssl_context)
+
+        adapter = client.session.get_adapter('https://example.com')
+        self.assertIs(adapter.poolmanager.connection_pool_kw['ssl_context'],
+                      ssl_context)
+        self.assertEqual(client.tls_stats(),
+                         {'handshakes': 0, 'resumed': 0, 'full': 0})
+
+        client = KeycloakClient(server_url=self.server_url,
+                                ssl_context=ssl_context,
+                                session_factory=Urllib3Session)
+        pool_kwargs = client.session.poolmanager.connection_pool_kw
+        self.assertIs(pool_kwargs['ssl_context'], ssl_context)
+        self.assertNotIn('ca_certs', pool_kwargs)
+
+        self.assertIsNone(pickle.loads(pickle.dumps(client)).ssl_context)
+        self.assertIsNone(KeycloakClient(self.server_url).tls_stats())
+
+    @mock.patch('keycloak.client.time.sleep', autospec=True)
+    def test_rate_limiter(self, sleep_mock):
+        """
+        Case: Requests of a rate limited endpoint class exceed the rate
+        Expected: Requests wait for a token and the wait is passed to the
+                  hooks, other endpoint classes don't wait
+        """
+        client = KeycloakClient(server_url=self.server_url,
+                                headers=self.headers,
+                                rate_limiter=RateLimiter({'admin': 1}))
+        client._session = mock.MagicMock()
+        client._handle_response = mock.MagicMock()
+        response_hook = mock.MagicMock()
+        client.register_hook('response', response_hook)
+
+        @endpoint('admin.users.all')
+        def call():
+            return client.get(url='https://example.com/test')
+
+        call()
+        self.assertFalse(sleep_mock.called)
+        self.assertEqual(response_hook.call_args[0][0].rate_limit_wait, 0)
+
+        call()
+        wait = sleep_mock.call_args[0][0]
+        self.assertGreater(wait, 0.9)
+        self.assertEqual(response_hook.call_args[0][0].rate_limit_wait, wait)
+
+        sleep_mock.reset_mock()
+        client.get(url='https://example.com/test')
+        self.assertFalse(sleep_mock.called)
+
+    def test_register_hook(self):
+        """
+        Case: Hooks get registered and deregistered
+        Expected: Unknown events are refused
+        """
+        hook = mock.MagicMock()
+
+        with self.assertRaises(ValueError):
+            self.client.register_hook('unknown', hook)
+
+        self.assertFalse(self.client._has_hooks)
+        self.client.register_hook('response', hook)
+        self.assertTrue(self.client._has_hooks)
+        self.assertTrue(self.client.deregister_hook('response', hook))
+        self.assertFalse(self.client.deregister_hook('response', hook))
+        self.assertFalse(self.client._has_hooks)
+
+    def test_pool_stats(self):
+        """
+        Case: Pool usage is requested before and after a session exists
+        Expected: One entry per connection pool of the session
+        """
+        self.assertEqual(self.client.pool_stats(), [])
+
+        adapter = self.client.session.get_adapter('https://example.com')
+        adapter.poolmanager.connection_from_url('https://example.com')
+
+        self.assertEqual(self.client.pool_stats(), [{
+            'pool': 'https://example.com:443',
+            'maxsize': 10,
+            'in_use': 0,
+            'idle': 0,
+        }])
+
+    def test_open_connections(self):
+        """
+        Case: Connections are opened ahead of time
+        Expected: Up to the pool size concurrent HEAD requests are sent, the
+                  number of new connections of the pool is returned
+        """
+        adapter = self.client.session.get_adapter(self.server_url)
+        pool = mock.MagicMock(num_connections=1)
+        pool.pool.maxsize = 3
+        lock = threading.Lock()
+
+        def head(url, **kwargs):
+            with lock:
+                pool.num_connections += 1
+            return mock.MagicMock()
+
+        with mock.patch.object(adapter, 'get_connection_with_tls_context',
+                               return_value=pool), \
+                mock.patch.object(self.client.session, 'head',
+                                  side_effect=head) as head_mock:
+            opened = self.client.open_connections(5)
+
+        self.assertEqual(opened, 3)
+        self.assertEqual(head_mock.call_args_list,
+                         [mock.call(self.server_url,
+                                    allow_redirects=False)] * 3)
+        self.assertFalse(pool._get_conn.called)
+
+    def test_open_connections_pools(self):
+        """
+        Case: Connections are opened ahead of time by a client with traffic
+              class pools
+        Expected: Connections are opened for the session of the client and
+                  for the session of every traffic class
+        """
+        client = KeycloakClient(server_url=self.server_url,
+                                pools=TrafficPools({'auth': 2, 'admin': 1}))
+
+        with mock.patch.object(client, '_open_connections', autospec=True,
+                               return_value=1) as open_connections:
+            opened = client.open_connections(2)
+
+        self.assertEqual(opened, 3)
+        self.assertEqual(open_connections.call_args_list, [
+            mock.call(client.session, 2, self.server_url),
+            mock.call(client.pool_session('admin'), 2, self.server_url),
+            mock.call(client.pool_session('auth'), 2, self.server_url),
+        ])
+
+    @mock.patch('keycloak.client.requests', autospec=True)
+    def test_session_threads(self, request_mock):
+        """
+        Case: Many threads request the session at the same time
+        Expected: Only one session gets created
+        """
+        def create_session():
+            time.sleep(0.01)
+            return mock.MagicMock()
+
+        request_mock.Session.side_effect = create_session
+
+        sessions = run_in_threads(lambda: self.client.session)
+
+        self.assertEqual(request_mock.Session.call_count, 1)
+        self.assertEqual(len(set(map(id, sessions))), 1)
+
+    @mock.patch('keycloak.client.requests', autospec=True)
+    def test_session_per_thread(self, request_mock):
+        """
+        Case: Sessions are requested from many threads in per-thread mode
+        Expected: Every thread gets its own session, all are closed on close
+        """
+        request_mock.Session.side_effect = lambda: mock.MagicMock()
+        client = KeycloakClient(server_url=self.server_url,
+                                session_per_thread=True)
+
+        sessions = run_in_threads(lambda: (client.session, client.session))
+
+        self.assertEqual(request_mock.Session.call_count, 20)
+        for first, second in sessions:
+            self.assertIs(first, second)
+
+        client.close()
+        for session, _ in sessions:
+            session.close.assert_called_once_with()
+        self.assertEqual(client._thread_sessions, {})
+
+    @mock.patch('keycloak.client.requests', autospec=True)
+    def test_session_per_thread_ended(self, request_mock):
+        """
+        Case: Many short-lived threads use a client in per-thread mode
+        Expected: The session of a thread is closed when the thread ends,
+            sessions of running threads are kept
+        """
+        request_mock.Session.side_effect = lambda: mock.MagicMock()
+        client = KeycloakClient(server_url=self.server_url,
+                                session_per_thread=True)
+        session = client.session
+
+        sessions = []
+        for _ in range(50):
+            thread = threading.Thread(
+                target=lambda: sessions.append(client.session)
+            )
+            thread.start()
+            thread.join()
+        gc.collect()
+
+        self.assertEqual(len(sessions), 50)
+        for thread_session in sessions:
+            thread_session.close.assert_called_once_with()
+        self.assertEqual(client._sessions(), [session])
+        session.close.assert_not_called()
+
+        client.close()
+        session.close.assert_called_once_with()
+
+    @mock.patch('keycloak.client.os.getpid', autospec=True)
+    def test_session_after_fork(self, getpid_mock):
+        """
+        Case: The process gets forked after the session is created
+        Expected: The child gets a new session, the session of the parent is
+                  left untouched
+        """
+        getpid_mock.return_value = 1
+        client = KeycloakClient(server_url=self.server_url)
+        parent_session = client.session
+        parent_session.close = mock.MagicMock()
+
+        getpid_mock.return_value = 2
+        child_session = client.session
+
+        self.assertIsNot(child_session, parent_session)
+        self.assertIs(child_session, client.session)
+        client.close()
+        self.assertFalse(parent_session.close.called)
+
+    def test_pickle(self):
+        """
+        Case: Client with a session and a slow call log gets pickled
+        Expected: The unpickled client has the same settings and creates its
+                  own session
+        """
+        client = KeycloakClient(server_url=self.server_url,
+                                headers=self.headers, slow_call_threshold=1)
+        session = client.session
+
+        unpickled = pickle.loads(pickle.dumps(client))
+
+        self.assertEqual(unpickled.server_url, self.server_url)
+        self.assertEqual(unpickled.session.headers['initial'], 'header')
+        self.assertIsNot(unpickled.session, session)
+        self.assertEqual(unpickled.hooks['response'][0].threshold, 1)
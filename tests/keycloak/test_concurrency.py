@@ -0,0 +1,88 @@
+import threading
+from unittest import TestCase
+
+import mock
+
+from keycloak.concurrency import AIMDLimit, ConcurrencyLimiter
+from keycloak.pools import acquire_slot
+
+
+@mock.patch('keycloak.concurrency.clock', autospec=True, return_value=100)
+class AIMDLimitTestCase(TestCase):
+
+    def test_increase(self, clock_mock):
+        """
+        Case: Requests with a stable latency use up the limit
+        Expected: The limit grows by one per `limit` requests, but not
+            when it isn't used up
+        """
+        limit = AIMDLimit(initial=2, max_limit=3)
+        acquire_slot(limit)
+        limit.record(0.1)
+        self.assertEqual(limit.limit, 2)
+
+        acquire_slot(limit)
+        limit.record(0.1)
+        self.assertEqual(limit.limit, 2.5)
+        limit.record(0.1)
+        limit.record(0.1)
+        self.assertEqual(limit.limit, 3)
+        self.assertEqual(limit.stats()['increases'], 3)
+
+    def test_decrease(self, clock_mock):
+        """
+        Case: Requests fail or get slower than the tolerance allows
+        Expected: The limit is halved once per round trip
+        """
+        limit = AIMDLimit(initial=16)
+        limit.record(0.1)
+
+        limit.record(0.1, overloaded=True)
+        limit.record(0.1, overloaded=True)
+        self.assertEqual(limit.limit, 8)
+
+        clock_mock.return_value = 101
+        for _ in range(5):
+            limit.record(0.5)
+        self.assertEqual(limit.limit, 4)
+        self.assertEqual(limit.stats()['decreases'], 2)
+
+        for now in range(102, 110):
+            clock_mock.return_value = now
+            limit.record(0.5, overloaded=True)
+        self.assertEqual(limit.limit, 1)
+
+    def test_waiters(self, clock_mock):
+        """
+        Case: Requests wait for a slot while the limit grows
+        Expected: A waiting request gets the new slot
+        """
+        limit = AIMDLimit(initial=1)
+        acquire_slot(limit)
+        acquired = threading.Event()
+        thread = threading.Thread(
+            target=lambda: acquire_slot(limit) or acquired.set()
+        )
+        thread.start()
+        while not limit.stats()['waiting']:
+            acquired.wait(0.001)
+
+        limit.record(0.1)
+
+        self.assertTrue(acquired.wait(5))
+        thread.join()
+        self.assertEqual(limit.stats()['in_use'], 2)
+
+
+class ConcurrencyLimiterTestCase(TestCase):
+
+    def test_limit(self):
+        """
+        Case: The limit of endpoint classes is looked up
+        Expected: Only configured endpoint classes are limited
+        """
+        limiter = ConcurrencyLimiter({'admin': 8, 'uma': AIMDLimit()})
+
+        self.assertEqual(limiter.limit('admin').max_limit, 8)
+        self.assertIsNone(limiter.limit('token'))
+        self.assertEqual(sorted(limiter.stats()), ['admin', 'uma'])
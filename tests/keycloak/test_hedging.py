@@ -0,0 +1,66 @@
+import pickle
+from unittest import TestCase
+
+from keycloak.hedging import HedgePolicy
+
+
+class HedgePolicyTestCase(TestCase):
+
+    def test_fixed_delay(self):
+        """
+        Case: A policy with a fixed delay records durations
+        Expected: The delay doesn't change
+        """
+        policy = HedgePolicy(delay=0.1)
+        for _ in range(100):
+            policy.record(1)
+        self.assertEqual(policy.delay(), 0.1)
+
+    def test_percentile_delay(self):
+        """
+        Case: A policy without a fixed delay records durations
+        Expected: There is no delay until enough durations are recorded, then
+                  the delay is the percentile of the recorded durations
+        """
+        policy = HedgePolicy(percentile=90, min_samples=10)
+        for duration in range(1, 10):
+            policy.record(duration)
+        self.assertIsNone(policy.delay())
+
+        policy.record(10)
+        self.assertEqual(policy.delay(), 10)
+
+        for duration in range(11, 101):
+            policy.record(duration)
+        self.assertEqual(policy.delay(), 91)
+
+    def test_budget(self):
+        """
+        Case: Slow requests ask to be hedged
+        Expected: Hedges are allowed within the budget only
+        """
+        policy = HedgePolicy(delay=0.1, budget=0.1, burst=2)
+        policy.requested()
+        self.assertTrue(policy.acquire())
+        self.assertFalse(policy.acquire())
+
+        for _ in range(10):
+            policy.requested()
+        self.assertTrue(policy.acquire())
+        self.assertFalse(policy.acquire())
+
+        for _ in range(100):
+            policy.requested()
+        self.assertTrue(policy.acquire())
+        self.assertTrue(policy.acquire())
+        self.assertFalse(policy.acquire())
+        self.assertEqual(policy.stats()['hedged'], 4)
+
+    def test_pickle(self):
+        """
+        Case: A policy is pickled
+        Expected: The recorded durations are kept
+        """
+        policy = HedgePolicy(min_samples=1)
+        policy.record(0.5)
+        self.assertEqual(pickle.loads(pickle.dumps(policy)).delay(), 0.5)
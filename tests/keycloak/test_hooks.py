@@ -0,0 +1,62 @@
+from unittest import TestCase
+
+from keycloak.hooks import (
+    RequestInfo,
+    current_endpoint,
+    endpoint,
+    endpoint_class,
+)
+
+
+class EndpointTestCase(TestCase):
+
+    def test_endpoint(self):
+        """
+        Case: A method decorated with an endpoint name is called
+        Expected: The endpoint name is available while the method runs
+        """
+        @endpoint('admin.users.single')
+        def method():
+            return current_endpoint()
+
+        self.assertIsNone(current_endpoint())
+        self.assertEqual(method(), 'admin.users.single')
+        self.assertIsNone(current_endpoint())
+
+    def test_nested_endpoint(self):
+        """
+        Case: A decorated method calls another decorated method
+        Expected: The innermost endpoint name wins and the outer one is
+                  restored afterwards
+        """
+        @endpoint('discovery.well_known')
+        def inner():
+            return current_endpoint()
+
+        @endpoint('token.grant')
+        def outer():
+            return inner(), current_endpoint()
+
+        self.assertEqual(outer(), ('discovery.well_known', 'token.grant'))
+
+    def test_endpoint_class(self):
+        self.assertEqual(endpoint_class('admin.users.single'), 'admin')
+        self.assertEqual(endpoint_class('userinfo'), 'userinfo')
+        self.assertIsNone(endpoint_class(None))
+
+
+class RequestInfoTestCase(TestCase):
+
+    def test_finish(self):
+        """
+        Case: A request info gets finished
+        Expected: Status and duration are set
+        """
+        info = RequestInfo('GET', 'https://example.com', 'admin.users.all')
+        self.assertIsNone(info.duration)
+
+        self.assertIs(info.finish(status=200), info)
+        self.assertEqual(info.status, 200)
+        self.assertGreaterEqual(info.duration, 0)
+        self.assertEqual(info.retries, 0)
+        self.assertEqual(info.endpoint_class, 'admin')
@@ -0,0 +1,124 @@
+import json
+import pickle
+from unittest import TestCase
+
+from keycloak.lazy_json import (
+    JSONArray, JSONObject, is_json_container, json_default, lazy_json,
+)
+
+
+class LazyJSONTestCase(TestCase):
+
+    def setUp(self):
+        self.data = [
+            {'id': str(index), 'attributes': {'locale': ['en']}}
+            for index in range(5)
+        ]
+        self.content = json.dumps(self.data).encode('utf-8')
+
+    def test_is_json_container(self):
+        """
+        Case: Content is checked
+        Expected: Only JSON objects and arrays are containers
+        """
+        self.assertTrue(is_json_container(b'  {"a": 1}'))
+        self.assertTrue(is_json_container(b'\n[]'))
+        self.assertFalse(is_json_container(b'"string"'))
+        self.assertFalse(is_json_container(b''))
+
+    def test_array(self):
+        """
+        Case: Elements of a lazy array are accessed
+        Expected: Same values as the decoded data, nested values are views
+        """
+        users = lazy_json(self.content)
+
+        self.assertIsInstance(users, JSONArray)
+        self.assertEqual(users[1]['id'], '1')
+        self.assertEqual(users[-1]['id'], '4')
+        self.assertIsInstance(users[0], JSONObject)
+        self.assertIsInstance(users[0]['attributes']['locale'], JSONArray)
+        self.assertEqual(users[1:3], self.data[1:3])
+        self.assertEqual(users[::-2], self.data[::-2])
+        self.assertEqual([user['id'] for user in users],
+                         ['0', '1', '2', '3', '4'])
+        self.assertEqual(len(users), 5)
+        self.assertEqual(users, self.data)
+        with self.assertRaises(IndexError):
+            users[5]
+
+    def test_array_partial_scan(self):
+        """
+        Case: The first elements of a lazy array are read
+        Expected: The rest of the array isn't scanned
+        """
+        users = lazy_json(self.content)
+
+        self.assertEqual(users[:2], self.data[:2])
+        self.assertEqual(len(users._offsets), 2)
+
+    def test_empty_and_invalid_array(self):
+        """
+        Case: An empty and an invalid array are accessed
+        Expected: The empty array has no elements, the invalid one raises a
+                  ValueError when the invalid part is reached
+        """
+        self.assertEqual(list(lazy_json(b'[ ]')), [])
+
+        invalid = lazy_json(b'[1 2]')
+        self.assertEqual(invalid[0], 1)
+        with self.assertRaises(ValueError):
+            invalid[1]
+
+    def test_object(self):
+        """
+        Case: A lazy object is accessed
+        Expected: It's decoded once and can't be changed
+        """
+        user = lazy_json(b'{"id": "abc", "groups": ["a"]}')
+
+        self.assertIsInstance(user, JSONObject)
+        self.assertEqual(user['id'], 'abc')
+        self.assertIn('groups', user)
+        self.assertEqual(dict(user), {'id': 'abc', 'groups': ['a']})
+        with self.assertRaises(TypeError):
+            user['id'] = 'other'
+
+    def test_to_python(self):
+        """
+        Case: Views are converted to plain data
+        Expected: A copy which doesn't change the view
+        """
+        users = lazy_json(self.content)
+
+        data = users.to_python()
+        data[0]['id'] = 'changed'
+
+        self.assertEqual(data[1:], self.data[1:])
+        self.assertEqual(users[0]['id'], '0')
+        self.assertEqual(users[0].to_python(), self.data[0])
+
+    def test_json_default(self):
+        """
+        Case: Data with nested views gets serialized
+        Expected: The views are serialized as plain JSON, other unknown
+            types still raise
+        """
+        user = lazy_json(self.content)[0]
+
+        self.assertEqual(
+            json.loads(json.dumps({'user': user}, default=json_default)),
+            {'user': self.data[0]}
+        )
+        with self.assertRaises(TypeError):
+            json.dumps({'user': object()}, default=json_default)
+
+    def test_pickle(self):
+        """
+        Case: Views get pickled
+        Expected: The unpickled views contain the same data
+        """
+        users = lazy_json(self.content)
+
+        self.assertEqual(pickle.loads(pickle.dumps(users)), self.data)
+        self.assertEqual(pickle.loads(pickle.dumps(users[0])), self.data[0])
@@ -0,0 +1,226 @@
+import gc
+import pickle
+import threading
+from unittest import TestCase
+
+import mock
+
+from keycloak.cache import StaleCache
+from keycloak.client import KeycloakClient
+from keycloak.hooks import RequestInfo
+from keycloak.metrics import MetricsCollector
+
+
+class MetricsCollectorTestCase(TestCase):
+
+    def setUp(self):
+        self.client = mock.MagicMock(spec_set=KeycloakClient)
+        self.client.pool_stats.return_value = [{
+            'pool': 'https://example.com:443',
+            'maxsize': 10,
+            'in_use': 2,
+            'idle': 3,
+        }]
+        self.client.ssl_context = None
+        self.collector = MetricsCollector(buckets=[0.1, 1])
+        self.collector.instrument(self.client)
+
+    def request(self, endpoint, status=None, exception=None, duration=0.05):
+        info = RequestInfo('GET', 'https://example.com', endpoint)
+        self.collector._on_request(info)
+        info.finish(status=status, exception=exception)
+        info.duration = duration
+        if exception is None:
+            self.collector._on_response(info)
+        else:
+            self.collector._on_error(info)
+
+    def test_instrument(self):
+        """
+        Case: A client is instrumented
+        Expected: The hooks are registered on the client
+        """
+        self.assertEqual(
+            [c[0][0] for c in self.client.register_hook.call_args_list],
+            ['request', 'response', 'error']
+        )
+
+    def test_snapshot(self):
+        """
+        Case: Requests are finished
+        Expected: Counters, errors and histograms are in the snapshot
+        """
+        self.request('admin.users.single', status=200)
+        self.request('admin.users.single', status=404, duration=0.5)
+        self.request('token.grant', exception=ValueError(), duration=2)
+        self.collector._on_request(
+            RequestInfo('GET', 'https://example.com', 'token.grant')
+        )
+
+        snapshot = self.collector.snapshot()
+
+        self.assertEqual(snapshot['requests'], {'admin': 2, 'token': 1})
+        self.assertEqual(snapshot['in_flight'], {'admin': 0, 'token': 1})
+        self.assertEqual(snapshot['responses'],
+                         {'admin': {200: 1, 404: 1}})
+        self.assertEqual(snapshot['errors'], {
+            'admin': {'404': 1},
+            'token': {'ValueError': 1}
+        })
+        self.assertEqual(snapshot['latency']['admin']['buckets'],
+                         [(0.1, 1), (1, 2), (float('inf'), 2)])
+        self.assertAlmostEqual(snapshot['latency']['admin']['sum'], 0.55)
+        self.assertEqual(snapshot['latency']['token']['count'], 1)
+        self.assertEqual(snapshot['pools'],
+                         self.client.pool_stats.return_value)
+
+    def test_threads(self):
+        """
+        Case: Requests are finished from many threads
+        Expected: No updates get lost
+        """
+        def work():
+            for _ in range(500):
+                self.request('userinfo', status=200)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        snapshot = self.collector.snapshot()
+        self.assertEqual(snapshot['requests'], {'userinfo': 4000})
+        self.assertEqual(snapshot['latency']['userinfo']['count'], 4000)
+
+    def test_ended_threads(self):
+        """
+        Case: Requests are finished from threads which end one after another
+        Expected: The shards of ended threads are retired, their counters
+            stay in the snapshots
+        """
+        for _ in range(20):
+            thread = threading.Thread(
+                target=self.request, args=('userinfo',), kwargs={
+                    'status': 200, 'duration': 0.5
+                }
+            )
+            thread.start()
+            thread.join()
+            self.collector.snapshot()
+        gc.collect()
+
+        snapshot = self.collector.snapshot()
+        self.assertEqual(len(self.collector._shards), 0)
+        self.assertEqual(snapshot['requests'], {'userinfo': 20})
+        self.assertEqual(snapshot['latency']['userinfo']['buckets'],
+                         [(0.1, 0), (1, 20), (float('inf'), 20)])
+
+    def test_export_prometheus(self):
+        """
+        Case: Metrics are exported in Prometheus format
+        Expected: All metric families are present
+        """
+        self.request('admin.users.single', status=200)
+
+        export = self.collector.export_prometheus()
+
+        self.assertIn('# TYPE keycloak_requests_total counter', export)
+        self.assertIn('keycloak_requests_total{endpoint_class="admin"} 1',
+                      export)
+        self.assertIn(
+            'keycloak_request_duration_seconds_bucket'
+            '{endpoint_class="admin",le="+Inf"} 1', export
+        )
+        self.assertIn(
+            'keycloak_pool_connections'
+            '{pool="https://example.com:443",state="in_use"} 2', export
+        )
+        self.assertIn(
+            'keycloak_pool_maxsize{pool="https://example.com:443"} 10',
+            export
+        )
+
+    def test_export_prometheus_traffic_class(self):
+        """
+        Case: The client has a pool per traffic class
+        Expected: The pool metrics are labeled with the traffic class
+        """
+        self.client.pool_stats.return_value[0]['traffic_class'] = 'admin'
+
+        export = self.collector.export_prometheus()
+
+        self.assertIn(
+            'keycloak_pool_maxsize{pool="https://example.com:443",'
+            'traffic_class="admin"} 10', export
+        )
+
+    def test_tls_stats(self):
+        """
+        Case: Two clients share a TLS context, a third one has its own
+        Expected: The handshakes of every context are counted once
+        """
+        self.client.ssl_context = shared_context = object()
+        self.client.tls_stats.return_value = \
+            {'handshakes': 10, 'resumed': 9, 'full': 1}
+        for ssl_context, resumed in ((shared_context, 9), (object(), 2)):
+            client = mock.MagicMock(spec_set=KeycloakClient)
+            client.ssl_context = ssl_context
+            client.tls_stats.return_value = \
+                {'handshakes': resumed + 1, 'resumed': resumed, 'full': 1}
+            self.collector.instrument(client)
+
+        export = self.collector.export_prometheus()
+
+        self.assertEqual(self.collector.snapshot()['tls'],
+                         {'handshakes': 13, 'resumed': 11, 'full': 2})
+        self.assertIn('keycloak_tls_handshakes_total{resumed="true"} 11',
+                      export)
+        self.assertIn('keycloak_tls_handshakes_total{resumed="false"} 2',
+                      export)
+
+    def test_instrument_cache(self):
+        """
+        Case: A stale cache is instrumented
+        Expected: The staleness of its entries is exported
+        """
+        cache = mock.MagicMock(spec_set=StaleCache)
+        cache.stats.return_value = {'https://example.com/certs': {
+            'staleness': 42.5, 'served_stale': 3, 'revalidations': 0,
+            'refresh_errors': 3,
+        }}
+        self.collector.instrument_cache(cache)
+
+        export = self.collector.export_prometheus()
+
+        self.assertEqual(self.collector.snapshot()['caches'],
+                         cache.stats.return_value)
+        self.assertIn('keycloak_cache_staleness_seconds'
+                      '{key="https://example.com/certs"} 42.5', export)
+        self.assertIn('keycloak_cache_refresh_errors_total'
+                      '{key="https://example.com/certs"} 3', export)
+
+    def test_pickle(self):
+        """
+        Case: An instrumented client gets pickled
+        Expected: The unpickled client reports to an unpickled collector,
+            which starts with empty counters and knows the client
+        """
+        client = KeycloakClient(server_url='https://example.com')
+        collector = MetricsCollector()
+        collector.instrument(client)
+        collector._on_request(
+            RequestInfo('GET', 'https://example.com', 'token.grant')
+        )
+
+        unpickled = pickle.loads(pickle.dumps(client))
+
+        hook = unpickled.hooks['request'][-1]
+        self.assertIsInstance(hook.__self__, MetricsCollector)
+        self.assertIsNot(hook.__self__, collector)
+        self.assertEqual(hook.__self__.snapshot()['in_flight'], {})
+        self.assertEqual(list(hook.__self__._clients), [unpickled])
+        hook(RequestInfo('GET', 'https://example.com', 'token.grant'))
+        self.assertEqual(hook.__self__.snapshot()['in_flight'],
+                         {'token': 1})
+        self.assertEqual(collector.snapshot()['in_flight'], {'token': 1})
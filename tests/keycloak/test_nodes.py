@@ -0,0 +1,83 @@
+import pickle
+from unittest import TestCase
+
+import mock
+
+from keycloak.nodes import NodeSet, server_urls
+
+
+class NodeSetTestCase(TestCase):
+
+    def setUp(self):
+        self.nodes = NodeSet(['https://a.example.com/',
+                              'https://b.example.com'], cooldown=10,
+                             max_cooldown=30)
+        self.a, self.b = self.nodes.nodes
+
+    def test_server_urls(self):
+        """
+        Case: Server URLs are given as a string or list
+        Expected: A tuple of URLs is returned
+        """
+        self.assertEqual(server_urls('https://a'), ('https://a',))
+        self.assertEqual(server_urls(['https://a', 'https://b']),
+                         ('https://a', 'https://b'))
+        with self.assertRaises(ValueError):
+            server_urls([])
+
+    def test_match_and_rewrite(self):
+        """
+        Case: URLs are matched with the nodes and rewritten to another node
+        Expected: Only URLs on a node match, the path is kept
+        """
+        url = 'https://a.example.com/auth/realms/x?a=b'
+        self.assertIs(self.nodes.match(url), self.a)
+        self.assertIs(self.nodes.match('https://b.example.com'), self.b)
+        self.assertIsNone(self.nodes.match('https://b.example.com.evil/'))
+        self.assertIsNone(self.nodes.match('https://c.example.com/auth'))
+        self.assertEqual(self.nodes.rewrite(url, self.a, self.b),
+                         'https://b.example.com/auth/realms/x?a=b')
+        self.assertEqual(self.nodes.rewrite(url, self.a, self.a), url)
+
+    def test_candidates(self):
+        """
+        Case: Latencies are measured and a node fails
+        Expected: Healthy nodes are ordered from fast to slow, failed nodes
+                  come last until their cool-down is over
+        """
+        self.assertEqual(self.nodes.candidates(), [self.a, self.b])
+
+        self.nodes.succeeded(self.a, 0.2)
+        self.nodes.succeeded(self.b, 0.1)
+        self.assertEqual(self.nodes.candidates(), [self.b, self.a])
+
+        # The moving average follows new measurements
+        self.nodes.succeeded(self.b, 0.5)
+        self.assertAlmostEqual(self.b.latency, 0.22)
+        self.assertEqual(self.nodes.candidates(), [self.a, self.b])
+
+        with mock.patch('keycloak.nodes.clock', return_value=100):
+            self.nodes.failed(self.a)
+            self.assertEqual(self.a.down_until, 110)
+            self.nodes.failed(self.a)
+            self.assertEqual(self.a.down_until, 120)
+            self.nodes.failed(self.a)
+            self.assertEqual(self.a.down_until, 130)
+            self.assertEqual(self.nodes.candidates(), [self.b, self.a])
+            self.assertEqual([node['healthy'] for node in self.nodes.stats()],
+                             [False, True])
+
+        with mock.patch('keycloak.nodes.clock', return_value=130):
+            self.assertEqual(self.nodes.candidates(), [self.a, self.b])
+
+        self.nodes.succeeded(self.a, 0.2)
+        self.assertEqual(self.a.failures, 0)
+
+    def test_pickle(self):
+        """
+        Case: A node set is pickled
+        Expected: The measurements are kept
+        """
+        self.nodes.succeeded(self.b, 0.1)
+        unpickled = pickle.loads(pickle.dumps(self.nodes))
+        self.assertEqual(unpickled.stats(), self.nodes.stats())
@@ -1,16 +1,22 @@
+import json
+import time
 from unittest import TestCase
 
 import mock
+from jose import jwt
 
+from keycloak.cache import MemoryCache
 from keycloak.openid_connect import KeycloakOpenidConnect
 from keycloak.realm import KeycloakRealm
 from keycloak.well_known import KeycloakWellKnown
+from tests.keycloak.test_client import run_in_threads
 
 
 class KeycloakOpenidConnectTestCase(TestCase):
 
     def setUp(self):
         self.realm = mock.MagicMock(spec_set=KeycloakRealm)
+        self.realm.cache = None
         self.client_id = 'client-id'
         self.client_secret = 'client-secret'
 
@@ -37,12 +43,35 @@ class KeycloakOpenidConnectTestCase(TestCase):
         self.assertIsInstance(well_known, KeycloakWellKnown)
         self.assertEqual(well_known, self.openid_client.well_known)
 
-    @mock.patch('keycloak.openid_connect.jwt')
-    def test_decode_token(self, patched_jwt):
+    def test_well_known_threads(self):
+        """
+        Case: Many threads use the .well-known at the same time
+        Expected: It's fetched only once
+        """
+        def get(url):
+            time.sleep(0.01)
+            return {'token_endpoint': 'https://token'}
+
+        self.realm.client.get.side_effect = get
+        openid_client = KeycloakOpenidConnect(
+            realm=self.realm,
+            client_id=self.client_id,
+            client_secret=self.client_secret
+        )
+
+        urls = run_in_threads(
+            lambda: openid_client.get_url('token_endpoint')
+        )
+
+        self.assertEqual(urls, ['https://token'] * 20)
+        self.assertEqual(self.realm.client.get.call_count, 1)
+
+    @mock.patch('jose.jwt.decode')
+    def test_decode_token(self, patched_decode):
         self.openid_client.decode_token(token='test-token', key='test-key')
-        patched_jwt.decode.assert_called_once_with('test-token', 'test-key',
-                                                   algorithms=['RS256'],
-                                                   audience=self.client_id)
+        patched_decode.assert_called_once_with('test-token', 'test-key',
+                                               algorithms=['RS256'],
+                                               audience=self.client_id)
 
     def test_logout(self):
         result = self.openid_client.logout(refresh_token='refresh-token')
@@ -62,6 +91,46 @@ class KeycloakOpenidConnectTestCase(TestCase):
 
         self.assertEqual(result, self.realm.client.get.return_value)
 
+    def test_certs_cached(self):
+        """
+        Case: Certs are requested twice from a realm with a cache
+        Expected: They are only fetched once
+        """
+        self.realm.cache = MemoryCache()
+        self.realm.client.get.return_value = {'keys': []}
+
+        self.assertEqual(self.openid_client.certs(), {'keys': []})
+        self.assertEqual(self.openid_client.certs(), {'keys': []})
+
+        self.realm.client.get.assert_called_once_with('https://certs')
+
+    def test_well_known_cached(self):
+        """
+        Case: The .well-known of a realm with a cache expires
+        Expected: It's fetched again on the next access
+        """
+        self.realm.cache = cache = MemoryCache()
+        self.realm.client.get.side_effect = [
+            {'token_endpoint': 'https://token'},
+            {'token_endpoint': 'https://new-token'},
+        ]
+        openid_client = KeycloakOpenidConnect(
+            realm=self.realm,
+            client_id=self.client_id,
+            client_secret=self.client_secret
+        )
+
+        self.assertEqual(openid_client.get_url('token_endpoint'),
+                         'https://token')
+        self.assertEqual(openid_client.get_url('token_endpoint'),
+                         'https://token')
+        self.assertEqual(self.realm.client.get.call_count, 1)
+
+        cache.clear()
+        self.assertEqual(openid_client.get_url('token_endpoint'),
+                         'https://new-token')
+        self.assertEqual(self.realm.client.get.call_count, 2)
+
     def test_userinfo(self):
         result = self.openid_client.userinfo(token='token')
         self.realm.client.get.assert_called_once_with(
@@ -151,3 +220,38 @@ class KeycloakOpenidConnectTestCase(TestCase):
             }
         )
         self.assertEqual(response, self.realm.client.post.return_value)
+
+    def test_decode_token_lazy_json(self):
+        """
+        Case: A token gets decoded with the JWKS of a realm whose client
+              returns lazy JSON views
+        Expected: The .well-known and the JWKS are plain data which
+                  python-jose accepts and the token gets decoded
+        """
+        key = {'kty': 'oct', 'kid': 'key-id', 'alg': 'HS256',
+               'k': 'c2VjcmV0LWtleS1vZi10aGUtcmVhbG0'}
+        documents = {
+            'https://example.com/auth/realms/realm-name/.well-known/'
+            'openid-configuration': {'jwks_uri': 'https://example.com/certs'},
+            'https://example.com/certs': {'keys': [key]},
+        }
+
+        def get(url, **kwargs):
+            response = mock.MagicMock(status_code=200, headers={})
+            response.content = json.dumps(documents[url]).encode('utf-8')
+            response.json.return_value = documents[url]
+            return response
+
+        realm = KeycloakRealm(server_url='https://example.com',
+                              realm_name='realm-name', lazy_json=True)
+        realm.client._session = mock.MagicMock()
+        realm.client._session.get.side_effect = get
+        openid_client = realm.open_id_connect(client_id=self.client_id,
+                                              client_secret=None)
+        token = jwt.encode({'sub': 'user-id'}, key, algorithm='HS256',
+                           headers={'kid': 'key-id'})
+
+        claims = openid_client.decode_token(token, key=openid_client.certs(),
+                                            algorithms=['HS256'])
+
+        self.assertEqual(claims, {'sub': 'user-id'})
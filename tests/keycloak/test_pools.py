@@ -0,0 +1,98 @@
+import pickle
+import threading
+import time
+from unittest import TestCase
+
+from keycloak.exceptions import PoolExhausted
+from keycloak.pools import PoolLimits, TrafficPools
+
+
+class TrafficPoolsTestCase(TestCase):
+
+    def setUp(self):
+        self.pools = TrafficPools({
+            'auth': 2,
+            'admin': PoolLimits(maxsize=1, max_waiting=1, timeout=0.2),
+        })
+
+    def test_traffic_class(self):
+        """
+        Case: The traffic class of endpoint classes is looked up
+        Expected: Only classes with a pool have one
+        """
+        self.assertEqual(self.pools.traffic_class('token'), 'auth')
+        self.assertEqual(self.pools.traffic_class('admin'), 'admin')
+        self.assertIsNone(self.pools.traffic_class('uma'))
+        self.assertIsNone(self.pools.traffic_class(None))
+        self.assertEqual(self.pools.names(), ['admin', 'auth'])
+
+    def test_acquire(self):
+        """
+        Case: More requests than the size of a pool are sent
+        Expected: The next request waits until a slot is released, other
+            pools are not affected
+        """
+        self.pools.acquire('admin')
+        self.pools.acquire('auth')
+        self.pools.acquire('auth')
+
+        acquired = threading.Event()
+        pools = TrafficPools({'admin': 1})
+        pools.acquire('admin')
+        thread = threading.Thread(
+            target=lambda: pools.acquire('admin') or acquired.set()
+        )
+        thread.start()
+        self.assertFalse(acquired.wait(0.05))
+        self.assertEqual(pools.stats()['admin']['waiting'], 1)
+
+        pools.release('admin')
+        self.assertTrue(acquired.wait(5))
+        thread.join()
+        self.assertEqual(pools.stats()['admin'], {
+            'maxsize': 1, 'in_use': 1, 'waiting': 0, 'requests': 2,
+            'queued': 1, 'rejected': 0, 'timeouts': 0,
+        })
+
+    def test_limits(self):
+        """
+        Case: Requests wait longer than the timeout or too many requests
+            are waiting
+        Expected: PoolExhausted is raised
+        """
+        self.pools.acquire('admin')
+        with self.assertRaises(PoolExhausted):
+            self.pools.acquire('admin')
+
+        errors = []
+
+        def wait():
+            try:
+                self.pools.acquire('admin')
+            except PoolExhausted as exc:
+                errors.append(exc)
+
+        thread = threading.Thread(target=wait)
+        thread.start()
+        while not self.pools.stats()['admin']['waiting']:
+            time.sleep(0.001)
+        with self.assertRaises(PoolExhausted):
+            self.pools.acquire('admin')
+        thread.join()
+
+        self.assertEqual(len(errors), 1)
+        stats = self.pools.stats()['admin']
+        self.assertEqual((stats['timeouts'], stats['rejected']), (2, 1))
+
+    def test_pickle(self):
+        """
+        Case: Pools get pickled
+        Expected: The limits are kept, the slots are free
+        """
+        self.pools.acquire('admin')
+
+        pools = pickle.loads(pickle.dumps(self.pools))
+
+        self.assertEqual(pools.limits('admin').max_waiting, 1)
+        self.assertEqual(pools.stats()['admin']['in_use'], 0)
+        pools.acquire('admin')
@@ -0,0 +1,72 @@
+import pickle
+from unittest import TestCase
+
+import mock
+
+from keycloak.rate_limit import RateLimiter, TokenBucket
+
+
+class TokenBucketTestCase(TestCase):
+
+    @mock.patch('keycloak.rate_limit.clock', autospec=True)
+    def test_reserve(self, clock_mock):
+        """
+        Case: Tokens are reserved faster than the rate
+        Expected: The burst is served immediately, next reservations wait
+                  for their turn
+        """
+        clock_mock.return_value = 100
+        bucket = TokenBucket(rate=2, burst=2)
+
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0.5)
+        self.assertEqual(bucket.reserve(), 1)
+
+        clock_mock.return_value = 101
+        self.assertEqual(bucket.reserve(), 0.5)
+
+        # The bucket never fills up beyond the burst
+        clock_mock.return_value = 200
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0.5)
+
+
+class RateLimiterTestCase(TestCase):
+
+    def setUp(self):
+        self.limiter = RateLimiter({
+            'admin': 1,
+            'token': (10, 20),
+            'userinfo': TokenBucket(5),
+        })
+
+    def test_reserve(self):
+        """
+        Case: Tokens are reserved for several endpoint classes
+        Expected: Only the configured classes are limited and the waits are
+                  counted
+        """
+        self.assertEqual(self.limiter.reserve('admin'), 0)
+        self.assertGreater(self.limiter.reserve('admin'), 0.9)
+        for _ in range(20):
+            self.assertEqual(self.limiter.reserve('token'), 0)
+        self.assertEqual(self.limiter.reserve('authz'), 0)
+
+        stats = self.limiter.stats()
+        self.assertEqual(stats['admin']['requests'], 2)
+        self.assertEqual(stats['admin']['delayed'], 1)
+        self.assertGreater(stats['admin']['waited'], 0.9)
+        self.assertEqual(stats['token'], {'requests': 20, 'delayed': 0,
+                                          'waited': 0})
+        self.assertNotIn('authz', stats)
+
+    def test_pickle(self):
+        """
+        Case: A rate limiter is pickled
+        Expected: The limits are kept
+        """
+        unpickled = pickle.loads(pickle.dumps(self.limiter))
+        self.assertEqual(unpickled._buckets['token'].burst, 20)
+        self.assertEqual(unpickled.reserve('admin'), 0)
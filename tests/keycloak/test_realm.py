@@ -1,13 +1,24 @@
+import os
+import pickle
+import subprocess
+import sys
+import time
 from unittest import TestCase
 
+from requests import ConnectionError
+
 import mock
 
 from keycloak.admin import KeycloakAdmin
 from keycloak.authz import KeycloakAuthz
+from keycloak.cache import MemoryCache
 from keycloak.client import KeycloakClient
 from keycloak.openid_connect import KeycloakOpenidConnect
+from keycloak.pools import TrafficPools
 from keycloak.realm import KeycloakRealm
+from keycloak.tls import create_ssl_context
 from keycloak.uma import KeycloakUMA
+from tests.keycloak.test_client import run_in_threads
 
 
 class KeycloakRealmTestCase(TestCase):
@@ -16,6 +27,23 @@ class KeycloakRealmTestCase(TestCase):
         self.realm = KeycloakRealm('https://example.com', 'some-realm',
                                    headers={'some': 'header'})
 
+    def test_lazy_imports(self):
+        """
+        Case: The realm module is imported
+        Expected: The API modules and python-jose are only imported when
+            they are used
+        """
+        code = ('import sys, keycloak.realm; print(" ".join(sorted(name for '
+                'name in sys.modules if name.split(".")[0] == "jose" or name '
+                'in ("keycloak.admin", "keycloak.authz", "keycloak.uma", '
+                '"keycloak.uma1", "keycloak.openid_connect"))))')
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+
+        output = subprocess.check_output([sys.executable, '-c', code],
+                                         env=env)
+
+        self.assertEqual(output.strip(), b'')
+
     def test_instance(self):
         """
         Case: Realm is instantiated
@@ -39,7 +67,167 @@ class KeycloakRealmTestCase(TestCase):
         mocked_client.assert_called_once_with(server_url='https://example.com',
                                               headers={'some': 'header'})
 
-    @mock.patch('keycloak.realm.KeycloakOpenidConnect', autospec=True)
+    @mock.patch('keycloak.realm.KeycloakClient', autospec=True)
+    def test_client_base_path(self, mocked_client):
+        """
+        Case: Client of a server with an unknown base path gets requested
+        Expected: The base path is detected with the realm, a failed
+            detection is logged and the client returned anyway
+        """
+        mocked_client.return_value.base_path = None
+        mocked_client.return_value.logger = mock.MagicMock()
+        mocked_client.return_value.detect_base_path.side_effect = \
+            ConnectionError()
+
+        client = self.realm.client
+
+        client.detect_base_path.assert_called_once_with('some-realm')
+        self.assertTrue(client.logger.warning.called)
+
+    def test_pickle(self):
+        """
+        Case: Realm with a cached .well-known gets pickled
+        Expected: Settings and the .well-known contents are kept, the client
+                  gets a new session
+        """
+        session = self.realm.client.session
+        openid_connect = self.realm.open_id_connect('client', 'secret')
+        openid_connect.well_known.contents = {'issuer': 'https://example.com'}
+
+        unpickled = pickle.loads(pickle.dumps(openid_connect))
+
+        self.assertEqual(unpickled.well_known['issuer'], 'https://example.com')
+        self.assertEqual(unpickled._realm.realm_name, 'some-realm')
+        self.assertIsNot(unpickled._realm.client.session, session)
+
+    def test_pickle_ssl_context(self):
+        """
+        Case: Realm with a TLS context and a client gets pickled
+        Expected: The TLS context is dropped, the other client parameters
+                  are kept and the unpickled realm creates a client
+        """
+        realm = KeycloakRealm('https://example.com', 'some-realm',
+                              ssl_context=create_ssl_context(),
+                              lazy_json=True)
+        self.assertIsNotNone(realm.client.ssl_context)
+
+        unpickled = pickle.loads(pickle.dumps(realm))
+
+        self.assertEqual(unpickled._client_params, {'lazy_json': True})
+        self.assertIsNone(unpickled.client.ssl_context)
+        unpickled._client = None
+        self.assertIsNone(unpickled.client.ssl_context)
+        self.assertIsNotNone(realm.client.ssl_context)
+
+    @mock.patch('keycloak.realm.KeycloakClient', autospec=True)
+    def test_client_threads(self, mocked_client):
+        """
+        Case: Many threads request the client at the same time
+        Expected: Only one client gets created
+        """
+        def create_client(**kwargs):
+            time.sleep(0.01)
+            return mock.MagicMock()
+
+        mocked_client.side_effect = create_client
+
+        clients = run_in_threads(lambda: self.realm.client)
+
+        self.assertEqual(mocked_client.call_count, 1)
+        self.assertEqual(len(set(map(id, clients))), 1)
+
+    @mock.patch('keycloak.realm.KeycloakClient', autospec=True)
+    def test_client_params(self, mocked_client):
+        """
+        Case: Realm is created with extra client parameters
+        Expected: They are passed to the client
+        """
+        realm = KeycloakRealm('https://example.com', 'some-realm',
+                              slow_call_threshold=1.5)
+        realm.client
+
+        mocked_client.assert_called_once_with(server_url='https://example.com',
+                                              headers=None,
+                                              slow_call_threshold=1.5)
+
+    def test_warmup(self):
+        """
+        Case: Realm gets warmed up
+        Expected: The .well-known documents and the JWKS are fetched and
+                  cached, connections are opened
+        """
+        documents = {
+            'https://example.com/auth/realms/some-realm/.well-known/'
+            'openid-configuration': {'jwks_uri': 'https://example.com/certs'},
+            'https://example.com/auth/realms/some-realm/.well-known/'
+            'uma2-configuration': {'issuer': 'https://example.com'},
+            'https://example.com/certs': {'keys': []},
+        }
+        client = mock.MagicMock(spec_set=KeycloakClient)
+        client.get_full_url.side_effect = \
+            lambda path: 'https://example.com/' + path
+        client.get.side_effect = documents.__getitem__
+        client.open_connections.return_value = 3
+        realm = KeycloakRealm('https://example.com', 'some-realm',
+                              client=client)
+
+        result = realm.warmup(connections=3, cache=MemoryCache())
+
+        self.assertEqual(result, {
+            'openid_configuration': {'jwks_uri': 'https://example.com/certs'},
+            'uma2_configuration': {'issuer': 'https://example.com'},
+            'jwks': {'keys': []},
+            'connections': 3,
+        })
+        client.open_connections.assert_called_once_with(3)
+        self.assertIsInstance(realm.cache, MemoryCache)
+        self.assertEqual(realm.cache.get('https://example.com/certs'),
+                         {'keys': []})
+
+        openid_connect = realm.open_id_connect('client', 'secret')
+        self.assertEqual(openid_connect.certs(), {'keys': []})
+        self.assertEqual(client.get.call_count, 3)
+
+    def test_warmup_without_cache(self):
+        """
+        Case: Realm without a cache gets warmed up
+        Expected: The documents are fetched, no cache is created
+        """
+        client = mock.MagicMock(spec_set=KeycloakClient)
+        client.get.return_value = {'jwks_uri': 'https://example.com/certs'}
+        realm = KeycloakRealm('https://example.com', 'some-realm',
+                              client=client)
+
+        result = realm.warmup()
+
+        self.assertEqual(result['jwks'],
+                         {'jwks_uri': 'https://example.com/certs'})
+        self.assertIsNone(realm.cache)
+
+    def test_warmup_pools(self):
+        """
+        Case: Realm with traffic class pools gets warmed up
+        Expected: Connections are opened in the pool of the auth traffic
+                  class too, which the token and userinfo calls use
+        """
+        client = KeycloakClient('https://example.com',
+                                pools=TrafficPools({'auth': 2}))
+        realm = KeycloakRealm('https://example.com', 'some-realm',
+                              client=client)
+
+        with mock.patch.object(client, 'get', autospec=True,
+                               return_value={'jwks_uri': 'https://e.com'}), \
+                mock.patch.object(client, '_open_connections', autospec=True,
+                                  return_value=2) as open_connections:
+            result = realm.warmup(connections=2)
+
+        self.assertEqual(result['connections'], 4)
+        self.assertEqual(
+            [call[0][0] for call in open_connections.call_args_list],
+            [client.session, client.pool_session('auth')]
+        )
+
+    @mock.patch('keycloak.openid_connect.KeycloakOpenidConnect', autospec=True)
     def test_openid_connect(self, mocked_openid_client):
         """
         Case: OpenID client get requested
@@ -58,7 +246,7 @@ class KeycloakRealmTestCase(TestCase):
             client_secret='client-secret'
         )
 
-    @mock.patch('keycloak.realm.KeycloakAdmin', autospec=True)
+    @mock.patch('keycloak.admin.KeycloakAdmin', autospec=True)
     def test_admin(self, mocked_admin_client):
         """
         Case: Admin client get requested
@@ -68,7 +256,7 @@ class KeycloakRealmTestCase(TestCase):
         self.assertIsInstance(admin_client, KeycloakAdmin)
         mocked_admin_client.assert_called_once_with(realm=self.realm)
 
-    @mock.patch('keycloak.realm.KeycloakAuthz', autospec=True)
+    @mock.patch('keycloak.authz.KeycloakAuthz', autospec=True)
     def test_authz(self, mocked_authz_client):
         """
         Case: Authz client get requested
@@ -80,7 +268,7 @@ class KeycloakRealmTestCase(TestCase):
         mocked_authz_client.assert_called_once_with(realm=self.realm,
                                                     client_id='client-id')
 
-    @mock.patch('keycloak.realm.KeycloakUMA', autospec=True)
+    @mock.patch('keycloak.uma.KeycloakUMA', autospec=True)
     def test_uma(self, mocked_uma_client):
         """
         Case: UMA client get requested
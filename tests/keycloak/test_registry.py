@@ -0,0 +1,90 @@
+from unittest import TestCase
+
+import mock
+
+from keycloak.realm import KeycloakRealm
+from keycloak.registry import KeycloakRealmRegistry
+
+
+class KeycloakRealmRegistryTestCase(TestCase):
+
+    def setUp(self):
+        self.client_patcher = mock.patch.object(
+            KeycloakRealmRegistry, 'client_class', autospec=True,
+        )
+        self.client_class = self.client_patcher.start()
+        self.client_class.side_effect = lambda **kwargs: mock.MagicMock()
+        self.addCleanup(self.client_patcher.stop)
+
+        self.registry = KeycloakRealmRegistry(max_realms=2,
+                                              headers={'some': 'header'},
+                                              slow_call_threshold=1)
+
+    def test_get(self):
+        """
+        Case: Realms are requested
+        Expected: The same realm is returned for the same key and all realms
+                  on one server share a client
+        """
+        realm = self.registry.get('https://example.com', 'realm-a')
+        other_realm = self.registry.get('https://example.com', 'realm-b')
+
+        self.assertIsInstance(realm, KeycloakRealm)
+        self.assertEqual(realm.realm_name, 'realm-a')
+        self.assertIs(realm,
+                      self.registry.get('https://example.com', 'realm-a'))
+        self.assertIs(realm.client, other_realm.client)
+        self.client_class.assert_called_once_with(
+            server_url='https://example.com',
+            headers={'some': 'header'},
+            slow_call_threshold=1
+        )
+
+    def test_shared_client_not_closed_by_realm(self):
+        """
+        Case: A realm of the registry gets closed
+        Expected: The shared client stays open
+        """
+        realm = self.registry.get('https://example.com', 'realm-a')
+        realm.close()
+
+        self.assertFalse(realm.client.close.called)
+
+    def test_evict(self):
+        """
+        Case: More realms than allowed are requested
+        Expected: The least recently used realm is evicted, the client of a
+                  server without realms stays open for the evicted realm
+                  and is shared with the next realm of the server until the
+                  registry is closed
+        """
+        realm_a = self.registry.get('https://a.example.com', 'realm-a')
+        realm_b = self.registry.get('https://b.example.com', 'realm-b')
+        self.registry.get('https://a.example.com', 'realm-a')
+        self.registry.get('https://a.example.com', 'realm-c')
+
+        self.assertEqual(len(self.registry), 2)
+        self.assertIn(('https://a.example.com', 'realm-a'), self.registry)
+        self.assertNotIn(('https://b.example.com', 'realm-b'), self.registry)
+        self.assertFalse(realm_b.client.close.called)
+        self.assertFalse(realm_a.client.close.called)
+
+        realm_b.client.get('https://b.example.com/users')
+        other_realm_b = self.registry.get('https://b.example.com', 'realm-b')
+        self.assertIsNot(other_realm_b, realm_b)
+        self.assertIs(other_realm_b.client, realm_b.client)
+
+        self.registry.close()
+        realm_a.client.close.assert_called_once_with()
+        realm_b.client.close.assert_called_once_with()
+
+    def test_close(self):
+        """
+        Case: Registry gets closed
+        Expected: All shared clients are closed
+        """
+        with self.registry:
+            realm = self.registry.get('https://example.com', 'realm-a')
+
+        realm.client.close.assert_called_once_with()
+        self.assertEqual(len(self.registry), 0)
@@ -0,0 +1,72 @@
+from unittest import TestCase
+
+import mock
+
+from keycloak.hooks import RequestInfo
+from keycloak.slow_calls import SlowCallLog, get_call_site
+
+
+class SlowCallLogTestCase(TestCase):
+
+    def setUp(self):
+        self.logger = mock.MagicMock()
+        self.slow_call_log = SlowCallLog(threshold=1, logger=self.logger,
+                                         interval=60)
+
+    def call(self, duration, endpoint='admin.users.single'):
+        info = RequestInfo('GET', 'https://example.com', endpoint)
+        info.finish(status=200)
+        info.duration = duration
+        info.response_size = 42
+        self.slow_call_log(info)
+
+    def test_fast_call(self):
+        """
+        Case: A call is faster than the threshold
+        Expected: Nothing is logged
+        """
+        self.call(duration=0.5)
+        self.assertFalse(self.logger.warning.called)
+
+    def test_slow_call(self):
+        """
+        Case: A call is slower than the threshold
+        Expected: One structured record with timings, size and call site
+        """
+        self.call(duration=1.5)
+
+        self.assertEqual(self.logger.warning.call_count, 1)
+        record = self.logger.warning.call_args[1]['extra'][
+            'keycloak_slow_call']
+        self.assertEqual(record['endpoint'], 'admin.users.single')
+        self.assertEqual(record['duration'], 1.5)
+        self.assertEqual(record['response_size'], 42)
+        self.assertEqual(record['suppressed'], 0)
+        self.assertIn(__file__.rstrip('c'), record['call_site'])
+
+    @mock.patch('keycloak.slow_calls.clock')
+    def test_sampling(self, clock_mock):
+        """
+        Case: Many slow calls to the same endpoint
+        Expected: One record per interval with the number of suppressed calls
+        """
+        clock_mock.return_value = 100
+        for _ in range(5):
+            self.call(duration=2)
+        self.call(duration=2, endpoint='token.grant')
+        self.assertEqual(self.logger.warning.call_count, 2)
+
+        clock_mock.return_value = 161
+        self.call(duration=2)
+
+        self.assertEqual(self.logger.warning.call_count, 3)
+        record = self.logger.warning.call_args[1]['extra'][
+            'keycloak_slow_call']
+        self.assertEqual(record['suppressed'], 4)
+
+    def test_get_call_site(self):
+        """
+        Case: Call site is requested from outside the library
+        Expected: The calling frame is returned
+        """
+        self.assertIn('in test_get_call_site', get_call_site())
@@ -0,0 +1,165 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import mock
+
+from keycloak.cache import MemoryCache
+from keycloak.client import KeycloakClient
+from keycloak.realm import KeycloakRealm
+from keycloak.snapshot import Snapshot, main
+
+OPENID_URL = 'https://example.com/auth/realms/some-realm/.well-known/' \
+             'openid-configuration'
+UMA2_URL = 'https://example.com/auth/realms/some-realm/.well-known/' \
+           'uma2-configuration'
+JWKS_URL = 'https://example.com/certs'
+
+
+class SnapshotTestCase(TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'snapshot.json')
+
+        self.documents = {
+            OPENID_URL: {'jwks_uri': JWKS_URL},
+            UMA2_URL: {'issuer': 'https://example.com'},
+            JWKS_URL: {'keys': [{'kid': 'a'}]},
+        }
+        self.client = mock.MagicMock(spec_set=KeycloakClient)
+        self.client.get_full_url.side_effect = \
+            lambda path: 'https://example.com/' + path
+        self.client.get.side_effect = \
+            lambda url: self.documents[url]
+        self.client.open_connections.return_value = 0
+        self.realm = KeycloakRealm('https://example.com', 'some-realm',
+                                   client=self.client)
+
+    def test_export_and_load(self):
+        """
+        Case: A snapshot is exported and loaded without revalidation
+        Expected: The documents are served from the cache of the realm
+        """
+        self.realm.export_snapshot(self.path)
+        with open(self.path) as snapshot_file:
+            self.assertEqual(json.load(snapshot_file)['version'], 1)
+
+        self.client.get.reset_mock()
+        realm = KeycloakRealm('https://example.com', 'some-realm',
+                              client=self.client)
+        realm.load_snapshot(self.path, revalidate=False)
+
+        openid_connect = realm.open_id_connect('client', 'secret')
+        self.assertEqual(openid_connect.certs(), {'keys': [{'kid': 'a'}]})
+        self.assertEqual(realm.uma2.well_known['issuer'],
+                         'https://example.com')
+        self.assertFalse(self.client.get.called)
+
+    @mock.patch('keycloak.client.KeycloakClient._request', autospec=True)
+    def test_load_detected_base_path(self, request_mock):
+        """
+        Case: A snapshot of a server without base path is loaded by a realm
+              which detects the base path
+        Expected: The client gets the base path of the snapshot without
+                  probing, the documents are served from the cache of the
+                  realm
+        """
+        documents = {
+            'openid_configuration': {'jwks_uri': JWKS_URL},
+            'uma2_configuration': {'issuer': 'https://example.com'},
+            'jwks': {'keys': [{'kid': 'a'}]},
+        }
+        Snapshot('https://example.com', 'some-realm', dict(
+            (name, {'url': url, 'document': documents[name]})
+            for name, url in (
+                ('openid_configuration', OPENID_URL.replace('/auth', '')),
+                ('uma2_configuration', UMA2_URL.replace('/auth', '')),
+                ('jwks', JWKS_URL),
+            )
+        )).dump(self.path)
+
+        realm = KeycloakRealm('https://example.com', 'some-realm',
+                              base_path=None)
+        self.addCleanup(realm.close)
+        snapshot = realm.load_snapshot(self.path, revalidate=False)
+
+        self.assertEqual(snapshot.base_path, '')
+        self.assertEqual(realm.client.base_path, '')
+        openid_connect = realm.open_id_connect('client', 'secret')
+        self.assertEqual(openid_connect.certs(), {'keys': [{'kid': 'a'}]})
+        self.assertEqual(realm.uma2.well_known['issuer'],
+                         'https://example.com')
+        self.assertFalse(request_mock.called)
+
+    def test_load_errors(self):
+        """
+        Case: A snapshot of another realm or with another version is loaded
+        Expected: ValueError is raised
+        """
+        self.realm.export_snapshot(self.path)
+
+        other_realm = KeycloakRealm('https://example.com', 'other-realm',
+                                    client=self.client)
+        with self.assertRaises(ValueError):
+            other_realm.load_snapshot(self.path)
+
+        with open(self.path) as snapshot_file:
+            data = json.load(snapshot_file)
+        data['version'] = 2
+        with open(self.path, 'w') as snapshot_file:
+            json.dump(data, snapshot_file)
+
+        with self.assertRaises(ValueError):
+            Snapshot.load(self.path)
+
+    @mock.patch('keycloak.snapshot.time.sleep', autospec=True)
+    def test_revalidate(self, sleep_mock):
+        """
+        Case: A loaded snapshot is revalidated while Keycloak is unreachable
+              for the first attempt
+        Expected: The snapshot documents are kept until fresh ones are
+                  fetched
+        """
+        snapshot = self.realm.export_snapshot(self.path)
+        self.realm.cache = MemoryCache()
+        self.documents[JWKS_URL] = {'keys': [{'kid': 'b'}]}
+        responses = [IOError('unreachable')]
+
+        def get(url):
+            if responses:
+                raise responses.pop()
+            return self.documents[url]
+
+        self.client.get.side_effect = get
+
+        def check_stale(seconds):
+            self.assertEqual(self.realm.cache.get(JWKS_URL),
+                             {'keys': [{'kid': 'a'}]})
+
+        sleep_mock.side_effect = check_stale
+
+        snapshot.revalidate(self.realm, retry_interval=5)
+
+        sleep_mock.assert_called_once_with(5)
+        self.assertTrue(snapshot.revalidated.is_set())
+        self.assertEqual(self.realm.cache.get(JWKS_URL),
+                         {'keys': [{'kid': 'b'}]})
+
+    @mock.patch('keycloak.realm.KeycloakClient', autospec=True)
+    def test_main(self, client_mock):
+        """
+        Case: A snapshot is exported from the command line
+        Expected: The snapshot is written
+        """
+        client_mock.return_value = self.client
+
+        main(['https://example.com', 'some-realm', self.path])
+
+        snapshot = Snapshot.load(self.path)
+        self.assertEqual(snapshot.documents['jwks'],
+                         {'url': JWKS_URL,
+                          'document': {'keys': [{'kid': 'a'}]}})
@@ -0,0 +1,113 @@
+import ssl
+import time
+from unittest import TestCase, skipIf
+
+import mock
+
+from keycloak.tls import (
+    SESSION_RESUMPTION, ResumingSSLContext, SSLContextAdapter,
+    create_ssl_context,
+)
+
+
+@skipIf(not SESSION_RESUMPTION, 'TLS sessions can not be resumed')
+@mock.patch.object(ssl.SSLContext, 'wrap_bio', autospec=True)
+class ResumingSSLContextTestCase(TestCase):
+
+    def setUp(self):
+        self.context = ResumingSSLContext()
+        self.bio = ssl.MemoryBIO(), ssl.MemoryBIO()
+
+    def connection(self, has_ticket=True, version='TLSv1.3', created=None):
+        session = mock.MagicMock(has_ticket=has_ticket, id=b'id', timeout=300,
+                                 time=created or time.time())
+        return mock.MagicMock(server_hostname='example.com', server_side=False,
+                              session=session,
+                              **{'version.return_value': version})
+
+    def test_resume(self, wrap_mock):
+        """
+        Case: A connection to a host got a session ticket
+        Expected: The next connection to the host offers the session, ones
+            to other hosts don't
+        """
+        connection = self.connection()
+        self.assertTrue(self.context.store_session(connection))
+
+        self.context.wrap_bio(*self.bio, server_hostname='example.com')
+        self.context.wrap_bio(*self.bio, server_hostname='other.com')
+
+        self.assertIs(wrap_mock.call_args_list[0][1]['session'],
+                      connection.session)
+        self.assertIsNone(wrap_mock.call_args_list[1][1]['session'])
+
+    def test_resume_without_ticket(self, wrap_mock):
+        """
+        Case: A TLS 1.3 connection didn't get its ticket yet, a TLS 1.2
+            connection has a session id
+        Expected: Only the TLS 1.2 session is offered
+        """
+        self.assertFalse(self.context.store_session(
+            self.connection(has_ticket=False)
+        ))
+        self.context.wrap_bio(*self.bio, server_hostname='example.com')
+
+        connection = self.connection(has_ticket=False, version='TLSv1.2')
+        self.assertTrue(self.context.store_session(connection))
+        self.context.wrap_bio(*self.bio, server_hostname='example.com')
+
+        self.assertIsNone(wrap_mock.call_args_list[0][1]['session'])
+        self.assertIs(wrap_mock.call_args_list[1][1]['session'],
+                      connection.session)
+
+    def test_resume_expired(self, wrap_mock):
+        """
+        Case: The stored session expired
+        Expected: It's not offered
+        """
+        self.context.store_session(
+            self.connection(created=time.time() - 301)
+        )
+
+        self.context.wrap_bio(*self.bio, server_hostname='example.com')
+
+        self.assertIsNone(wrap_mock.call_args[1]['session'])
+
+    @mock.patch.object(ResumingSSLContext, 'session_stats', autospec=True,
+                       return_value={'connect': 5, 'connect_good': 4,
+                                     'hits': 3})
+    def test_handshake_stats(self, session_stats_mock, wrap_mock):
+        """
+        Case: The handshakes are counted
+        Expected: Completed, resumed and full handshakes are returned
+        """
+        self.assertEqual(self.context.handshake_stats(),
+                         {'handshakes': 4, 'resumed': 3, 'full': 1})
+
+
+class CreateSSLContextTestCase(TestCase):
+
+    def test_create_ssl_context(self):
+        """
+        Case: A context is created without CA certificates
+        Expected: It verifies certificates with the CA bundle of requests
+        """
+        context = create_ssl_context()
+
+        self.assertIsInstance(context, ResumingSSLContext)
+        self.assertEqual(context.verify_mode, ssl.CERT_REQUIRED)
+        self.assertTrue(context.check_hostname)
+        self.assertGreater(context.cert_store_stats()['x509_ca'], 0)
+
+    def test_adapter(self):
+        """
+        Case: A transport adapter is created with a context
+        Expected: Its connections use the context
+        """
+        context = create_ssl_context()
+
+        adapter = SSLContextAdapter(context, pool_maxsize=4)
+
+        self.assertIs(adapter.poolmanager.connection_pool_kw['ssl_context'],
+                      context)
+        self.assertEqual(adapter._pool_maxsize, 4)
@@ -0,0 +1,96 @@
+from unittest import TestCase, skipIf
+
+import mock
+
+try:
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.trace import StatusCode
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+        InMemorySpanExporter,
+    )
+except ImportError:
+    TracerProvider = None
+
+from keycloak import tracing
+from keycloak.client import KeycloakClient
+from keycloak.openid_connect import KeycloakOpenidConnect
+from keycloak.realm import KeycloakRealm
+
+
+@skipIf(TracerProvider is None, 'opentelemetry-sdk is not installed')
+class TracingTestCase(TestCase):
+
+    def setUp(self):
+        self.exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(self.exporter))
+        tracing.instrument(tracer_provider=provider)
+        self.addCleanup(tracing.uninstrument)
+
+        self.realm = mock.MagicMock(spec_set=KeycloakRealm)
+        self.realm.realm_name = 'some-realm'
+        self.realm.client = KeycloakClient(server_url='https://example.com')
+
+        self.openid_client = KeycloakOpenidConnect(
+            realm=self.realm,
+            client_id='client-id',
+            client_secret='client-secret'
+        )
+        self.openid_client.well_known.contents = {
+            'token_endpoint': 'https://example.com/token'
+        }
+
+    @mock.patch('keycloak.client.requests', autospec=True)
+    def test_call_span(self, request_mock):
+        """
+        Case: A high-level call is done while instrumented
+        Expected: A span for the call with a child span for the round trip
+        """
+        session = request_mock.Session.return_value
+        session.headers = mock.MagicMock()
+        session.post.return_value.status_code = 200
+
+        self.openid_client.client_credentials()
+
+        http_span, call_span = self.exporter.get_finished_spans()
+
+        self.assertEqual(call_span.name,
+                         'KeycloakOpenidConnect.client_credentials')
+        self.assertEqual(call_span.attributes['keycloak.realm'], 'some-realm')
+        self.assertEqual(call_span.attributes['keycloak.endpoint_class'],
+                         'token')
+
+        self.assertEqual(http_span.name, 'POST token.grant')
+        self.assertEqual(http_span.parent.span_id,
+                         call_span.context.span_id)
+        self.assertEqual(
+            http_span.attributes['http.response.status_code'], 200
+        )
+
+    @mock.patch('keycloak.client.requests', autospec=True)
+    def test_error_span(self, request_mock):
+        """
+        Case: The round trip fails without response
+        Expected: Both spans are ended with an error status
+        """
+        session = request_mock.Session.return_value
+        session.headers = mock.MagicMock()
+        session.post.side_effect = IOError('connection refused')
+
+        with self.assertRaises(IOError):
+            self.openid_client.client_credentials()
+
+        spans = self.exporter.get_finished_spans()
+        self.assertEqual(len(spans), 2)
+        for span in spans:
+            self.assertEqual(span.status.status_code, StatusCode.ERROR)
+
+    def test_uninstrumented(self):
+        """
+        Case: Tracing is not instrumented
+        Expected: No hooks are registered on new clients
+        """
+        tracing.uninstrument()
+        client = KeycloakClient(server_url='https://example.com')
+        self.assertFalse(client._has_hooks)
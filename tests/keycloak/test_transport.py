@@ -0,0 +1,136 @@
+import io
+from unittest import TestCase
+
+import mock
+from requests.exceptions import ConnectionError, HTTPError, ReadTimeout
+from urllib3.exceptions import (
+    MaxRetryError, NewConnectionError, ReadTimeoutError,
+)
+from urllib3.response import HTTPResponse
+
+from keycloak.client import KeycloakClient
+from keycloak.exceptions import KeycloakClientError
+from keycloak.transport import Urllib3Session
+
+
+class Urllib3SessionTestCase(TestCase):
+
+    def setUp(self):
+        self.session = Urllib3Session()
+        self.session.headers.update({'initial': 'header'})
+        self.session.poolmanager = mock.MagicMock()
+        self.urlopen = self.session.poolmanager.urlopen
+        self.urlopen.return_value = HTTPResponse(
+            body=b'{"id": "a"}', status=200,
+            headers={'Content-Type': 'application/json'}
+        )
+
+    def test_get(self):
+        """
+        Case: A GET with query parameters and headers is done
+        Expected: The parameters are encoded in the URL and the headers are
+                  merged with the session headers
+        """
+        response = self.session.get('https://example.com/test?a=b',
+                                    headers={'other': 'header'},
+                                    params={'c': ['d', 'e f']})
+
+        self.urlopen.assert_called_once_with(
+            'GET', 'https://example.com/test?a=b&c=d&c=e+f', body=None,
+            headers={'initial': 'header', 'other': 'header'},
+            retries=self.session._retries, timeout=None,
+            preload_content=True, redirect=True
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'id': 'a'})
+        self.assertEqual(response.headers['content-type'],
+                         'application/json')
+
+    def test_post(self):
+        """
+        Case: A POST with a dict and one with a string is done
+        Expected: The dict is form encoded, the string is sent as is
+        """
+        self.session.post('https://example.com/test',
+                          data={'grant_type': 'password'})
+        kwargs = self.urlopen.call_args[1]
+        self.assertEqual(kwargs['body'], b'grant_type=password')
+        self.assertEqual(kwargs['headers']['Content-Type'],
+                         'application/x-www-form-urlencoded')
+
+        self.session.post('https://example.com/test', data=u'{"a": "é"}',
+                          headers={'Content-Type': 'application/json'})
+        kwargs = self.urlopen.call_args[1]
+        self.assertEqual(kwargs['body'], u'{"a": "é"}'.encode('utf-8'))
+        self.assertEqual(kwargs['headers']['Content-Type'],
+                         'application/json')
+
+    def test_stream(self):
+        """
+        Case: A streamed DELETE is done
+        Expected: The body is only read when it's accessed, closing the
+                  response releases its connection
+        """
+        raw = HTTPResponse(body=io.BytesIO(b'{"id": "a"}'), status=200,
+                           preload_content=False)
+        raw.release_conn = mock.MagicMock()
+        self.urlopen.return_value = raw
+
+        response = self.session.delete('https://example.com/test',
+                                       stream=True)
+
+        self.assertFalse(self.urlopen.call_args[1]['preload_content'])
+        self.assertEqual(raw.tell(), 0)
+        self.assertEqual(response.content, b'{"id": "a"}')
+        with response:
+            pass
+        raw.release_conn.assert_called_once_with()
+
+    def test_raise_for_status(self):
+        """
+        Case: The server responds with an error status
+        Expected: requests.HTTPError is raised with the response
+        """
+        self.urlopen.return_value = HTTPResponse(body=b'', status=404,
+                                                 reason='Not Found')
+        response = self.session.get('https://example.com/test')
+
+        with self.assertRaises(HTTPError) as context:
+            response.raise_for_status()
+        self.assertIs(context.exception.response, response)
+        self.assertEqual(str(context.exception),
+                         '404 Client Error: Not Found for url: '
+                         'https://example.com/test')
+
+    def test_errors(self):
+        """
+        Case: A request fails without a response
+        Expected: The exception of requests for the failure is raised
+        """
+        self.urlopen.side_effect = MaxRetryError(
+            None, '/test', NewConnectionError(None, 'refused')
+        )
+        with self.assertRaises(ConnectionError) as context:
+            self.session.get('https://example.com/test')
+        self.assertIsInstance(context.exception.args[0].reason,
+                              NewConnectionError)
+
+        self.urlopen.side_effect = ReadTimeoutError(None, '/test', 'timeout')
+        with self.assertRaises(ReadTimeout):
+            self.session.get('https://example.com/test')
+
+    def test_client(self):
+        """
+        Case: A client uses the urllib3 transport
+        Expected: Responses are handled like with requests
+        """
+        client = KeycloakClient(server_url='https://example.com',
+                                headers={'initial': 'header'},
+                                session_factory=lambda: self.session)
+
+        self.assertEqual(client.get('https://example.com/test'),
+                         {'id': 'a'})
+
+        self.urlopen.return_value = HTTPResponse(body=b'', status=500)
+        with self.assertRaises(KeycloakClientError):
+            client.get('https://example.com/test')